@@ -10,11 +10,19 @@ import os
 import sys
 import json
 import random
+import asyncio
 import requests
-from typing import Dict, Any, Optional, List
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, AsyncIterator, Callable, Optional, List, Tuple
+
+try:
+    import httpx
+except ImportError:  # optional: without httpx the async path runs the sync client in a worker thread
+    httpx = None
 # Use absolute import assuming 'backend' is a package in python path
 from backend.data_models import AnalysisRequest, AnalysisResponse
 from backend.ai_engine.prompts import PromptManager
+from backend.ai_engine.cache import LLMCache
 
 def safe_print(text: str):
     """Safe print function for Windows console encoding issues"""
@@ -34,10 +42,20 @@ class AIEngine:
         self.base_url = base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         self.model = model or os.getenv("OLLAMA_MODEL", "qwen2.5:7b")
         self.is_connected = False
-        self.client = requests.Session()  # 30s timeout
-        self.client.timeout = 30.0
+        # Connection pool shared by sync and async clients (OLLAMA_MAX_CONNECTIONS concurrent calls)
+        self.timeout = float(os.getenv("OLLAMA_TIMEOUT", 60))
+        self.max_connections = int(os.getenv("OLLAMA_MAX_CONNECTIONS", 10))
+        self.max_keepalive = int(os.getenv("OLLAMA_MAX_KEEPALIVE", 5))
+        self.client = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+        self.client.mount("http://", adapter)
+        self.client.mount("https://", adapter)
+        self._async_client = None
+        self._async_loop = None
         self.fallback_mode = False  # Enable mock fallback
         self.prompt_manager = PromptManager()
+        # Identical requests (same model, template version, prompt and options) are answered from cache
+        self.cache = LLMCache()
         self._test_connection()
 
     def _test_connection(self):
@@ -73,37 +91,71 @@ class AIEngine:
             self.is_connected = False
             self.fallback_mode = True
 
-    def _call_ollama(self, system_prompt: str, user_prompt: str, json_mode: bool = False) -> Optional[str]:
-        """Helper method to call Ollama API"""
+    @property
+    def active_model(self) -> str:
+        """Model that currently answers requests ("mock" in fallback mode)"""
+        if self.fallback_mode or not self.is_connected:
+            return "mock"
+        return self.model
+
+    def _build_payload(self, system_prompt: str, user_prompt: str, json_mode: bool = False) -> Dict[str, Any]:
+        """Build Ollama chat request payload"""
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "stream": False,
+            "options": {
+                "temperature": 0.3,
+                "top_p": 0.9
+            }
+        }
+
+        if json_mode:
+            payload["format"] = "json"
+        return payload
+
+    def _cache_key(self, payload: Dict[str, Any], template: Optional[str]) -> str:
+        """Cache key of a chat request"""
+        return self.cache.make_key(self.prompt_manager.get_template_version(template or "custom"), payload)
+
+    @staticmethod
+    def _cacheable(content: Optional[str], accept: Optional[Callable[[str], bool]]) -> bool:
+        """Whether a fresh model response may be cached: non-empty and accepted by the caller's parser"""
+        return bool(content) and (accept is None or accept(content))
+
+    def _call_ollama(self, system_prompt: str, user_prompt: str, json_mode: bool = False,
+                     template: str = None, use_cache: bool = True,
+                     accept: Callable[[str], bool] = None) -> Optional[str]:
+        """
+        Helper method to call Ollama API (responses are cached, see LLMCache)
+        use_cache=False skips the cache lookup, the fresh response still replaces the cached one;
+        only responses accepted by accept (e.g. the caller's JSON parser) are cached
+        """
         if self.fallback_mode or not self.is_connected:
             return None
 
         try:
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "stream": False,
-                "options": {
-                    "temperature": 0.3,
-                    "top_p": 0.9
-                }
-            }
-            
-            if json_mode:
-                payload["format"] = "json"
+            payload = self._build_payload(system_prompt, user_prompt, json_mode)
+            cache_key = self._cache_key(payload, template)
+            cached = self.cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                return cached
 
             response = self.client.post(
                 f"{self.base_url}/api/chat",
                 json=payload,
-                timeout=60.0
+                timeout=self.timeout
             )
 
             if response.status_code == 200:
                 result = response.json()
-                return result.get("message", {}).get("content", "")
+                content = result.get("message", {}).get("content", "")
+                if self._cacheable(content, accept):
+                    self.cache.put(cache_key, content)
+                return content
             else:
                 safe_print(f"Ollama API request failed: {response.status_code}")
                 return None
@@ -111,6 +163,132 @@ class AIEngine:
             safe_print(f"Exception during AI call: {e}")
             return None
 
+    def _get_async_client(self):
+        """Return the pooled async client for the running event loop (created on first use)"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._release_async_client()
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive
+                )
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    async def _call_ollama_async(self, system_prompt: str, user_prompt: str, json_mode: bool = False,
+                                 template: str = None, use_cache: bool = True,
+                                 accept: Callable[[str], bool] = None) -> Optional[str]:
+        """Async version of _call_ollama: does not block the event loop while the model is generating"""
+        if self.fallback_mode or not self.is_connected:
+            return None
+
+        if httpx is None:
+            return await asyncio.to_thread(
+                self._call_ollama, system_prompt, user_prompt, json_mode, template, use_cache, accept
+            )
+
+        try:
+            payload = self._build_payload(system_prompt, user_prompt, json_mode)
+            cache_key = self._cache_key(payload, template)
+            cached = await self.cache.aget(cache_key) if use_cache else None
+            if cached is not None:
+                return cached
+
+            response = await self._get_async_client().post("/api/chat", json=payload)
+
+            if response.status_code == 200:
+                result = response.json()
+                content = result.get("message", {}).get("content", "")
+                if self._cacheable(content, accept):
+                    await self.cache.aput(cache_key, content)
+                return content
+            else:
+                safe_print(f"Ollama API request failed: {response.status_code}")
+                return None
+        except Exception as e:
+            safe_print(f"Exception during AI call: {e}")
+            return None
+
+    async def _stream_ollama(self, system_prompt: str, user_prompt: str, json_mode: bool = False,
+                             template: str = None, use_cache: bool = True,
+                             accept: Callable[[str], bool] = None) -> AsyncIterator[str]:
+        """
+        Streaming version of _call_ollama_async: yields content chunks as soon as Ollama generates them
+        Yields nothing in mock mode or when the request fails; complete responses are cached like _call_ollama
+        """
+        if self.fallback_mode or not self.is_connected:
+            return
+
+        if httpx is None:
+            content = await asyncio.to_thread(
+                self._call_ollama, system_prompt, user_prompt, json_mode, template, use_cache, accept
+            )
+            if content:
+                yield content
+            return
+
+        payload = self._build_payload(system_prompt, user_prompt, json_mode)
+        # Streamed and non-streamed requests share cache entries
+        cache_key = self._cache_key(payload, template)
+        cached = await self.cache.aget(cache_key) if use_cache else None
+        if cached is not None:
+            yield cached
+            return
+
+        payload["stream"] = True
+        chunks = []
+        done = False
+        try:
+            async with self._get_async_client().stream("POST", "/api/chat", json=payload) as response:
+                if response.status_code != 200:
+                    safe_print(f"Ollama API request failed: {response.status_code}")
+                    return
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    message = json.loads(line)
+                    chunk = message.get("message", {}).get("content", "")
+                    if chunk:
+                        chunks.append(chunk)
+                        yield chunk
+                    if message.get("done"):
+                        done = True
+                        break
+        except Exception as e:
+            safe_print(f"Exception during AI stream: {e}")
+            return
+
+        content = "".join(chunks)
+        if done and self._cacheable(content, accept):
+            await self.cache.aput(cache_key, content)
+
+    def _release_async_client(self):
+        """
+        Close the pooled async client of another event loop
+        Its connections can only be closed on the loop that opened them, so the close is scheduled there.
+        A loop that is already closed cannot run it; its sockets are freed once the client is garbage collected.
+        """
+        client, loop = self._async_client, self._async_loop
+        self._async_client = None
+        self._async_loop = None
+        if client is not None and loop is not None and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def aclose(self):
+        """Close pooled connections (called on application shutdown)"""
+        if self._async_client is not None:
+            if self._async_loop is asyncio.get_running_loop():
+                await self._async_client.aclose()
+                self._async_client = None
+                self._async_loop = None
+            else:
+                self._release_async_client()
+        self.client.close()
+
     def _generate_mock_analysis(self, request: AnalysisRequest) -> AnalysisResponse:
         """Generate mock analysis (fallback)"""
         error_types = [
@@ -165,6 +343,63 @@ class AIEngine:
             confidence_score=round(random.uniform(0.7, 0.95), 2)
         )
 
+    def _render_analysis_prompt(self, request: AnalysisRequest) -> str:
+        """Render the mistake analysis prompt"""
+        return self.prompt_manager.render(
+            "mistake_analysis",
+            question_content=request.question_content,
+            wrong_answer=request.wrong_answer,
+            wrong_process=request.wrong_process,
+            correct_answer=request.correct_answer
+        )
+
+    def _parse_analysis(self, request: AnalysisRequest, content: Optional[str]) -> AnalysisResponse:
+        """Parse model output into AnalysisResponse, falling back to mock analysis"""
+        analysis = self._try_parse_analysis(request, content)
+        if analysis is None:
+            safe_print("Using mock analysis as fallback")
+            return self._generate_mock_analysis(request)
+        return analysis
+
+    def _try_parse_analysis(self, request: AnalysisRequest, content: Optional[str]) -> Optional[AnalysisResponse]:
+        """Parse model output into AnalysisResponse, None if it is empty, not valid JSON or not a valid analysis"""
+        if not content:
+            return None
+
+        # Try to parse JSON response
+        try:
+            if "```json" in content:
+                start_idx = content.find("```json") + 7
+                end_idx = content.find("```", start_idx)
+                json_str = content[start_idx:end_idx].strip()
+            elif "```" in content:
+                start_idx = content.find("```") + 3
+                end_idx = content.find("```", start_idx)
+                json_str = content[start_idx:end_idx].strip()
+            else:
+                json_str = content.strip()
+
+            analysis_data = json.loads(json_str)
+
+            return AnalysisResponse(
+                mistake_id=request.mistake_id,
+                error_type=analysis_data.get("error_type", "Unknown Error Type"),
+                root_cause=analysis_data.get("root_cause", "Unknown Root Cause"),
+                knowledge_gap=analysis_data.get("knowledge_gap", []),
+                learning_suggestions=analysis_data.get("learning_suggestions", []),
+                similar_examples=analysis_data.get("similar_examples", []),
+                confidence_score=min(max(analysis_data.get("confidence_score", 0.8), 0.7), 0.95)
+            )
+
+        except ValueError as e:  # invalid JSON, or fields of the wrong type
+            safe_print(f"JSON parse failed: {e}")
+            safe_print(f"Raw response: {content[:200]}...")
+            return None
+
+    def _accepts_analysis(self, request: AnalysisRequest) -> Callable[[str], bool]:
+        """Cache predicate of analysis responses: only output that parses into an AnalysisResponse is cached"""
+        return lambda content: self._try_parse_analysis(request, content) is not None
+
     def analyze_mistake(self, request: AnalysisRequest) -> AnalysisResponse:
         """Analyze mistake (Real AI Analysis)"""
         if self.fallback_mode or not self.is_connected:
@@ -172,61 +407,77 @@ class AIEngine:
             return self._generate_mock_analysis(request)
 
         try:
-            # Use PromptManager to render prompt
-            user_prompt = self.prompt_manager.render(
-                "mistake_analysis",
-                question_content=request.question_content,
-                wrong_answer=request.wrong_answer,
-                wrong_process=request.wrong_process,
-                correct_answer=request.correct_answer
-            )
-            
+            user_prompt = self._render_analysis_prompt(request)
             system_prompt = "You are a professional math education AI assistant."
 
             safe_print(f"Sending AI analysis request, Mistake ID: {request.mistake_id}")
 
-            content = self._call_ollama(system_prompt, user_prompt, json_mode=True)
-
-            if content:
-                # Try to parse JSON response
-                try:
-                    if "```json" in content:
-                        start_idx = content.find("```json") + 7
-                        end_idx = content.find("```", start_idx)
-                        json_str = content[start_idx:end_idx].strip()
-                    elif "```" in content:
-                        start_idx = content.find("```") + 3
-                        end_idx = content.find("```", start_idx)
-                        json_str = content[start_idx:end_idx].strip()
-                    else:
-                        json_str = content.strip()
-
-                    analysis_data = json.loads(json_str)
-
-                    return AnalysisResponse(
-                        mistake_id=request.mistake_id,
-                        error_type=analysis_data.get("error_type", "Unknown Error Type"),
-                        root_cause=analysis_data.get("root_cause", "Unknown Root Cause"),
-                        knowledge_gap=analysis_data.get("knowledge_gap", []),
-                        learning_suggestions=analysis_data.get("learning_suggestions", []),
-                        similar_examples=analysis_data.get("similar_examples", []),
-                        confidence_score=min(max(analysis_data.get("confidence_score", 0.8), 0.7), 0.95)
-                    )
-
-                except json.JSONDecodeError as e:
-                    safe_print(f"JSON parse failed: {e}")
-                    safe_print(f"Raw response: {content[:200]}...")
-                    safe_print("Using mock analysis as fallback")
-                    return self._generate_mock_analysis(request)
-            else:
-                safe_print("Using mock analysis as fallback")
-                return self._generate_mock_analysis(request)
+            content = self._call_ollama(system_prompt, user_prompt, json_mode=True, template="mistake_analysis",
+                                        accept=self._accepts_analysis(request))
+            return self._parse_analysis(request, content)
 
         except Exception as e:
             safe_print(f"Exception during AI analysis: {e}")
             safe_print("Using mock analysis as fallback")
             return self._generate_mock_analysis(request)
 
+    async def analyze_mistake_async(self, request: AnalysisRequest) -> AnalysisResponse:
+        """Analyze mistake without blocking the event loop (same result as analyze_mistake)"""
+        analysis, _ = await self.analyze_mistake_with_model_async(request)
+        return analysis
+
+    async def analyze_mistake_with_model_async(self, request: AnalysisRequest,
+                                               use_cache: bool = True) -> Tuple[AnalysisResponse, str]:
+        """
+        Analyze mistake, also returning the model that produced the result ("mock" if it fell back)
+        use_cache=False always calls the model (forced re-analysis)
+        """
+        if self.fallback_mode or not self.is_connected:
+            safe_print("AI service not connected, using mock analysis")
+            return self._generate_mock_analysis(request), "mock"
+
+        model = self.model
+        try:
+            user_prompt = self._render_analysis_prompt(request)
+            system_prompt = "You are a professional math education AI assistant."
+
+            safe_print(f"Sending AI analysis request, Mistake ID: {request.mistake_id}")
+
+            content = await self._call_ollama_async(system_prompt, user_prompt, json_mode=True, template="mistake_analysis",
+                                                    use_cache=use_cache, accept=self._accepts_analysis(request))
+            analysis = self._try_parse_analysis(request, content)
+            if analysis is not None:
+                return analysis, model
+
+        except Exception as e:
+            safe_print(f"Exception during AI analysis: {e}")
+        safe_print("Using mock analysis as fallback")
+        return self._generate_mock_analysis(request), "mock"
+
+    async def stream_analysis(self, request: AnalysisRequest, use_cache: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Stream a mistake analysis
+        Yields ("token", text) for each chunk the model generates, then ("result", (AnalysisResponse, model));
+        model is "mock" when the output could not be parsed and mock analysis was used instead.
+        use_cache=False always calls the model (forced re-analysis)
+        """
+        user_prompt = self._render_analysis_prompt(request)
+        system_prompt = "You are a professional math education AI assistant."
+
+        safe_print(f"Streaming AI analysis, Mistake ID: {request.mistake_id}")
+        chunks = []
+        async for chunk in self._stream_ollama(system_prompt, user_prompt, json_mode=True, template="mistake_analysis",
+                                               use_cache=use_cache, accept=self._accepts_analysis(request)):
+            chunks.append(chunk)
+            yield "token", chunk
+
+        analysis = self._try_parse_analysis(request, "".join(chunks))
+        if analysis is not None:
+            yield "result", (analysis, self.model)
+        else:
+            safe_print("Using mock analysis as fallback")
+            yield "result", (self._generate_mock_analysis(request), "mock")
+
     def generate_practice_questions(self, knowledge_gaps: list, count: int = 5,
                                    difficulty: str = None, similarity_level: str = None) -> list:
         """Generate similar practice questions (Real AI Generation)"""
@@ -247,33 +498,39 @@ class AIEngine:
             
             system_prompt = "You are a math teacher generating practice questions."
             
-            content = self._call_ollama(system_prompt, user_prompt, json_mode=True)
+            content = self._call_ollama(system_prompt, user_prompt, json_mode=True, template="similar_question_generation",
+                                        accept=lambda c: self._try_parse_practice_questions(c) is not None)
             
-            if content:
-                try:
-                    if "```json" in content:
-                        start_idx = content.find("```json") + 7
-                        end_idx = content.find("```", start_idx)
-                        json_str = content[start_idx:end_idx].strip()
-                    elif "```" in content:
-                        start_idx = content.find("```") + 3
-                        end_idx = content.find("```", start_idx)
-                        json_str = content[start_idx:end_idx].strip()
-                    else:
-                        json_str = content.strip()
-                        
-                    questions = json.loads(json_str)
-                    return questions
-                except Exception as e:
-                    safe_print(f"JSON parse failed for questions: {e}")
-                    return self._generate_mock_practice_questions(knowledge_gaps, count, difficulty, similarity_level)
-            else:
-                return self._generate_mock_practice_questions(knowledge_gaps, count, difficulty, similarity_level)
+            questions = self._try_parse_practice_questions(content)
+            if questions is not None:
+                return questions
+            return self._generate_mock_practice_questions(knowledge_gaps, count, difficulty, similarity_level)
                 
         except Exception as e:
             safe_print(f"Exception generating questions: {e}")
             return self._generate_mock_practice_questions(knowledge_gaps, count, difficulty, similarity_level)
 
+    @staticmethod
+    def _try_parse_practice_questions(content: Optional[str]) -> Any:
+        """Parse model output of practice question generation, None if it is empty or not valid JSON"""
+        if not content:
+            return None
+        if "```json" in content:
+            start_idx = content.find("```json") + 7
+            end_idx = content.find("```", start_idx)
+            json_str = content[start_idx:end_idx].strip()
+        elif "```" in content:
+            start_idx = content.find("```") + 3
+            end_idx = content.find("```", start_idx)
+            json_str = content[start_idx:end_idx].strip()
+        else:
+            json_str = content.strip()
+        try:
+            return json.loads(json_str)
+        except json.JSONDecodeError as e:
+            safe_print(f"JSON parse failed for questions: {e}")
+            return None
+
     def _generate_mock_practice_questions(self, knowledge_gaps: list, count: int = 5,
                                          difficulty: str = None, similarity_level: str = None) -> list:
         """Generate mock practice questions (fallback)"""
@@ -336,9 +593,28 @@ class AIEngine:
             return self._generate_mock_concept_explanation(concept)
 
         try:
-            system_prompt = "You are a professional math teacher, please explain math concepts clearly."
+            system_prompt, user_message = self._concept_prompts(concept)
+            content = self._call_ollama(system_prompt, user_message, json_mode=True, template="concept_explanation",
+                                        accept=self._accepts_concept_explanation(concept))
+
+            if content:
+                explanation = self._try_parse_concept_explanation(concept, content)
+                if explanation is not None:
+                    return explanation
+                safe_print("Concept explanation JSON parse failed, using mock data")
+            else:
+                safe_print(f"Explain concept failed")
+            return self._generate_mock_concept_explanation(concept)
+
+        except Exception as e:
+            safe_print(f"Explain concept exception: {e}")
+            return self._generate_mock_concept_explanation(concept)
 
-            user_message = f"""Please explain the math concept: {concept}
+    def _concept_prompts(self, concept: str) -> Tuple[str, str]:
+        """System and user prompt of a concept explanation"""
+        system_prompt = "You are a professional math teacher, please explain math concepts clearly."
+
+        user_message = f"""Please explain the math concept: {concept}
 
 Return JSON format:
 {{
@@ -348,36 +624,53 @@ Return JSON format:
     "example": "Example",
     "note": "Note"
 }}"""
-            
-            content = self._call_ollama(system_prompt, user_message, json_mode=True)
-
-            if content:
-                try:
-                    json_str = content
-                    if "```json" in content:
-                        start_idx = content.find("```json") + 7
-                        end_idx = content.find("```", start_idx)
-                        json_str = content[start_idx:end_idx].strip()
-                    elif "```" in content:
-                        start_idx = content.find("```") + 3
-                        end_idx = content.find("```", start_idx)
-                        json_str = content[start_idx:end_idx].strip()
-
-                    explanation = json.loads(json_str)
-                    explanation["concept"] = concept
-                    return explanation
-
-                except json.JSONDecodeError:
-                    safe_print("Concept explanation JSON parse failed, using mock data")
-                    return self._generate_mock_concept_explanation(concept)
+        return system_prompt, user_message
 
-            else:
-                safe_print(f"Explain concept failed")
-                return self._generate_mock_concept_explanation(concept)
+    def _try_parse_concept_explanation(self, concept: str, content: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Parse model output of a concept explanation, None if it is empty or not valid JSON"""
+        if not content:
+            return None
+        json_str = content
+        if "```json" in content:
+            start_idx = content.find("```json") + 7
+            end_idx = content.find("```", start_idx)
+            json_str = content[start_idx:end_idx].strip()
+        elif "```" in content:
+            start_idx = content.find("```") + 3
+            end_idx = content.find("```", start_idx)
+            json_str = content[start_idx:end_idx].strip()
 
-        except Exception as e:
-            safe_print(f"Explain concept exception: {e}")
-            return self._generate_mock_concept_explanation(concept)
+        try:
+            explanation = json.loads(json_str)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(explanation, dict):
+            return None
+        explanation["concept"] = concept
+        return explanation
+
+    def _accepts_concept_explanation(self, concept: str) -> Callable[[str], bool]:
+        """Cache predicate of concept explanation responses"""
+        return lambda content: self._try_parse_concept_explanation(concept, content) is not None
+
+    async def stream_concept_explanation(self, concept: str) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Stream a concept explanation
+        Yields ("token", text) for each chunk the model generates, then ("result", explanation dict)
+        """
+        safe_print(f"Streaming concept explanation: {concept}")
+        system_prompt, user_message = self._concept_prompts(concept)
+        chunks = []
+        async for chunk in self._stream_ollama(system_prompt, user_message, json_mode=True, template="concept_explanation",
+                                               accept=self._accepts_concept_explanation(concept)):
+            chunks.append(chunk)
+            yield "token", chunk
+
+        explanation = self._try_parse_concept_explanation(concept, "".join(chunks))
+        if explanation is None:
+            safe_print("Using mock concept explanation as fallback")
+            explanation = self._generate_mock_concept_explanation(concept)
+        yield "result", explanation
 
     def _generate_mock_concept_explanation(self, concept: str) -> Dict[str, Any]:
         """Generate mock concept explanation (fallback)"""
@@ -430,7 +723,7 @@ Return JSON format:
             )
             system_prompt = "You are a helpful math tutor."
             
-            content = self._call_ollama(system_prompt, user_prompt)
+            content = self._call_ollama(system_prompt, user_prompt, template="explanation_generation")
             return content or "Failed to generate explanation."
         except Exception as e:
             safe_print(f"Error generating explanation: {e}")
@@ -449,8 +742,23 @@ Return JSON format:
             )
             system_prompt = "You are a math expert summarizing solution methods."
             
-            content = self._call_ollama(system_prompt, user_prompt)
+            content = self._call_ollama(system_prompt, user_prompt, template="solution_summary_generation")
             return content or "Failed to generate summary."
         except Exception as e:
             safe_print(f"Error generating summary: {e}")
             return "Error generating summary."
+
+
+_default_engine: Optional[AIEngine] = None
+
+
+def get_ai_engine() -> AIEngine:
+    """
+    Return the process-wide AI engine
+    All routers and background jobs must share this instance so that they share one
+    connection pool (OLLAMA_MAX_CONNECTIONS in total) and one response cache.
+    """
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = AIEngine()
+    return _default_engine
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+LLM Response Cache
+Content-addressed cache for model responses: in-memory LRU tier plus an
+optional on-disk tier with TTL and size-based eviction.
+Author: Rookie (error-T-T) & Exia
+GitHub ID: error-T-T
+Email: RookieT@e.gzhu.edu.cn
+"""
+
+import os
+import json
+import asyncio
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class LLMCache:
+    """Two-tier cache of model responses keyed by a hash of the full request"""
+
+    def __init__(self, max_entries: int = None, disk_dir: str = None,
+                 ttl: float = None, disk_max_bytes: int = None):
+        """
+        Initialize cache
+        :param max_entries: In-memory entries (default env LLM_CACHE_SIZE, 256; 0 disables the memory tier)
+        :param disk_dir: Directory of the on-disk tier (default env LLM_CACHE_DIR; empty disables it)
+        :param ttl: Seconds an entry stays valid (default env LLM_CACHE_TTL, 7 days; 0 means entries never expire)
+        :param disk_max_bytes: Size limit of the on-disk tier (default env LLM_CACHE_DISK_MAX_BYTES, 64 MB; 0 means no limit)
+        """
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("LLM_CACHE_SIZE", 256))
+        self.disk_dir = disk_dir if disk_dir is not None else os.getenv("LLM_CACHE_DIR", "")
+        self.ttl = ttl if ttl is not None else float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+        self.disk_max_bytes = (disk_max_bytes if disk_max_bytes is not None
+                               else int(os.getenv("LLM_CACHE_DISK_MAX_BYTES", 64 * 1024 * 1024)))
+        self._memory: OrderedDict = OrderedDict()  # key -> (created_at, content)
+        # On-disk entries, loaded once at startup so lookups and eviction never scan the directory
+        self._disk_index: Dict[str, List[float]] = {}  # key -> [last_used, size]
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(template: str, payload: Dict[str, Any]) -> str:
+        """
+        Hash of (template name + version, model, rendered messages, options)
+        :param template: Template identifier including its version, e.g. "mistake_analysis@1a2b3c"
+        :param payload: Ollama chat payload (model, messages, options, format)
+        """
+        material = json.dumps([template, payload], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached content, or None on miss or expiry"""
+        now = time.time()
+        content = self._get_memory(key, now)
+        if content is not None:
+            return content
+        entry = self._read_disk(key, now) if self._on_disk(key) else None
+        return self._found(key, entry)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Async get: the on-disk tier is read in a worker thread so the event loop is not blocked"""
+        now = time.time()
+        content = self._get_memory(key, now)
+        if content is not None:
+            return content
+        entry = await asyncio.to_thread(self._read_disk, key, now) if self._on_disk(key) else None
+        return self._found(key, entry)
+
+    def put(self, key: str, content: str):
+        """Store content in both tiers"""
+        entry = (time.time(), content)
+        with self._lock:
+            self._remember(key, entry)
+        if self.disk_dir:
+            self._write_disk(key, entry)
+
+    async def aput(self, key: str, content: str):
+        """Async put: the on-disk tier is written in a worker thread so the event loop is not blocked"""
+        entry = (time.time(), content)
+        with self._lock:
+            self._remember(key, entry)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk_index) if self.disk_dir else None,
+                "disk_bytes": self._disk_bytes if self.disk_dir else None,
+            }
+
+    def _expired(self, timestamp: float, now: float) -> bool:
+        return self.ttl > 0 and now - timestamp >= self.ttl
+
+    def _get_memory(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry[0], now):
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _on_disk(self, key: str) -> bool:
+        with self._lock:
+            return key in self._disk_index
+
+    def _found(self, key: str, entry) -> Optional[str]:
+        """Count the lookup and promote a disk hit to the memory tier"""
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+            self.hits += 1
+            return entry[1]
+
+    def _remember(self, key: str, entry):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _load_disk_index(self):
+        """Index existing entries by last use (file mtime) and size"""
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                self._disk_index[name[:-len(".json")]] = [stat.st_mtime, stat.st_size]
+                self._disk_bytes += stat.st_size
+
+    def _read_disk(self, key: str, now: float):
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self._remove_disk(key)
+            return None
+        if self._expired(data.get("created_at", 0), now):
+            self._remove_disk(key)
+            return None
+        with self._lock:
+            if key in self._disk_index:
+                self._disk_index[key][0] = now
+        try:
+            os.utime(path)  # keep the recency order across restarts
+        except OSError:
+            pass
+        return data["created_at"], data["content"]
+
+    def _write_disk(self, key: str, entry):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp{threading.get_ident()}"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created_at": entry[0], "content": entry[1]}, f, ensure_ascii=False)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            old = self._disk_index.get(key)
+            self._disk_bytes += size - (old[1] if old else 0)
+            self._disk_index[key] = [entry[0], size]
+            over_limit = 0 < self.disk_max_bytes < self._disk_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _remove_disk(self, key: str):
+        with self._lock:
+            indexed = self._disk_index.pop(key, None)
+            if indexed is not None:
+                self._disk_bytes -= indexed[1]
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        """Drop expired entries, then least recently used ones until 90% of the size limit"""
+        now = time.time()
+        target = self.disk_max_bytes * 0.9
+        victims = []
+        with self._lock:
+            for key, (last_used, size) in sorted(self._disk_index.items(), key=lambda item: item[1][0]):
+                if self._disk_bytes <= target and not self._expired(last_used, now):
+                    break
+                del self._disk_index[key]
+                self._disk_bytes -= size
+                victims.append(key)
+        for key in victims:
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
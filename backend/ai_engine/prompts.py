@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import hashlib
 from typing import Dict, Any, Optional
 from string import Template
 
@@ -115,6 +116,18 @@ Please output in the following structure:
         except KeyError as e:
             raise ValueError(f"Template render failed: Missing variable {e}")
 
+    def get_template_version(self, template_name: str) -> str:
+        """
+        Get template identifier with version (short hash of the template text)
+        Editing a template changes its version, so cached responses of the old text are not reused.
+        :param template_name: Template name
+        :return: "name@version", or "name@inline" for prompts not managed here
+        """
+        template = self.templates.get(template_name)
+        if template is None:
+            return f"{template_name}@inline"
+        return f"{template_name}@{hashlib.sha256(template.template.encode('utf-8')).hexdigest()[:12]}"
+
     def get_template_names(self) -> list:
         """Get all available template names"""
         return list(self.templates.keys())
@@ -0,0 +1,72 @@
+"""
+AI分析结果存储模块
+分析结果按 错题ID + 内容哈希 存为独立的小文件，主表中只保存指向它的引用，
+写入一次分析只涉及一个小文件，主表保持精简。
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+import hashlib
+import os
+import re
+from typing import Optional
+
+# 主表 analysis_result 列中引用的前缀；旧数据中直接内嵌的JSON以 "{" 开头
+ANALYSIS_REF_PREFIX = "sha256:"
+
+
+def content_ref(content: str) -> str:
+    """根据分析结果内容生成引用"""
+    return ANALYSIS_REF_PREFIX + hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+
+
+def is_analysis_ref(value: str) -> bool:
+    """判断 analysis_result 列的值是否为引用（而不是内嵌的JSON）"""
+    return value.startswith(ANALYSIS_REF_PREFIX)
+
+
+class AnalysisStore:
+    """基于目录的分析结果存储
+
+    每条分析结果一个文件：<root>/<错题ID>-<内容哈希>.json。
+    内容相同则文件名相同，重复写入是幂等的。
+    """
+
+    def __init__(self, root_dir: str = "data/analyses"):
+        """初始化存储目录"""
+        self.root_dir = root_dir
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _path(self, mistake_id: str, ref: str) -> str:
+        safe_id = re.sub(r'[^\w-]', '_', mistake_id)
+        return os.path.join(self.root_dir, f"{safe_id}-{ref[len(ANALYSIS_REF_PREFIX):]}.json")
+
+    def put(self, mistake_id: str, content: str) -> str:
+        """保存分析结果，返回写入主表的引用"""
+        ref = content_ref(content)
+        path = self._path(mistake_id, ref)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        return ref
+
+    def get(self, mistake_id: str, ref: str) -> Optional[str]:
+        """读取分析结果的JSON文本，不存在时返回None"""
+        try:
+            with open(self._path(mistake_id, ref), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, mistake_id: str, ref: str):
+        """删除分析结果文件（不存在时忽略）"""
+        try:
+            os.remove(self._path(mistake_id, ref))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,248 @@
+"""
+练习作答记录模块
+每次练习作答以紧凑的二进制记录追加到 data/attempts.bin，知识标签另存为标签字典；
+按标签、按错题的正确率与连对次数随作答到达增量更新，读取聚合结果无需扫描日志。
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+import os
+import struct
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from data_manager import safe_print
+
+# 记录头：时间戳（毫秒）、是否做对、错题ID（UTF-8，不足补零）、标签个数；其后为各标签在字典中的序号
+_HEADER = struct.Struct('<qB16sB')
+_TAG_ID = struct.Struct('<I')
+MAX_MISTAKE_ID_BYTES = 16
+MAX_TAGS = 255
+
+
+class RunningAccuracy:
+    """增量维护的作答统计：次数、做对次数、当前连对与最长连对"""
+
+    __slots__ = ('attempts', 'correct', 'streak', 'best_streak', 'last_attempt_at')
+
+    def __init__(self):
+        self.attempts = 0
+        self.correct = 0
+        self.streak = 0
+        self.best_streak = 0
+        self.last_attempt_at: Optional[datetime] = None
+
+    def add(self, correct: bool, attempted_at: datetime):
+        """计入一次作答（作答按到达顺序计入连对）"""
+        self.attempts += 1
+        if correct:
+            self.correct += 1
+            self.streak += 1
+            self.best_streak = max(self.best_streak, self.streak)
+        else:
+            self.streak = 0
+        if self.last_attempt_at is None or attempted_at > self.last_attempt_at:
+            self.last_attempt_at = attempted_at
+
+    def to_dict(self) -> Dict:
+        return {
+            "attempts": self.attempts,
+            "correct": self.correct,
+            "accuracy": round(self.correct / self.attempts, 4) if self.attempts else None,
+            "streak": self.streak,
+            "best_streak": self.best_streak,
+            "last_attempt_at": self.last_attempt_at,
+        }
+
+
+class AttemptLog:
+    """只追加的练习作答日志及其增量聚合"""
+
+    def __init__(self, file_path: str = "data/attempts.bin"):
+        """打开（或创建）作答日志，并由日志重建聚合结果"""
+        self.file_path = file_path
+        self.tags_path = os.path.splitext(file_path)[0] + ".tags"
+        self._lock = threading.Lock()
+        self._tags: List[str] = []                 # 标签序号 -> 标签
+        self._tag_ids: Dict[str, int] = {}         # 标签 -> 标签序号
+        self.overall = RunningAccuracy()
+        self.by_tag: Dict[str, RunningAccuracy] = defaultdict(RunningAccuracy)
+        self.by_mistake: Dict[str, RunningAccuracy] = defaultdict(RunningAccuracy)
+        self.by_day: Dict[date, List[int]] = defaultdict(lambda: [0, 0])  # 日期 -> [作答次数, 做对次数]
+        self._listeners: List[Callable[[List[Tuple[datetime, int, int]]], None]] = []
+
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        self._load_tags()
+        self._replay()
+        self._file = open(self.file_path, 'ab')
+        self._tags_file = open(self.tags_path, 'a', encoding='utf-8')
+
+    def _load_tags(self):
+        """读取标签字典；末尾没有换行的半行（写入中途崩溃）被截掉，避免下一个标签接在它后面"""
+        if not os.path.exists(self.tags_path):
+            return
+        with open(self.tags_path, 'rb') as f:
+            data = f.read()
+
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].decode('utf-8').split('\n')[:-1]:
+            self._register_tag(line)
+
+        if end < len(data):
+            safe_print(f"[WARN] 标签字典末尾有不完整的一行，已截断: {self.tags_path}")
+            with open(self.tags_path, 'r+b') as f:
+                f.truncate(end)
+
+    def _register_tag(self, tag: str) -> int:
+        tag_id = self._tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = self._tag_ids[tag] = len(self._tags)
+            self._tags.append(tag)
+        return tag_id
+
+    def _replay(self):
+        """启动时顺序读取日志重建聚合；末尾不完整的记录（写入中途崩溃）被截掉"""
+        if not os.path.exists(self.file_path):
+            return
+        with open(self.file_path, 'rb') as f:
+            data = f.read()
+
+        pos = 0
+        count = 0
+        while pos + _HEADER.size <= len(data):
+            ts_ms, correct, raw_id, n_tags = _HEADER.unpack_from(data, pos)
+            end = pos + _HEADER.size + n_tags * _TAG_ID.size
+            if end > len(data):
+                break
+            tag_ids = [_TAG_ID.unpack_from(data, pos + _HEADER.size + i * _TAG_ID.size)[0] for i in range(n_tags)]
+            tags = [self._tags[i] for i in tag_ids if i < len(self._tags)]
+            self._aggregate(raw_id.rstrip(b'\0').decode('utf-8'), tags, bool(correct),
+                            datetime.fromtimestamp(ts_ms / 1000))
+            pos = end
+            count += 1
+
+        if pos < len(data):
+            safe_print(f"[WARN] 作答日志末尾有不完整的记录，已截断: {self.file_path}")
+            with open(self.file_path, 'r+b') as f:
+                f.truncate(pos)
+        if count:
+            safe_print(f"[FILE] 已加载 {count} 条作答记录: {self.file_path}")
+
+    def _aggregate(self, mistake_id: str, tags: Iterable[str], correct: bool, attempted_at: datetime):
+        self.overall.add(correct, attempted_at)
+        self.by_mistake[mistake_id].add(correct, attempted_at)
+        for tag in tags:
+            self.by_tag[tag].add(correct, attempted_at)
+        day = self.by_day[attempted_at.date()]
+        day[0] += 1
+        day[1] += int(correct)
+
+    @staticmethod
+    def validate(mistake_id: str, tags: List[str]):
+        """检查一条作答能否写入日志
+
+        Raises:
+            ValueError: 错题ID过长、标签过多或标签包含换行
+        """
+        if not mistake_id or len(mistake_id.encode('utf-8')) > MAX_MISTAKE_ID_BYTES:
+            raise ValueError(f"错题ID为空或超过 {MAX_MISTAKE_ID_BYTES} 字节: {mistake_id!r}")
+        if len(tags) > MAX_TAGS:
+            raise ValueError(f"知识标签不能超过 {MAX_TAGS} 个")
+        if any('\n' in tag for tag in tags):
+            raise ValueError("知识标签不能包含换行")
+
+    def append(self, attempts: List[Tuple[str, List[str], bool, datetime]]) -> int:
+        """批量追加作答记录并更新聚合，整批只写一次文件
+
+        Args:
+            attempts: (错题ID, 知识标签, 是否做对, 作答时间) 列表，调用前应先用 validate 检查
+
+        Returns:
+            int: 写入的记录数
+        """
+        if not attempts:
+            return 0
+        with self._lock:
+            records = []
+            new_tags = []
+            for mistake_id, tags, correct, attempted_at in attempts:
+                tags = list(dict.fromkeys(tags))
+                tag_ids = []
+                for tag in tags:
+                    if tag not in self._tag_ids:
+                        new_tags.append(tag)
+                    tag_ids.append(self._register_tag(tag))
+                records.append(
+                    _HEADER.pack(int(attempted_at.timestamp() * 1000), int(correct),
+                                 mistake_id.encode('utf-8'), len(tag_ids))
+                    + b''.join(_TAG_ID.pack(tag_id) for tag_id in tag_ids)
+                )
+
+            # 先写标签字典，保证日志中引用的标签序号一定可解析
+            if new_tags:
+                self._tags_file.write(''.join(f"{tag}\n" for tag in new_tags))
+                self._tags_file.flush()
+            self._file.write(b''.join(records))
+            self._file.flush()
+
+            for mistake_id, tags, correct, attempted_at in attempts:
+                self._aggregate(mistake_id, dict.fromkeys(tags), correct, attempted_at)
+            listeners = list(self._listeners)
+
+        reviews = [(attempted_at, int(correct), 1) for _, _, correct, attempted_at in attempts]
+        for listener in listeners:
+            listener(reviews)
+        return len(records)
+
+    def subscribe(self, listener: Callable[[List[Tuple[datetime, int, int]]], None]):
+        """注册作答监听器 listener([(作答时间, 做对次数, 作答次数), ...])，如数据管理器的 record_reviews
+
+        注册时先按天回放已有的作答汇总，之后每次 append 以整批作答调用一次。
+        """
+        with self._lock:
+            self._listeners.append(listener)
+            days = [(datetime.combine(day, datetime.min.time()), counts[1], counts[0])
+                    for day, counts in self.by_day.items()]
+        if days:
+            listener(days)
+
+    def tag_stats(self) -> List[Dict]:
+        """各知识标签的作答统计，按作答次数从多到少排列"""
+        with self._lock:
+            items = [{"tag": tag, **stats.to_dict()} for tag, stats in self.by_tag.items()]
+        items.sort(key=lambda item: item["attempts"], reverse=True)
+        return items
+
+    def mistake_stats(self, mistake_id: str) -> Optional[Dict]:
+        """某道错题的作答统计，没有作答记录时返回None"""
+        with self._lock:
+            stats = self.by_mistake.get(mistake_id)
+            return {"mistake_id": mistake_id, **stats.to_dict()} if stats else None
+
+    def summary(self) -> Dict:
+        """全部作答的统计"""
+        with self._lock:
+            return {**self.overall.to_dict(), "tags": len(self.by_tag), "mistakes": len(self.by_mistake)}
+
+    def close(self):
+        """关闭日志文件"""
+        with self._lock:
+            self._file.close()
+            self._tags_file.close()
+
+
+_default_log: Optional[AttemptLog] = None
+_default_log_lock = threading.Lock()
+
+
+def get_attempt_log() -> AttemptLog:
+    """返回进程内共享的作答日志（路径由环境变量 ATTEMPT_LOG_PATH 指定）"""
+    global _default_log
+    with _default_log_lock:
+        if _default_log is None:
+            _default_log = AttemptLog(os.getenv("ATTEMPT_LOG_PATH", "data/attempts.bin"))
+        return _default_log
@@ -0,0 +1,95 @@
+"""
+列表接口行转换基准测试
+对比逐行转换（row_to_mistake_response）与批量转换（rows_to_mistake_responses），
+并校验两者输出完全一致。
+
+用法: python backend/benchmarks/bench_row_conversion.py [记录数]
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_manager import CSV_COLUMNS, LIST_FIELDS, row_to_mistake_response, rows_to_mistake_responses
+from data_models import DifficultyLevel, QuestionType
+
+
+def make_rows(count: int):
+    """生成与CSV记录结构相同的合成数据"""
+    rng = random.Random(42)
+    tags = ["定积分", "不定积分", "导数应用", "极限", "矩阵运算", "微分方程"]
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        created = (start + timedelta(minutes=37 * i)).isoformat()
+        analysis = ''
+        if i % 3 == 0:
+            analysis = json.dumps({
+                "mistake_id": f"m{i:07d}",
+                "error_type": "计算错误",
+                "root_cause": "忽略了积分上下限" * 5,
+                "knowledge_gap": rng.sample(tags, 2),
+                "learning_suggestions": ["复习微积分基本定理"] * 3,
+                "similar_examples": ["计算∫(0 to π) sin x dx"] * 3,
+                "confidence_score": 0.85
+            }, ensure_ascii=False)
+        rows.append(dict(zip(CSV_COLUMNS, [
+            f"m{i:07d}",
+            f"计算 ∫(0 to {i % 9 + 1}) x^2 dx",
+            "我用了基本积分公式，但忘记了上下限" * 3,
+            "x^3/3",
+            f"{(i % 9 + 1) ** 3}/3",
+            rng.choice(list(QuestionType)).value,
+            ", ".join(rng.sample(tags, rng.randint(0, 3))),
+            rng.choice(list(DifficultyLevel)).value,
+            "教材" if i % 2 else '',
+            '',
+            created,
+            created,
+            analysis
+        ])))
+    return rows
+
+
+def timed(func, repeat: int = 3):
+    """返回多次运行中的最短耗时及最后一次结果"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rows = make_rows(count)
+
+    per_row_time, per_row = timed(lambda: [m for m in (row_to_mistake_response(r) for r in rows) if m])
+    batch_time, batch = timed(lambda: rows_to_mistake_responses(rows))
+
+    assert per_row == batch, "批量转换结果与逐行转换不一致"
+    assert [m.model_dump_json() for m in per_row] == [m.model_dump_json() for m in batch]
+
+    # 列表接口默认字段（不解析analysis_result）
+    projected_time, _ = timed(lambda: rows_to_mistake_responses(rows, LIST_FIELDS))
+
+    print(f"记录数: {count}")
+    print(f"逐行转换: {per_row_time * 1000:8.1f} ms")
+    print(f"批量转换: {batch_time * 1000:8.1f} ms  ({per_row_time / batch_time:.1f}x)")
+    print(f"批量+投影: {projected_time * 1000:7.1f} ms  ({per_row_time / projected_time:.1f}x)")
+    print("输出一致: OK")
+
+
+if __name__ == "__main__":
+    main()
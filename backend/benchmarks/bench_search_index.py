@@ -0,0 +1,79 @@
+"""
+关键词搜索基准测试
+对比倒排索引（SearchIndex）与逐行子串扫描，并校验两者命中的记录集合一致。
+
+用法: python backend/benchmarks/bench_search_index.py [记录数]
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex, SEARCH_FIELDS
+
+_TOPICS = ["定积分", "不定积分", "导数", "极限", "矩阵", "微分方程", "级数", "概率", "向量", "三角函数"]
+_LATEX = ["\\frac{1}{2}", "\\sqrt{x}", "\\int_0^1", "\\lim_{x \\to 0}", "\\sum_{n=1}^{\\infty}", "\\sin x"]
+
+
+def make_rows(count: int):
+    """生成合成的搜索字段数据"""
+    rng = random.Random(42)
+    rows = []
+    for i in range(count):
+        rows.append({
+            'id': f"m{i:07d}",
+            'question_content': f"计算{rng.choice(_TOPICS)}：{rng.choice(_LATEX)} 第{i}题",
+            'wrong_process': f"{rng.choice(_TOPICS)}公式用错，{rng.choice(_LATEX)}",
+            'notes': rng.choice(["", "复习教材", f"注意{rng.choice(_TOPICS)}的定义"]),
+        })
+    return rows
+
+
+def scan(rows, keyword: str):
+    """原实现：逐行对三个字段做子串匹配"""
+    needle = keyword.lower()
+    return [row['id'] for row in rows if any(needle in row[field].lower() for field in SEARCH_FIELDS)]
+
+
+def best_of(func, repeat: int = 20) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rows = make_rows(count)
+
+    start = time.perf_counter()
+    index = SearchIndex()
+    for row in rows:
+        index.add(row['id'], row)
+    print(f"记录数: {count}，建索引 {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    # 前一个为区分度高的关键词，其余为命中大量记录的宽泛关键词（耗时与命中数成正比）；
+    # "首页" 为分页时只取相关度最高的12条（SearchIndex.top）
+    for keyword in ["第4242题", "\\sqrt", "微分方程", "级数", "计算"]:
+        ranked = index.search(keyword)
+        assert sorted(ranked) == scan(rows, keyword), f"结果不一致: {keyword}"
+        assert index.top(keyword, 12) == (ranked[:12], len(ranked)), f"首页不一致: {keyword}"
+        index_time = best_of(lambda: index.search(keyword))
+        top_time = best_of(lambda: index.top(keyword, 12))
+        scan_time = best_of(lambda: scan(rows, keyword), repeat=3)
+        print(f"{keyword:>10}  命中 {len(ranked):6d}  索引 {index_time * 1000:8.3f} ms  "
+              f"首页 {top_time * 1000:8.3f} ms  扫描 {scan_time * 1000:8.1f} ms")
+    print("结果一致: OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+变更记录模块
+在内存中保留最近若干条 (数据版本号, 错题ID, 操作)，客户端按版本号增量同步；
+超出保留范围的请求返回需要全量同步的标记。
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+import os
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# 变更的三种操作，与变更日志中的 op 一致
+CHANGE_OPS = ('create', 'update', 'delete')
+
+
+class ChangeLog:
+    """有界的内存变更记录
+
+    记录本身不加锁，由数据管理器在自己的锁内调用。
+    """
+
+    def __init__(self, max_entries: int = None):
+        """初始化空记录
+
+        Args:
+            max_entries: 最多保留的变更条数，默认读取环境变量 CHANGE_LOG_SIZE
+        """
+        self.max_entries = max_entries or int(os.getenv("CHANGE_LOG_SIZE", 10000))
+        self._entries: deque = deque()     # (数据版本号, 错题ID, 操作)，版本号递增
+        self._floor = 0                    # since 小于此版本号时，其后的部分变更已不在记录中
+
+    def record(self, version: int, mistake_id: str, op: str):
+        """记录一条变更，超出容量时丢弃最早的变更"""
+        self._entries.append((version, mistake_id, op))
+        if len(self._entries) > self.max_entries:
+            self._floor = self._entries.popleft()[0]
+
+    def reset(self, version: int):
+        """清空记录，此后 since 小于 version 的请求只能全量同步（数据管理器加载完成时调用）"""
+        self._entries.clear()
+        self._floor = version
+
+    def since(self, version: int) -> Optional[List[Tuple[str, str, int]]]:
+        """返回版本号大于 version 的变更，同一错题合并为一条 (错题ID, 操作, 最后变更的版本号)
+
+        合并规则：期间创建又删除的错题不返回；期间创建的为 create；最后被删除的为 delete；其余为 update。
+        结果按最后变更的版本号排列。version 早于保留范围时返回None，表示需要全量同步。
+        """
+        if version < self._floor:
+            return None
+
+        entries = list(self._entries)
+        start = bisect_right([entry[0] for entry in entries], version)
+        merged: Dict[str, Tuple[str, int]] = {}   # 错题ID -> (首次操作, 最后操作)
+        last_version: Dict[str, int] = {}
+        for entry_version, mistake_id, op in entries[start:]:
+            first_op = merged[mistake_id][0] if mistake_id in merged else op
+            merged[mistake_id] = (first_op, op)
+            last_version.pop(mistake_id, None)
+            last_version[mistake_id] = entry_version
+
+        changes = []
+        for mistake_id, entry_version in last_version.items():
+            first_op, last_op = merged[mistake_id]
+            if last_op == 'delete':
+                if first_op == 'create':
+                    continue
+                op = 'delete'
+            else:
+                op = 'create' if first_op == 'create' else 'update'
+            changes.append((mistake_id, op, entry_version))
+        return changes
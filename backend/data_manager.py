@@ -5,19 +5,31 @@ GitHub ID: error-T-T
 学校邮箱: RookieT@e.gzhu.edu.cn
 """
 
+import base64
 import csv
+import hashlib
 import os
+import shutil
+import threading
 import pandas as pd
-from typing import List, Optional, Dict, Any
+from itertools import compress, islice
+from typing import Iterable, List, Optional, Dict, Any, Tuple, Union
 from datetime import datetime
 import uuid
 import json
 from data_models import MistakeCreate, MistakeResponse, MistakeUpdate, DifficultyLevel, QuestionType, AnalysisResponse
+from analysis_store import AnalysisStore, is_analysis_ref
+from search_index import SearchIndex, TagIndex, TOP_K_MAX
+from sorted_index import SortedIndex, SortKey
+from stats_counters import StatsCounters
+from rollups import TrendRollups, HeatmapCube
+from change_feed import ChangeLog
+from query_cache import QueryCache, filter_key
 
-def safe_safe_print(text: str):
+def safe_print(text: str):
     """安全打印函数，处理Windows控制台编码问题"""
     try:
-        safe_print(text)
+        print(text)
     except UnicodeEncodeError:
         # 如果标准打印失败，尝试直接写入stdout的buffer
         try:
@@ -27,142 +39,397 @@ def safe_safe_print(text: str):
         except:
             # 如果连buffer写入都失败，使用ASCII回退
             safe_text = text.encode('ascii', errors='replace').decode('ascii')
-            safe_print(safe_text)
+            print(safe_text)
+
+
+# 兼容旧名称（路由模块按此名称导入）
+safe_safe_print = safe_print
+
+# CSV文件列顺序
+CSV_COLUMNS = [
+    'id', 'question_content', 'wrong_process', 'wrong_answer',
+    'correct_answer', 'question_type', 'knowledge_tags',
+    'difficulty', 'source', 'notes', 'created_at', 'updated_at',
+    'analysis_result', 'analyzed_at'
+]
+
+# 读取CSV时的显式列类型
+CSV_DTYPES = {col: str for col in CSV_COLUMNS}
+CSV_DTYPES.update({'question_type': 'category', 'difficulty': 'category'})
 
 
 class CSVDataManager:
-    """CSV数据管理器"""
+    """CSV数据管理器
+
+    启动时将CSV一次性加载为常驻内存的记录表（按ID索引的字典），读操作直接查内存。
+    写操作（创建/更新/删除）只向变更日志追加一行，写入耗时与数据量无关；
+    日志超过阈值后由后台线程合并回CSV快照。CSV快照加变更日志共同构成持久化数据。
+    """
+
+    def __init__(self, file_path: str = "data/mistakes.csv", compact_threshold: int = None):
+        """初始化数据管理器
 
-    def __init__(self, file_path: str = "data/mistakes.csv"):
-        """初始化数据管理器"""
+        Args:
+            file_path: CSV快照文件路径，变更日志为同名的 .log 文件
+            compact_threshold: 变更日志触发合并的字节数，默认读取环境变量 MISTAKE_LOG_COMPACT_BYTES
+        """
         self.file_path = file_path
+        self.log_path = os.path.splitext(file_path)[0] + ".log"
+        self.compact_threshold = compact_threshold or int(os.getenv("MISTAKE_LOG_COMPACT_BYTES", 8 * 1024 * 1024))
+        # id -> CSV原始行（字段均为字符串，缺失值为空串），保持文件顺序。
+        # 记录只整体替换、不原地修改，合并线程可以安全地读取快照。
+        self._records: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.RLock()
+        # 关键词与知识标签的倒排索引，随每条变更增量维护
+        self._search_index = SearchIndex()
+        self._tag_index = TagIndex()
+        # 各排序字段按 (排序值, id) 排列的有序索引，用于排序分页和游标分页
+        self._sort_indexes = {field: SortedIndex(value) for field, value in _SORT_VALUES.items()}
+        # 题型、难度计数，统计接口直接读取
+        self._stats = StatsCounters()
+        # 按天/周/月分桶的录入、分析与复习计数，趋势接口直接读取
+        self._rollups = TrendRollups()
+        # 知识标签×难度×题型×时间桶的错题数，热力图接口直接读取
+        self._heatmap = HeatmapCube()
+        # 数据版本号：每应用一条变更加一，派生结果（如热力图）按版本号缓存。
+        # 版本号每次启动从0开始，与实例标识一起才能唯一确定数据状态（用于HTTP ETag）
+        self._data_version = 0
+        self.instance_id = uuid.uuid4().hex[:12]
+        # 最近的变更（版本号, 错题ID, 操作），供客户端增量同步
+        self._changes = ChangeLog()
+        # 带筛选条件的查询结果，同一筛选条件翻页时直接复用
+        self.query_cache = QueryCache()
+        self._log_file = None
+        self._compacting = False
+        self._compact_lock = threading.Lock()
+        self._compaction_thread: Optional[threading.Thread] = None
         self._ensure_data_directory()
+        # 分析结果存放在同目录的 analyses/ 下，主表 analysis_result 列只保存引用
+        self.analysis_store = AnalysisStore(os.path.join(os.path.dirname(self.file_path) or ".", "analyses"))
+        # 被新分析结果替换或随错题删除的 (错题ID, 引用)，合并日志时才删除文件，见 _collect_analyses
+        self._garbage: List[Tuple[str, str]] = []
         self._ensure_file_exists()
+        self._load_records()
 
     def _ensure_data_directory(self):
         """确保数据目录存在"""
-        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
 
     def _ensure_file_exists(self):
         """确保CSV文件存在，并创建表头"""
         if not os.path.exists(self.file_path):
             with open(self.file_path, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
-                writer.writerow([
-                    'id', 'question_content', 'wrong_process', 'wrong_answer',
-                    'correct_answer', 'question_type', 'knowledge_tags',
-                    'difficulty', 'source', 'notes', 'created_at', 'updated_at',
-                    'analysis_result'
-                ])
+                writer.writerow(CSV_COLUMNS)
             safe_print(f"[FILE] 创建了新的数据文件: {self.file_path}")
 
-    def create_mistake(self, mistake: MistakeCreate) -> str:
-        """创建新的错题记录"""
-        mistake_id = str(uuid.uuid4())[:8]  # 生成8位ID
-        created_at = datetime.now().isoformat()
-        updated_at = created_at
-
-        # 准备数据行
-        row = [
-            mistake_id,
-            mistake.question_content,
-            mistake.wrong_process,
-            mistake.wrong_answer,
-            mistake.correct_answer,
-            mistake.question_type.value,
-            ','.join(mistake.knowledge_tags),
-            mistake.difficulty.value,
-            mistake.source or '',
-            mistake.notes or '',
-            created_at,
-            updated_at,
-            ''  # analysis_result 初始为空
-        ]
-
-        # 写入CSV
-        with open(self.file_path, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(row)
+    def _read_csv(self) -> pd.DataFrame:
+        """按显式列类型读取CSV快照，忽略未知列，旧版本文件缺少的列补为空串
 
-        safe_print(f"[OK] 创建了错题记录: {mistake_id}")
-        return mistake_id
+        文本列一律按字符串读取（避免"01"被推断为整数），
+        difficulty/question_type 读为分类类型，同一取值在所有行间共享同一个字符串对象。
+        """
+        df = pd.read_csv(
+            self.file_path,
+            usecols=lambda col: col in CSV_DTYPES,
+            dtype=CSV_DTYPES,
+            keep_default_na=False
+        )
+        return df.reindex(columns=CSV_COLUMNS, fill_value='')
 
-    def get_mistake(self, mistake_id: str) -> Optional[MistakeResponse]:
-        """根据ID获取错题记录"""
-        try:
-            df = pd.read_csv(self.file_path)
-            row = df[df['id'] == mistake_id]
+    def _load_records(self):
+        """加载CSV快照并重放变更日志（仅在启动时执行一次）"""
+        df = self._read_csv()
 
-            if row.empty:
-                return None
+        records: Dict[str, Dict[str, str]] = {}
+        for row in df.to_dict('records'):
+            # 与旧实现保持一致：ID重复时以文件中第一条为准
+            records.setdefault(str(row['id']), row)
+        self._records = records
+        for mistake_id, row in records.items():
+            self._search_index.add(mistake_id, row)
+            self._tag_index.add(mistake_id, row)
+        for index in self._sort_indexes.values():
+            index.rebuild(records.items())
+        self._stats.reset(records.values())
+        self._rollups.reset(records.values())
+        self._heatmap.reset(records.values())
 
-            # 转换为MistakeResponse对象
-            return self._row_to_mistake_response(row.iloc[0])
-        except Exception as e:
-            safe_print(f"[ERROR] 获取错题失败: {e}")
-            return None
+        # 先重放上次合并中断时遗留的旧日志，再重放当前日志（重放是幂等的）
+        replayed = 0
+        for path in (f"{self.log_path}.old", self.log_path):
+            replayed += self._replay_log(path)
 
-    def get_all_mistakes(self) -> List[MistakeResponse]:
-        """获取所有错题记录"""
-        try:
-            df = pd.read_csv(self.file_path)
-            if df.empty:
-                return []
+        self._externalize_inline_analyses()
+        # 启动时已有的数据不算变更，早于此版本号的客户端须全量同步
+        self._changes.reset(self._data_version)
 
-            mistakes = []
-            for _, row in df.iterrows():
-                mistake = self._row_to_mistake_response(row)
-                if mistake:
-                    mistakes.append(mistake)
+        safe_print(f"[FILE] 已加载 {len(self._records)} 条错题记录: {self.file_path}（重放 {replayed} 条变更）")
 
-            return mistakes
-        except Exception as e:
-            safe_print(f"[ERROR] 获取所有错题失败: {e}")
-            return []
+    def _externalize_inline_analyses(self):
+        """将旧数据中内嵌在主表里的分析结果迁移到分析结果存储
 
-    def update_mistake(self, mistake_id: str, update: MistakeUpdate) -> bool:
-        """更新错题记录"""
-        try:
-            df = pd.read_csv(self.file_path)
+        迁移以变更日志的方式记录，下次合并后CSV快照中只剩引用；
+        迁移中途崩溃时重启会再次执行，内容寻址的写入是幂等的。
+        """
+        entries = []
+        for mistake_id, row in self._records.items():
+            raw_analysis = row['analysis_result']
+            if raw_analysis.strip() and not is_analysis_ref(raw_analysis):
+                ref = self.analysis_store.put(mistake_id, raw_analysis)
+                entries.append({'op': 'update', 'id': mistake_id, 'changes': {'analysis_result': ref}})
+
+        if entries:
+            self._append_log(entries)
+            safe_print(f"[FILE] 已将 {len(entries)} 条内嵌分析结果迁移到: {self.analysis_store.root_dir}")
+
+    def _resolve_analyses(self, rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """将行中的分析结果引用替换为分析结果JSON（返回新行，不修改内存记录）"""
+        resolved = []
+        for row in rows:
+            ref = row['analysis_result']
+            if is_analysis_ref(ref):
+                row = {**row, 'analysis_result': self.analysis_store.get(row['id'], ref) or ''}
+            resolved.append(row)
+        return resolved
+
+    def _replay_log(self, path: str) -> int:
+        """将变更日志中的操作依次应用到内存记录"""
+        if not os.path.exists(path):
+            return 0
+
+        count = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程崩溃时最后一行可能只写了一半，忽略即可
+                    safe_print(f"[WARN] 跳过损坏的变更日志行: {line[:50]}...")
+                    continue
+                self._apply_entry(entry)
+                count += 1
+        return count
+
+    def _apply_entry(self, entry: Dict[str, Any]):
+        """将一条变更应用到内存记录"""
+        op = entry['op']
+        mistake_id = entry['id']
+        self._data_version += 1
+        if op == 'create':
+            if mistake_id in self._records:
+                self._stats.remove(self._records[mistake_id])
+                self._rollups.add_row(self._records[mistake_id], -1)
+                self._heatmap.add_row(self._records[mistake_id], -1)
+            self._records[mistake_id] = entry['row']
+            self._stats.add(entry['row'])
+            self._rollups.add_row(entry['row'])
+            self._heatmap.add_row(entry['row'])
+            self._changes.record(self._data_version, mistake_id, 'create')
+            self._search_index.add(mistake_id, entry['row'])
+            self._tag_index.add(mistake_id, entry['row'])
+            for index in self._sort_indexes.values():
+                index.add(mistake_id, entry['row'])
+        elif op == 'update':
+            old_row = self._records.get(mistake_id)
+            if old_row is not None:
+                row = self._records[mistake_id] = {**old_row, **entry['changes']}
+                self._stats.replace(old_row, row)
+                self._rollups.replace_row(old_row, row)
+                self._heatmap.replace_row(old_row, row)
+                self._changes.record(self._data_version, mistake_id, 'update')
+                self._search_index.add(mistake_id, row)
+                self._tag_index.add(mistake_id, row)
+                for index in self._sort_indexes.values():
+                    index.add(mistake_id, row)
+        elif op == 'delete':
+            row = self._records.pop(mistake_id, None)
+            if row is not None:
+                self._stats.remove(row)
+                self._rollups.add_row(row, -1)
+                self._heatmap.add_row(row, -1)
+                self._changes.record(self._data_version, mistake_id, 'delete')
+                self._search_index.remove(mistake_id)
+                self._tag_index.remove(mistake_id)
+                for index in self._sort_indexes.values():
+                    index.remove(mistake_id)
+
+    def _append_log(self, entries: List[Dict[str, Any]]):
+        """向变更日志追加记录，写入成功后再修改内存"""
+        if self._log_file is None:
+            self._log_file = open(self.log_path, 'a', encoding='utf-8')
+        self._log_file.write(''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in entries))
+        self._log_file.flush()
+
+        for entry in entries:
+            self._apply_entry(entry)
+
+        if self._log_file.tell() >= self.compact_threshold and not self._compacting:
+            self._compacting = True
+            self._compaction_thread = threading.Thread(
+                target=self.compact, name="mistake-log-compaction", daemon=True
+            )
+            self._compaction_thread.start()
 
-            if mistake_id not in df['id'].values:
-                return False
+    def compact(self):
+        """将变更日志合并回CSV快照
 
-            # 更新字段
-            idx = df[df['id'] == mistake_id].index[0]
+        持锁期间只做日志轮转和记录快照，耗时的CSV写入在锁外完成，不阻塞读写请求。
+        快照落盘后再清理不再被引用的分析结果文件。
+        """
+        old_log = f"{self.log_path}.old"
+        with self._compact_lock:
+            garbage: List[Tuple[str, str]] = []
+            try:
+                with self._lock:
+                    self._compacting = True
+                    if self._log_file is not None:
+                        self._log_file.close()
+                        self._log_file = None
+                    if os.path.exists(self.log_path):
+                        if os.path.exists(old_log):
+                            # 上次合并未完成（已在启动时重放），把当前日志接在旧日志之后
+                            with open(old_log, 'a', encoding='utf-8') as dst, \
+                                    open(self.log_path, 'r', encoding='utf-8') as src:
+                                shutil.copyfileobj(src, dst)
+                            os.remove(self.log_path)
+                        else:
+                            os.replace(self.log_path, old_log)
+                    rows = list(self._records.values())
+                    garbage, self._garbage = self._garbage, []
 
-            if update.question_content is not None:
-                df.at[idx, 'question_content'] = update.question_content
+                self._write_snapshot(rows)
+                if os.path.exists(old_log):
+                    os.remove(old_log)
+                safe_print(f"[FILE] 变更日志已合并到快照: {self.file_path}（{len(rows)} 条记录）")
+                self._collect_analyses(garbage)
+                garbage = []
+            except Exception as e:
+                safe_print(f"[ERROR] 合并变更日志失败: {e}")
+            finally:
+                if garbage:
+                    # 合并失败时留到下次合并再清理
+                    with self._lock:
+                        self._garbage = garbage + self._garbage
+                self._compacting = False
 
-            if update.wrong_process is not None:
-                df.at[idx, 'wrong_process'] = update.wrong_process
+    def _collect_analyses(self, garbage: List[Tuple[str, str]]):
+        """删除已不被任何记录引用的分析结果文件
 
-            if update.wrong_answer is not None:
-                df.at[idx, 'wrong_answer'] = update.wrong_answer
+        只在快照落盘之后执行，并先把当前变更日志也刷到磁盘：此时内存记录就是崩溃重启后会恢复的状态，
+        内存中不再引用的文件才能安全删除（同一分析结果可能又被写回，须逐条确认）。
+        推迟到合并时删除，也保证了读请求手中的旧记录仍能读到它引用的分析结果。
+        """
+        if not garbage:
+            return
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.flush()
+                os.fsync(self._log_file.fileno())
+            for mistake_id, ref in garbage:
+                row = self._records.get(mistake_id)
+                if row is None or row['analysis_result'] != ref:
+                    self.analysis_store.delete(mistake_id, ref)
 
-            if update.correct_answer is not None:
-                df.at[idx, 'correct_answer'] = update.correct_answer
+    def _write_snapshot(self, rows: List[Dict[str, str]]):
+        """将记录写为CSV快照（先写临时文件再原子替换）"""
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_COLUMNS)
+            for row in rows:
+                writer.writerow([row.get(col, '') for col in CSV_COLUMNS])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
 
-            if update.question_type is not None:
-                df.at[idx, 'question_type'] = update.question_type.value
+    def export_rows(self) -> List[Dict[str, str]]:
+        """返回当前全部原始记录（按文件顺序），用于迁移和导出"""
+        with self._lock:
+            return list(self._records.values())
 
-            if update.knowledge_tags is not None:
-                df.at[idx, 'knowledge_tags'] = ','.join(update.knowledge_tags)
+    def create_mistake(self, mistake: MistakeCreate) -> str:
+        """创建新的错题记录"""
+        with self._lock:
+            mistake_id = str(uuid.uuid4())[:8]  # 生成8位ID
+            while mistake_id in self._records:
+                mistake_id = str(uuid.uuid4())[:8]
+            row = mistake_to_row(mistake_id, mistake, datetime.now().isoformat())
+            self._append_log([{'op': 'create', 'id': mistake_id, 'row': row}])
 
-            if update.difficulty is not None:
-                df.at[idx, 'difficulty'] = update.difficulty.value
+        safe_print(f"[OK] 创建了错题记录: {mistake_id}")
+        return mistake_id
+
+    def create_mistakes(self, mistakes: List[MistakeCreate]) -> Tuple[List[Optional[str]], Dict[int, str]]:
+        """批量创建错题记录
 
-            if update.source is not None:
-                df.at[idx, 'source'] = update.source
+        所有记录在一次日志写入中落盘；单条记录转换失败不影响其他记录。
 
-            if update.notes is not None:
-                df.at[idx, 'notes'] = update.notes
+        Returns:
+            Tuple[List[Optional[str]], Dict[int, str]]: 与输入一一对应的ID列表（失败为None），
+            以及失败记录的下标到错误信息的映射
+        """
+        ids: List[Optional[str]] = []
+        errors: Dict[int, str] = {}
+        with self._lock:
+            created_at = datetime.now().isoformat()
+            entries = []
+            reserved = set()
+            for idx, mistake in enumerate(mistakes):
+                try:
+                    mistake_id = str(uuid.uuid4())[:8]  # 生成8位ID
+                    while mistake_id in self._records or mistake_id in reserved:
+                        mistake_id = str(uuid.uuid4())[:8]
+                    row = mistake_to_row(mistake_id, mistake, created_at)
+                except Exception as e:
+                    ids.append(None)
+                    errors[idx] = str(e)
+                    continue
+                reserved.add(mistake_id)
+                ids.append(mistake_id)
+                entries.append({'op': 'create', 'id': mistake_id, 'row': row})
 
-            # 更新更新时间
-            df.at[idx, 'updated_at'] = datetime.now().isoformat()
+            if entries:
+                self._append_log(entries)
 
-            # 保存回CSV
-            df.to_csv(self.file_path, index=False)
+        safe_print(f"[OK] 批量创建了 {len(entries)} 条错题记录（失败 {len(errors)} 条）")
+        return ids, errors
+
+    def record_version(self, mistake_id: str) -> Optional[str]:
+        """单条记录的版本（最后更新时间），记录不存在时返回None"""
+        row = self._records.get(mistake_id)
+        return None if row is None else row.get('updated_at', '')
+
+    def get_mistake(self, mistake_id: str) -> Optional[MistakeResponse]:
+        """根据ID获取错题记录"""
+        row = self._records.get(mistake_id)
+        if row is None:
+            return None
+        return self._row_to_mistake_response(self._resolve_analyses([row])[0])
+
+    def get_tags(self, mistake_id: str) -> Optional[List[str]]:
+        """从标签索引读取错题的知识标签（不解析分析结果），记录不存在时返回None"""
+        with self._lock:
+            if mistake_id not in self._records:
+                return None
+            return list(self._tag_index.tags(mistake_id))
+
+    def get_all_mistakes(self, fields: List[str] = None) -> List[MistakeResponse]:
+        """获取所有错题记录，fields 指定时只返回这些字段"""
+        fields = normalize_fields(fields)
+        with self._lock:
+            rows = list(self._records.values())
+        if fields is None or 'analysis_result' in fields:
+            rows = self._resolve_analyses(rows)
+        return rows_to_mistake_responses(rows, fields)
+
+    def update_mistake(self, mistake_id: str, update: MistakeUpdate) -> bool:
+        """更新错题记录"""
+        try:
+            with self._lock:
+                if mistake_id not in self._records:
+                    return False
+                self._apply_changes(mistake_id, update_to_changes(update))
 
             safe_print(f"[OK] 更新了错题记录: {mistake_id}")
             return True
@@ -173,16 +440,13 @@ class CSVDataManager:
     def delete_mistake(self, mistake_id: str) -> bool:
         """删除错题记录"""
         try:
-            df = pd.read_csv(self.file_path)
-
-            if mistake_id not in df['id'].values:
-                return False
-
-            # 删除行
-            df = df[df['id'] != mistake_id]
-
-            # 保存回CSV
-            df.to_csv(self.file_path, index=False)
+            with self._lock:
+                row = self._records.get(mistake_id)
+                if row is None:
+                    return False
+                self._append_log([{'op': 'delete', 'id': mistake_id}])
+                if is_analysis_ref(row['analysis_result']):
+                    self._garbage.append((mistake_id, row['analysis_result']))
 
             safe_print(f"[OK] 删除了错题记录: {mistake_id}")
             return True
@@ -190,35 +454,26 @@ class CSVDataManager:
             safe_print(f"[ERROR] 删除错题失败: {e}")
             return False
 
-    def update_mistake_analysis(self, mistake_id: str, analysis: AnalysisResponse) -> bool:
-        """更新错题的分析结果"""
+    def update_mistake_analysis(self, mistake_id: str, analysis: AnalysisResponse,
+                                input_hash: str = None, model: str = None) -> bool:
+        """更新错题的分析结果，input_hash 与 model 随分析结果一起保存"""
         try:
-            df = pd.read_csv(self.file_path)
-
-            if mistake_id not in df['id'].values:
-                return False
-
-            idx = df[df['id'] == mistake_id].index[0]
-
-            # 将分析结果转换为JSON字符串
-            analysis_dict = {
-                "mistake_id": analysis.mistake_id,
-                "error_type": analysis.error_type,
-                "root_cause": analysis.root_cause,
-                "knowledge_gap": analysis.knowledge_gap,
-                "learning_suggestions": analysis.learning_suggestions,
-                "similar_examples": analysis.similar_examples,
-                "confidence_score": analysis.confidence_score
-            }
-            analysis_json = json.dumps(analysis_dict, ensure_ascii=False)
-
-            # 更新分析结果字段
-            df.at[idx, 'analysis_result'] = analysis_json
-            # 更新更新时间
-            df.at[idx, 'updated_at'] = datetime.now().isoformat()
+            with self._lock:
+                row = self._records.get(mistake_id)
+                if row is None:
+                    return False
 
-            # 保存回CSV
-            df.to_csv(self.file_path, index=False)
+                # 分析结果写入独立的小文件，主表变更日志中只记录引用
+                ref = self.analysis_store.put(mistake_id, analysis_to_json(analysis, input_hash, model))
+                now = datetime.now().isoformat()
+                self._apply_changes(mistake_id, {
+                    'analysis_result': ref,
+                    'updated_at': now,
+                    'analyzed_at': now
+                })
+                old_ref = row['analysis_result']
+                if is_analysis_ref(old_ref) and old_ref != ref:
+                    self._garbage.append((mistake_id, old_ref))
 
             safe_print(f"[OK] 更新了错题分析结果: {mistake_id}")
             return True
@@ -226,131 +481,581 @@ class CSVDataManager:
             safe_print(f"[ERROR] 更新错题分析结果失败: {e}")
             return False
 
+    def _apply_changes(self, mistake_id: str, changes: Dict[str, str]):
+        """以变更日志记录的方式修改一条记录"""
+        self._append_log([{'op': 'update', 'id': mistake_id, 'changes': changes}])
+
+    def _filter_rows(self, keyword: str = None, tags: List[str] = None,
+                     difficulty: DifficultyLevel = None, question_type: QuestionType = None,
+                     tag_match: str = "any") -> List[Dict[str, str]]:
+        """按条件筛选原始记录：有关键词时按相关度排序，否则按文件顺序"""
+        with self._lock:
+            if keyword:
+                # 通过倒排索引查找，结果按相关度排序
+                ids = self._search_index.search(keyword)
+                if tags:
+                    tagged = set(self._tag_index.match(tags, tag_match))
+                    ids = [mistake_id for mistake_id in ids if mistake_id in tagged]
+            elif tags:
+                ids = self._tag_index.match(tags, tag_match)
+            else:
+                ids = None
+            rows = list(self._records.values()) if ids is None else [self._records[i] for i in ids]
+
+        # 应用其余筛选条件
+        if difficulty:
+            rows = [row for row in rows if row['difficulty'] == difficulty.value]
+
+        if question_type:
+            rows = [row for row in rows if row['question_type'] == question_type.value]
+
+        return rows
+
+    def _match(self, keyword: str = None, tags: List[str] = None,
+               difficulty: DifficultyLevel = None, question_type: QuestionType = None,
+               tag_match: str = "any", sort: str = None) -> Union[List[str], SortedIndex]:
+        """筛选结果：未指定排序时为按默认顺序排列的错题ID，否则为匹配记录按排序字段建立的有序索引
+
+        结果按 (筛选条件, 排序字段, 数据版本号) 缓存，同一筛选条件翻页时不再重新筛选和排序。
+        """
+        def compute():
+            rows = self._filter_rows(keyword, tags, difficulty, question_type, tag_match)
+            if sort is None:
+                return [row['id'] for row in rows]
+            index = SortedIndex(_SORT_VALUES[sort])
+            index.rebuild((row['id'], row) for row in rows)
+            return index
+
+        key = filter_key(keyword, tags, difficulty, question_type, tag_match, sort)
+        return self.query_cache.get_or_compute(key, self._data_version, compute)
+
+    def _search_top(self, keyword: str, k: int) -> Tuple[List[str], int]:
+        """关键词相关度最高的 k 条错题ID及命中总数，按 (关键词, k, 数据版本号) 缓存"""
+        def compute():
+            with self._lock:
+                return self._search_index.top(keyword, k)
+
+        key = ('top', k, *filter_key(keyword, None, None, None, "any", None))
+        return self.query_cache.get_or_compute(key, self._data_version, compute)
+
+    def _rows_by_ids(self, ids: Iterable[str]) -> List[Dict[str, str]]:
+        """按ID取出原始记录（跳过查询结果缓存之后被删除的记录）"""
+        with self._lock:
+            return [self._records[i] for i in ids if i in self._records]
+
+    def _to_responses(self, rows: List[Dict[str, str]], fields: List[str] = None) -> List[MistakeResponse]:
+        """批量转换为响应对象，只有请求了完整分析结果时才读取分析结果文件"""
+        if fields is None or 'analysis_result' in fields:
+            rows = self._resolve_analyses(rows)
+        return rows_to_mistake_responses(rows, fields)
+
     def search_mistakes(self, keyword: str = None, tags: List[str] = None,
-                        difficulty: DifficultyLevel = None, question_type: QuestionType = None) -> List[MistakeResponse]:
-        """搜索错题记录"""
+                        difficulty: DifficultyLevel = None, question_type: QuestionType = None,
+                        fields: List[str] = None, tag_match: str = "any") -> List[MistakeResponse]:
+        """搜索错题记录
+
+        Args:
+            tags: 知识标签，按完整名称精确匹配
+            fields: 指定时只返回这些字段
+            tag_match: "any" 含任一标签即匹配，"all" 须包含全部标签
+        """
+        fields = normalize_fields(fields)
         try:
-            df = pd.read_csv(self.file_path)
+            if not (keyword or tags or difficulty or question_type):
+                return self._to_responses(self.export_rows(), fields)
+            ids = self._match(keyword, tags, difficulty, question_type, tag_match)
+            return self._to_responses(self._rows_by_ids(ids), fields)
+        except Exception as e:
+            safe_print(f"[ERROR] 搜索错题失败: {e}")
+            return []
 
-            if df.empty:
-                return []
+    def query_mistakes(self, keyword: str = None, tags: List[str] = None,
+                       difficulty: DifficultyLevel = None, question_type: QuestionType = None,
+                       fields: List[str] = None, tag_match: str = "any",
+                       offset: int = 0, limit: int = None,
+                       sort: str = None, descending: bool = False) -> Tuple[List[MistakeResponse], int]:
+        """分页搜索错题记录，只把当前页转换为响应对象
 
-            # 应用筛选条件
-            if keyword:
-                mask = (df['question_content'].str.contains(keyword, case=False, na=False) |
-                       df['wrong_process'].str.contains(keyword, case=False, na=False) |
-                       df['notes'].str.contains(keyword, case=False, na=False))
-                df = df[mask]
-
-            if tags:
-                mask = df['knowledge_tags'].apply(
-                    lambda x: any(tag in str(x) for tag in tags)
-                )
-                df = df[mask]
-
-            if difficulty:
-                df = df[df['difficulty'] == difficulty.value]
-
-            if question_type:
-                df = df[df['question_type'] == question_type.value]
-
-            # 转换为响应对象
-            mistakes = []
-            for _, row in df.iterrows():
-                mistake = self._row_to_mistake_response(row)
-                if mistake:
-                    mistakes.append(mistake)
-
-            return mistakes
+        Args:
+            offset: 跳过的记录数
+            limit: 最多返回的记录数，None表示不限制
+            sort: 排序字段（见 SORT_FIELDS），按 (排序值, id) 排序；None表示默认顺序（有关键词时按相关度，否则按文件顺序）
+            descending: 是否降序
+
+        Returns:
+            Tuple[List[MistakeResponse], int]: 当前页记录，以及匹配的记录总数
+
+        Raises:
+            ValueError: 字段或排序字段不受支持
+        """
+        fields = normalize_fields(fields)
+        key = sort_key(sort)
+        end = None if limit is None else offset + limit
+        try:
+            if not (keyword or tags or difficulty or question_type):
+                # 没有筛选条件：直接从有序索引（或按文件顺序）取出当前页，O(log N + 页大小)
+                with self._lock:
+                    total = len(self._records)
+                    if key is None:
+                        rows = list(islice(self._records.values(), offset, end))
+                    else:
+                        ids = self._sort_indexes[sort].slice(offset, limit, descending)
+                        rows = [self._records[i] for i in ids]
+                return self._to_responses(rows, fields), total
+
+            if keyword and not (tags or difficulty or question_type) and key is None \
+                    and end is not None and end <= TOP_K_MAX:
+                # 只按关键词相关度翻前几页：部分排序取前 end 条，不对全部命中排序
+                top_ids, total = self._search_top(keyword, end)
+                return self._to_responses(self._rows_by_ids(top_ids[offset:]), fields), total
+
+            matched = self._match(keyword, tags, difficulty, question_type, tag_match, sort)
+            if key is None:
+                page_ids = matched[offset:end]
+            else:
+                page_ids = matched.slice(offset, limit, descending)
+            return self._to_responses(self._rows_by_ids(page_ids), fields), len(matched)
         except Exception as e:
             safe_print(f"[ERROR] 搜索错题失败: {e}")
-            return []
+            return [], 0
+
+    def query_mistakes_after(self, cursor: Optional[SortKey] = None, limit: int = 12,
+                             keyword: str = None, tags: List[str] = None,
+                             difficulty: DifficultyLevel = None, question_type: QuestionType = None,
+                             fields: List[str] = None, tag_match: str = "any",
+                             sort: str = 'created_at',
+                             descending: bool = False) -> Tuple[List[MistakeResponse], int, Optional[SortKey]]:
+        """游标（keyset）分页：按 (排序值, id) 顺序返回排在游标之后的记录
+
+        没有筛选条件时直接从有序索引中定位，耗时与翻到第几页无关；
+        新插入的记录不会使后续页面的内容错位。
+
+        Returns:
+            Tuple[List[MistakeResponse], int, Optional[SortKey]]: 当前页记录、匹配的记录总数，
+            以及下一页的游标（没有更多记录时为None）
+
+        Raises:
+            ValueError: 字段或排序字段不受支持
+        """
+        fields = normalize_fields(fields)
+        sort_key(sort)  # 校验排序字段
+        filtered = keyword or tags or difficulty or question_type
+        if filtered:
+            # 带筛选条件：匹配结果的有序索引按筛选条件缓存
+            index = self._match(keyword, tags, difficulty, question_type, tag_match, sort)
+        else:
+            index = self._sort_indexes[sort]
+        with self._lock:
+            total = len(index) if filtered else len(self._records)
+            # 多取一条判断是否还有下一页
+            ids = index.after(cursor, limit + 1, descending)
+            next_cursor = index.key_of(ids[limit - 1]) if len(ids) > limit else None
+        return self._to_responses(self._rows_by_ids(ids[:limit]), fields), total, next_cursor
 
     def get_statistics(self) -> Dict[str, Any]:
-        """获取统计信息"""
+        """获取统计信息
+
+        读取增量维护的计数器和标签倒排表，耗时与错题总数无关；
+        距上次全量重算超过间隔时在后台线程重算一次。
+        """
         try:
-            df = pd.read_csv(self.file_path)
-
-            if df.empty:
-                return {
-                    "total_mistakes": 0,
-                    "mistakes_by_type": {},
-                    "mistakes_by_difficulty": {},
-                    "top_knowledge_gaps": [],
-                    "accuracy_trend": []
-                }
-
-            # 基础统计
-            stats = {
-                "total_mistakes": len(df),
-                "mistakes_by_type": df['question_type'].value_counts().to_dict(),
-                "mistakes_by_difficulty": df['difficulty'].value_counts().to_dict()
-            }
-
-            # 分析知识标签
-            all_tags = []
-            for tags in df['knowledge_tags']:
-                if pd.notna(tags):
-                    all_tags.extend([tag.strip() for tag in str(tags).split(',')])
-
-            from collections import Counter
-            tag_counts = Counter(all_tags)
-            stats["top_knowledge_gaps"] = [tag for tag, _ in tag_counts.most_common(5)]
-
-            # 简单正确率趋势（示例）
-            stats["accuracy_trend"] = [0.7, 0.75, 0.8, 0.85, 0.9]  # 示例数据
+            with self._lock:
+                stats = self._stats.snapshot()
+                top_tags = self._tag_index.most_common(5)
+
+            if self._stats.claim_recount():
+                threading.Thread(target=self._recount_statistics, name="mistake-stats-recount", daemon=True).start()
+
+            if not stats["total_mistakes"]:
+                stats.update(top_knowledge_gaps=[], accuracy_trend=[])
+                return stats
+
+            # 知识标签直接取自标签倒排表
+            stats["top_knowledge_gaps"] = [tag for tag, _ in top_tags]
+
+            # 最近有复习记录的几周的正确率，尚无复习记录时为空
+            with self._lock:
+                stats["accuracy_trend"] = self._rollups.accuracy_trend()
 
             return stats
         except Exception as e:
             safe_print(f"[ERROR] 获取统计信息失败: {e}")
             return {}
 
-    def _row_to_mistake_response(self, row) -> Optional[MistakeResponse]:
-        """将CSV行转换为MistakeResponse对象"""
-        try:
-            # 解析知识标签
-            tags_str = row.get('knowledge_tags', '')
-            if pd.isna(tags_str):
-                tags = []
-            else:
-                tags = [tag.strip() for tag in str(tags_str).split(',') if tag.strip()]
+    def get_trend(self, granularity: str = 'day', window: int = 30) -> List[Dict[str, Any]]:
+        """按时间分桶的录入数、分析数、复习数与正确率（读取预先汇总的桶，耗时只与窗口大小有关）
 
-            # 解析分析结果（JSON字符串）
-            analysis_result = None
-            if 'analysis_result' in row and pd.notna(row['analysis_result']) and str(row['analysis_result']).strip():
-                try:
-                    analysis_result = json.loads(row['analysis_result'])
-                except json.JSONDecodeError:
-                    safe_safe_print(f"[WARN] 无法解析analysis_result JSON: {str(row['analysis_result'])[:50]}...")
-                    analysis_result = None
+        Raises:
+            ValueError: 不支持的时间粒度
+        """
+        with self._lock:
+            return self._rollups.series(granularity, window)
 
-            # 将 created_at / updated_at 统一转为 ISO 字符串，前端使用字符串更安全
-            created_at_raw = row['created_at']
-            updated_at_raw = row['updated_at']
-            try:
-                created_at = datetime.fromisoformat(str(created_at_raw)).isoformat()
-            except Exception:
-                created_at = datetime.now().isoformat()
-            try:
-                updated_at = datetime.fromisoformat(str(updated_at_raw)).isoformat()
-            except Exception:
-                updated_at = datetime.now().isoformat()
-
-            return MistakeResponse(
-                id=str(row['id']),
-                question_content=str(row['question_content']),
-                wrong_process=str(row['wrong_process']),
-                wrong_answer=str(row['wrong_answer']),
-                correct_answer=str(row['correct_answer']),
-                question_type=QuestionType(str(row['question_type'])),
-                knowledge_tags=tags,
-                difficulty=DifficultyLevel(str(row['difficulty'])),
-                source=str(row['source']) if 'source' in row and pd.notna(row['source']) else None,
-                notes=str(row['notes']) if 'notes' in row and pd.notna(row['notes']) else None,
-                created_at=created_at,
-                updated_at=updated_at,
-                analysis_result=analysis_result,
-            )
+    def get_heatmap(self, granularity: str = 'month', window: int = 12) -> Tuple[int, List[Dict[str, Any]]]:
+        """按 知识标签×难度×题型×时间桶 统计的错题数
+
+        读取增量维护的立方体；结果按数据版本号缓存，数据未变化时重复请求直接返回缓存。
+
+        Returns:
+            Tuple[int, List[Dict[str, Any]]]: 数据版本号与单元格，两者在同一次加锁中读取，保证相互对应
+
+        Raises:
+            ValueError: 不支持的时间粒度
+        """
+        with self._lock:
+            version = self._data_version
+            return version, self._heatmap.cached_cells(granularity, window, version)
+
+    def get_changes(self, since: int, fields: List[str] = None) -> Dict[str, Any]:
+        """数据版本号 since 之后创建、更新或删除的错题
+
+        Returns:
+            Dict: version 当前数据版本号；full_resync 为True时变更已超出保留范围（或 since 不属于本实例），
+                  客户端须全量同步；changes 为合并后的 (id, op, version) 列表；
+                  items 为其中仍存在的错题的当前内容
+        """
+        with self._lock:
+            version = self._data_version
+            changes = self._changes.since(since) if since <= version else None
+            rows = [] if changes is None else [self._records[i] for i, op, _ in changes if op != 'delete']
+        return {
+            'version': version,
+            'full_resync': changes is None,
+            'changes': [{'id': i, 'op': op, 'version': v} for i, op, v in changes or []],
+            'items': self._to_responses(rows, fields)
+        }
+
+    @property
+    def data_version(self) -> int:
+        """数据版本号，任何写操作（包括记录复习结果）后都会增大"""
+        return self._data_version
+
+    def record_review(self, timestamp: Union[str, datetime], correct: Union[bool, int], reviewed: int = 1):
+        """把复习（练习）结果计入趋势汇总：共 reviewed 次，其中 correct 次做对"""
+        self.record_reviews([(timestamp, correct, reviewed)])
+
+    def record_reviews(self, reviews: Iterable[Tuple[Union[str, datetime], Union[bool, int], int]]):
+        """批量计入复习结果 (时间, 做对次数, 复习次数)，整批只增加一次数据版本号"""
+        with self._lock:
+            self._data_version += 1
+            for timestamp, correct, reviewed in reviews:
+                self._rollups.add_review(timestamp, correct, reviewed)
+
+    def _recount_statistics(self):
+        """全量重算统计计数，纠正可能的漂移"""
+        try:
+            with self._lock:
+                drifted = self._stats.reset(self._records.values())
+            if drifted:
+                safe_print("[WARN] 统计计数与全量重算结果不一致，已校正")
         except Exception as e:
-            safe_safe_print(f"[ERROR] 转换错题数据失败: {e}")
-            return None
\ No newline at end of file
+            self._stats.release_recount()
+            safe_print(f"[ERROR] 重算统计信息失败: {e}")
+
+    def _row_to_mistake_response(self, row: Dict[str, str], fields: List[str] = None) -> Optional[MistakeResponse]:
+        """将CSV行转换为MistakeResponse对象"""
+        return row_to_mistake_response(row, fields)
+
+
+def _parse_tags(row: Dict[str, str]) -> List[str]:
+    """解析逗号分隔的知识标签"""
+    return [tag.strip() for tag in row.get('knowledge_tags', '').split(',') if tag.strip()]
+
+
+def _parse_analysis(raw_analysis: str) -> Optional[Dict[str, Any]]:
+    """解析分析结果（JSON字符串）"""
+    if not raw_analysis.strip():
+        return None
+    try:
+        return json.loads(raw_analysis)
+    except json.JSONDecodeError:
+        safe_print(f"[WARN] 无法解析analysis_result JSON: {raw_analysis[:50]}...")
+        return None
+
+
+def _parse_timestamp(value: str) -> datetime:
+    """解析ISO时间字符串，无法解析时使用当前时间"""
+    try:
+        return datetime.fromisoformat(value)
+    except Exception:
+        return datetime.now()
+
+
+# 各响应字段从原始行读取并转换的方式
+_FIELD_READERS = {
+    'id': lambda row: row['id'],
+    'question_content': lambda row: row['question_content'],
+    'wrong_process': lambda row: row['wrong_process'],
+    'wrong_answer': lambda row: row['wrong_answer'],
+    'correct_answer': lambda row: row['correct_answer'],
+    'question_type': lambda row: QuestionType(row['question_type']),
+    'knowledge_tags': _parse_tags,
+    'difficulty': lambda row: DifficultyLevel(row['difficulty']),
+    'source': lambda row: row['source'] or None,
+    'notes': lambda row: row['notes'] or None,
+    'created_at': lambda row: _parse_timestamp(row['created_at']),
+    'updated_at': lambda row: _parse_timestamp(row['updated_at']),
+    'analysis_result': lambda row: _parse_analysis(row.get('analysis_result', '')),
+    # 只判断是否为空，不解析JSON
+    'has_analysis': lambda row: bool(row.get('analysis_result', '').strip()),
+}
+
+# 列表接口可投影的字段
+MISTAKE_FIELDS = list(_FIELD_READERS)
+
+# 列表接口默认返回的字段：分析结果是最大的一列，只在详情中返回，列表用 has_analysis 概括
+LIST_FIELDS = [field for field in MISTAKE_FIELDS if field != 'analysis_result']
+
+
+def normalize_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+    """校验投影字段并去重，id 总是包含在内
+
+    Raises:
+        ValueError: 包含不存在的字段
+    """
+    if fields is None:
+        return None
+    unknown = [field for field in fields if field not in _FIELD_READERS]
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(unknown)}（可选: {', '.join(MISTAKE_FIELDS)}）")
+    return list(dict.fromkeys(['id', *fields]))
+
+
+def encode_cursor(key: SortKey, sort: str = 'created_at', descending: bool = False) -> str:
+    """将排序键编码为URL安全的分页游标（同时记录排序方式，防止换了排序后误用）"""
+    raw = json.dumps([sort, descending, *key], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str = 'created_at', descending: bool = False) -> Optional[SortKey]:
+    """解析分页游标，空字符串表示从第一页开始
+
+    Raises:
+        ValueError: 游标格式无效，或与当前排序方式不一致
+    """
+    if not cursor:
+        return None
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        value = None
+    if not (isinstance(value, list) and len(value) == 4 and isinstance(value[3], str)):
+        raise ValueError("无效的分页游标")
+    if value[:2] != [sort, descending]:
+        raise ValueError("分页游标与当前排序方式不一致")
+    # 排序值须与有序索引中的键同类型，否则定位游标时无法比较
+    if type(value[2]) is not _SORT_VALUE_TYPES.get(sort):
+        raise ValueError("无效的分页游标")
+    return tuple(value[2:])
+
+
+def row_to_mistake_response(row: Dict[str, str], fields: List[str] = None) -> Optional[MistakeResponse]:
+    """将一行原始记录（字段均为字符串）转换为MistakeResponse对象
+
+    Args:
+        row: 原始记录
+        fields: 需要返回的字段；为None时返回完整记录。
+            指定字段时只读取和转换这些字段（跳过如analysis_result的JSON解析），
+            返回的对象只包含这些字段，序列化时需配合 exclude_unset 使用
+    """
+    try:
+        if fields is None:
+            return MistakeResponse(**{field: read(row) for field, read in _FIELD_READERS.items()})
+        return _construct_trusted({field: _FIELD_READERS[field](row) for field in fields})
+    except Exception as e:
+        safe_print(f"[ERROR] 转换错题数据失败: {e}")
+        return None
+
+
+_QUESTION_TYPES = {t.value: t for t in QuestionType}
+_DIFFICULTY_LEVELS = {d.value: d for d in DifficultyLevel}
+
+# 可排序字段及其排序值；难度按 简单 < 中等 < 困难 < 专家 排序
+_DIFFICULTY_RANKS = {d.value: rank for rank, d in enumerate(DifficultyLevel)}
+_SORT_VALUES = {
+    'created_at': lambda row: row['created_at'],
+    'updated_at': lambda row: row['updated_at'],
+    'difficulty': lambda row: _DIFFICULTY_RANKS.get(row['difficulty'], len(_DIFFICULTY_RANKS)),
+}
+# 各排序字段排序值的类型，用于校验分页游标
+_SORT_VALUE_TYPES = {'created_at': str, 'updated_at': str, 'difficulty': int}
+SORT_FIELDS = tuple(_SORT_VALUES)
+
+
+def sort_key(sort: Optional[str]):
+    """返回原始行的排序键函数 row -> (排序值, id)，sort 为None时返回None
+
+    排序值相同的记录按 id 排序，与有序索引及游标的顺序一致。
+
+    Raises:
+        ValueError: 不支持的排序字段
+    """
+    if sort is None:
+        return None
+    if sort not in _SORT_VALUES:
+        raise ValueError(f"不支持的排序字段: {sort}（可选: {', '.join(SORT_FIELDS)}）")
+    value = _SORT_VALUES[sort]
+    return lambda row: (value(row), row['id'])
+
+
+def rows_to_mistake_responses(rows: List[Dict[str, str]], fields: List[str] = None) -> List[MistakeResponse]:
+    """批量将原始记录转换为MistakeResponse对象
+
+    按列而不是按行做规范化（枚举映射、标签拆分、时间解析、空串转None），
+    再直接构造响应对象，跳过逐行的pydantic校验。
+    结果与逐行调用 row_to_mistake_response 相同：无法转换的记录同样被跳过。
+    """
+    if not rows:
+        return []
+
+    fields = fields or MISTAKE_FIELDS
+
+    # 枚举字段非法的记录在逐行转换时会失败，这里同样剔除
+    enum_columns = {}
+    for field, mapping in (('question_type', _QUESTION_TYPES), ('difficulty', _DIFFICULTY_LEVELS)):
+        if field in fields:
+            enum_columns[field] = [mapping.get(row[field]) for row in rows]
+    if enum_columns:
+        valid = [all(values) for values in zip(*enum_columns.values())]
+        if not all(valid):
+            safe_print(f"[ERROR] 转换错题数据失败: {valid.count(False)} 条记录的题目类型或难度无效")
+            rows = list(compress(rows, valid))
+            enum_columns = {field: list(compress(values, valid)) for field, values in enum_columns.items()}
+
+    columns = []
+    for field in fields:
+        if field in enum_columns:
+            columns.append(enum_columns[field])
+        elif field == 'knowledge_tags':
+            columns.append([
+                [tag.strip() for tag in row[field].split(',') if tag.strip()]
+                for row in rows
+            ])
+        elif field in ('source', 'notes'):
+            columns.append([row[field] or None for row in rows])
+        elif field in ('created_at', 'updated_at'):
+            columns.append([_parse_timestamp(row[field]) for row in rows])
+        elif field == 'analysis_result':
+            columns.append([_parse_analysis(row[field]) for row in rows])
+        elif field == 'has_analysis':
+            columns.append([bool(row['analysis_result'].strip()) for row in rows])
+        else:
+            columns.append([row[field] for row in rows])
+
+    return [_construct_trusted(dict(zip(fields, values))) for values in zip(*columns)]
+
+
+def _construct_trusted(values: Dict[str, Any]) -> MistakeResponse:
+    """用已规范化的字段值直接构造MistakeResponse，不做校验
+
+    等价于 MistakeResponse.model_construct，但省去了默认值处理等开销
+    （model_construct 在这里比完整校验还慢）。调用方需保证字段类型正确。
+    """
+    mistake = MistakeResponse.__new__(MistakeResponse)
+    object.__setattr__(mistake, '__dict__', values)
+    object.__setattr__(mistake, '__pydantic_fields_set__', set(values))
+    object.__setattr__(mistake, '__pydantic_extra__', None)
+    object.__setattr__(mistake, '__pydantic_private__', None)
+    return mistake
+
+def mistake_to_row(mistake_id: str, mistake: MistakeCreate, created_at: str) -> Dict[str, str]:
+    """将创建请求转换为一行原始记录"""
+    return {
+        'id': mistake_id,
+        'question_content': mistake.question_content,
+        'wrong_process': mistake.wrong_process,
+        'wrong_answer': mistake.wrong_answer,
+        'correct_answer': mistake.correct_answer,
+        'question_type': mistake.question_type.value,
+        'knowledge_tags': ','.join(mistake.knowledge_tags),
+        'difficulty': mistake.difficulty.value,
+        'source': mistake.source or '',
+        'notes': mistake.notes or '',
+        'created_at': created_at,
+        'updated_at': created_at,
+        'analysis_result': '',  # analysis_result 初始为空
+        'analyzed_at': ''
+    }
+
+
+def update_to_changes(update: MistakeUpdate) -> Dict[str, str]:
+    """将更新请求转换为需要修改的字段（同时刷新更新时间）"""
+    changes: Dict[str, str] = {}
+    if update.question_content is not None:
+        changes['question_content'] = update.question_content
+    if update.wrong_process is not None:
+        changes['wrong_process'] = update.wrong_process
+    if update.wrong_answer is not None:
+        changes['wrong_answer'] = update.wrong_answer
+    if update.correct_answer is not None:
+        changes['correct_answer'] = update.correct_answer
+    if update.question_type is not None:
+        changes['question_type'] = update.question_type.value
+    if update.knowledge_tags is not None:
+        changes['knowledge_tags'] = ','.join(update.knowledge_tags)
+    if update.difficulty is not None:
+        changes['difficulty'] = update.difficulty.value
+    if update.source is not None:
+        changes['source'] = update.source
+    if update.notes is not None:
+        changes['notes'] = update.notes
+
+    # 更新更新时间
+    changes['updated_at'] = datetime.now().isoformat()
+    return changes
+
+
+def analysis_input_hash(question_content: str, wrong_process: str,
+                        wrong_answer: str, correct_answer: str) -> str:
+    """分析输入（题目、错误过程、错误答案、正确答案）的哈希，用于判断已保存的分析是否仍然有效"""
+    material = json.dumps([question_content, wrong_process, wrong_answer, correct_answer], ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def analysis_to_json(analysis: AnalysisResponse, input_hash: str = None, model: str = None) -> str:
+    """将分析结果转换为JSON字符串，input_hash 与 model 记录生成该分析时的输入哈希和模型"""
+    analysis_dict = {
+        "mistake_id": analysis.mistake_id,
+        "error_type": analysis.error_type,
+        "root_cause": analysis.root_cause,
+        "knowledge_gap": analysis.knowledge_gap,
+        "learning_suggestions": analysis.learning_suggestions,
+        "similar_examples": analysis.similar_examples,
+        "confidence_score": analysis.confidence_score
+    }
+    if input_hash:
+        analysis_dict["input_hash"] = input_hash
+        analysis_dict["model"] = model
+    return json.dumps(analysis_dict, ensure_ascii=False)
+
+
+_default_manager = None
+
+
+def get_data_manager():
+    """获取进程内共享的数据管理器
+
+    内存记录表必须只有一份，所有路由都应通过此函数获取数据管理器，
+    而不是各自创建实例。
+
+    存储后端由环境变量 DATA_BACKEND 选择：
+    - csv（默认）: CSVDataManager，数据文件为 DATA_FILE_PATH
+    - sqlite: SQLiteDataManager，数据库为 SQLITE_DB_PATH；
+      数据库首次创建时自动从 DATA_FILE_PATH 迁移已有CSV数据
+    """
+    global _default_manager
+    if _default_manager is None:
+        csv_path = os.getenv("DATA_FILE_PATH", "data/mistakes.csv")
+        backend = os.getenv("DATA_BACKEND", "csv").lower()
+
+        if backend == "sqlite":
+            from sqlite_data_manager import SQLiteDataManager, migrate_csv_to_sqlite
+            db_path = os.getenv("SQLITE_DB_PATH", "data/mistakes.db")
+            if not os.path.exists(db_path) and os.path.exists(csv_path):
+                migrate_csv_to_sqlite(csv_path, db_path)
+            _default_manager = SQLiteDataManager(db_path)
+        elif backend == "csv":
+            _default_manager = CSVDataManager(csv_path)
+        else:
+            raise ValueError(f"不支持的存储后端: {backend}（可选: csv, sqlite）")
+    return _default_manager
@@ -7,7 +7,7 @@ GitHub ID: error-T-T
 
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any, Generic, TypeVar
-from datetime import datetime
+from datetime import datetime, date
 from enum import Enum
 
 class DifficultyLevel(str, Enum):
@@ -52,7 +52,8 @@ class MistakeResponse(BaseModel):
     notes: Optional[str] = Field(None, description="个人笔记")
     created_at: datetime = Field(..., description="创建时间")
     updated_at: datetime = Field(..., description="更新时间")
-    analysis_result: Optional[Dict[str, Any]] = Field(None, description="AI分析结果")
+    analysis_result: Optional[Dict[str, Any]] = Field(None, description="AI分析结果（列表接口默认不返回）")
+    has_analysis: bool = Field(False, description="是否已有AI分析结果")
 
     class Config:
         from_attributes = True
@@ -93,7 +94,70 @@ class StatsResponse(BaseModel):
     mistakes_by_type: Dict[str, int] = Field(..., description="按类型统计")
     mistakes_by_difficulty: Dict[str, int] = Field(..., description="按难度统计")
     top_knowledge_gaps: List[str] = Field(..., description="高频知识漏洞")
-    accuracy_trend: List[float] = Field(..., description="正确率趋势")
+    accuracy_trend: List[float] = Field(..., description="最近有复习记录的几周的正确率（尚无复习记录时为空）")
+
+
+class TrendPoint(BaseModel):
+    """趋势中的一个时间桶"""
+    period_start: date = Field(..., description="时间桶起始日期（周从周一开始）")
+    created: int = Field(..., description="录入的错题数")
+    analyzed: int = Field(..., description="完成AI分析的错题数")
+    reviewed: int = Field(..., description="复习（练习）次数")
+    correct: int = Field(..., description="复习中做对的次数")
+    accuracy: Optional[float] = Field(None, description="正确率，没有复习记录时为空")
+
+
+class TrendResponse(BaseModel):
+    """趋势响应模型"""
+    granularity: str = Field(..., description="时间粒度：day/week/month")
+    window: int = Field(..., description="时间桶数量")
+    points: List[TrendPoint] = Field(..., description="按时间从早到晚排列的时间桶")
+
+
+class HeatmapCell(BaseModel):
+    """热力图中的一个单元格"""
+    period_start: date = Field(..., description="时间桶起始日期（周从周一开始）")
+    knowledge_tag: str = Field(..., description="知识点标签")
+    difficulty: str = Field(..., description="难度")
+    question_type: str = Field(..., description="题目类型")
+    count: int = Field(..., description="错题数")
+
+
+class HeatmapResponse(BaseModel):
+    """错题热力图响应模型"""
+    granularity: str = Field(..., description="时间粒度：day/week/month")
+    window: int = Field(..., description="时间桶数量")
+    data_version: int = Field(..., description="生成结果时的数据版本号")
+    cells: List[HeatmapCell] = Field(..., description="非零单元格，按时间从早到晚、桶内按错题数从多到少排列")
+
+
+class ChangeEntry(BaseModel):
+    """一条合并后的变更"""
+    id: str = Field(..., description="错题ID")
+    op: str = Field(..., description="操作：create/update/delete")
+    version: int = Field(..., description="该错题最后一次变更时的数据版本号")
+
+
+class ChangesResponse(BaseModel):
+    """增量同步响应模型"""
+    instance_id: str = Field(..., description="数据管理器实例标识，变化后须全量同步")
+    version: int = Field(..., description="当前数据版本号，下次同步作为 since 传入")
+    full_resync: bool = Field(..., description="变更已超出保留范围，须重新下载完整列表")
+    changes: List[ChangeEntry] = Field(default_factory=list, description="按版本号排列的变更")
+    items: List[MistakeResponse] = Field(default_factory=list, description="新增或更新的错题的当前内容")
+
+
+class AnalysisJobResponse(BaseModel):
+    """后台分析任务响应模型"""
+    job_id: str = Field(..., description="任务ID")
+    mistake_id: str = Field(..., description="错题ID")
+    force: bool = Field(False, description="是否忽略已保存的分析结果重新分析")
+    status: str = Field(..., description="任务状态: queued / running / succeeded / failed")
+    created_at: datetime = Field(..., description="提交时间")
+    started_at: Optional[datetime] = Field(None, description="开始执行时间")
+    finished_at: Optional[datetime] = Field(None, description="完成时间")
+    result: Optional[AnalysisResponse] = Field(None, description="分析结果（成功时）")
+    error: Optional[str] = Field(None, description="失败原因（失败时）")
 
 
 # 泛型类型变量
@@ -106,6 +170,7 @@ class PaginatedResponse(BaseModel, Generic[T]):
     page: int = Field(..., description="当前页码")
     page_size: int = Field(..., description="每页记录数")
     total_pages: int = Field(..., description="总页数")
+    next_cursor: Optional[str] = Field(None, description="游标分页时下一页的游标，没有更多记录时为空")
 
 
 class GeneratePracticeRequest(BaseModel):
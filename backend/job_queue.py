@@ -0,0 +1,243 @@
+"""
+后台分析任务队列模块
+分析请求入队后立即返回任务ID，由固定数量的协程按提交顺序执行；
+任务的每次状态变化以一行JSON追加到任务日志（data/jobs.jsonl），提交与完成记录写入后落盘（fsync），
+服务重启后重放日志，未完成的任务重新排队。
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+import asyncio
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from data_manager import safe_print
+
+# 任务的四种状态，与任务日志中的 status 一致
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+_FINISHED = ('succeeded', 'failed')
+
+
+class JobQueue:
+    """带持久化日志的后台分析任务队列
+
+    所有方法都在事件循环线程内调用，不另外加锁。
+    """
+
+    def __init__(self, journal_path: str = "data/jobs.jsonl", workers: int = None, max_history: int = None):
+        """打开（或创建）任务日志并恢复任务
+
+        Args:
+            journal_path: 任务日志路径
+            workers: 同时执行的任务数，默认读取环境变量 ANALYSIS_WORKERS
+            max_history: 保留的已完成任务数，默认读取环境变量 JOB_HISTORY_SIZE
+        """
+        self.journal_path = journal_path
+        self.workers = workers or int(os.getenv("ANALYSIS_WORKERS", 2))
+        self.max_history = max_history or int(os.getenv("JOB_HISTORY_SIZE", 1000))
+        self._jobs: OrderedDict = OrderedDict()    # 任务ID -> 任务，按提交顺序
+        self._active: Dict[str, str] = {}          # 错题ID -> 排队或执行中的任务ID
+        self._done: Dict[str, asyncio.Event] = {}  # 等待结果的任务ID -> 完成事件
+        self._handler: Optional[Callable[[str, bool], Awaitable[Dict[str, Any]]]] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._file = None
+        self._journal_lines = 0
+
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        self._replay()
+        self._compact()
+
+    def set_handler(self, handler: Callable[[str, bool], Awaitable[Dict[str, Any]]]):
+        """设置执行任务的协程函数：handler(错题ID, 是否强制重新分析) -> 分析结果"""
+        self._handler = handler
+
+    async def submit(self, mistake_id: str, force: bool = False) -> Dict[str, Any]:
+        """提交分析任务；同一错题已有排队或执行中的任务且不强制重新分析时，返回该任务
+
+        任务记录落盘后才返回，返回的任务ID在断电后仍可查询。
+        """
+        active_id = self._active.get(mistake_id)
+        if active_id is not None and not force:
+            return dict(self._jobs[active_id])
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "mistake_id": mistake_id,
+            "force": force,
+            "status": "queued",
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        self._jobs[job["job_id"]] = job
+        self._active[mistake_id] = job["job_id"]
+        self._write(job)
+        await self._sync()
+        if self._queue is not None:
+            self._queue.put_nowait(job["job_id"])
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """返回任务的当前状态，任务不存在时返回None"""
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """等待任务完成，最多等待 timeout 秒，返回任务的最新状态"""
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] in _FINISHED or timeout <= 0:
+            return self.get(job_id)
+        event = self._done.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """各状态的任务数与执行协程数"""
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        for job in self._jobs.values():
+            counts[job["status"]] += 1
+        return {"workers": self.workers, **counts}
+
+    async def start(self):
+        """启动执行协程，未完成的任务（含上次停止时执行中断的任务）按提交顺序重新排队"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        for job in self._jobs.values():
+            if job["status"] == "running":
+                job.update(status="queued", started_at=None)
+                self._write(job)
+            if job["status"] == "queued":
+                self._queue.put_nowait(job["job_id"])
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        pending = sum(1 for job in self._jobs.values() if job["status"] == "queued")
+        safe_print(f"[OK] 后台分析任务队列已启动: {self.workers} 个执行协程, {pending} 个待执行任务")
+
+    async def stop(self):
+        """停止执行协程；执行中的任务保持 running 状态，下次启动时重新排队"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != "queued":
+                continue
+
+            job.update(status="running", started_at=datetime.now().isoformat())
+            self._write(job)
+            try:
+                if self._handler is None:
+                    raise RuntimeError("任务处理函数未设置")
+                result = await self._handler(job["mistake_id"], job["force"])
+                job.update(status="succeeded", result=result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                safe_print(f"[ERROR] 后台分析任务失败 {job_id}: {e}")
+                job.update(status="failed", error=str(getattr(e, "detail", e)))
+            job["finished_at"] = datetime.now().isoformat()
+            self._write(job)
+            await self._sync()
+            self._finish(job)
+
+    def _finish(self, job: Dict[str, Any]):
+        """任务完成：唤醒等待者，清理过多的历史任务"""
+        if self._active.get(job["mistake_id"]) == job["job_id"]:
+            del self._active[job["mistake_id"]]
+        event = self._done.pop(job["job_id"], None)
+        if event is not None:
+            event.set()
+
+        finished = [job_id for job_id, item in self._jobs.items() if item["status"] in _FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.max_history)]:
+            del self._jobs[job_id]
+        # 每个任务约写入三行，日志明显多于保留的任务时重写
+        if self._journal_lines > 3 * len(self._jobs) + 100:
+            self._compact()
+
+    def _replay(self):
+        """按日志恢复每个任务的最后状态；写入中途崩溃留下的半行被忽略"""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    job = json.loads(line)
+                except ValueError:
+                    continue
+                if job.get("status") not in JOB_STATUSES:
+                    continue
+                self._jobs[job["job_id"]] = job   # 已有的任务保持提交时的位置
+
+        for job in self._jobs.values():
+            if job["status"] not in _FINISHED:
+                self._active[job["mistake_id"]] = job["job_id"]
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in _FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.max_history)]:
+            del self._jobs[job_id]
+
+    def _compact(self):
+        """把保留的任务重写为每个任务一行"""
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for job in self._jobs.values():
+                f.write(json.dumps(job, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if self._file is not None:
+            self._file.close()
+        os.replace(tmp_path, self.journal_path)
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+        self._journal_lines = len(self._jobs)
+
+    def _write(self, job: Dict[str, Any]):
+        self._file.write(json.dumps(job, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._journal_lines += 1
+
+    async def _sync(self):
+        """在线程中把已写入的任务日志刷到磁盘，不阻塞事件循环
+
+        使用复制的文件描述符，等待期间日志被重写（关闭原文件）也不受影响；
+        "执行中"记录不落盘，断电丢失时任务仍按排队状态重新执行。
+        """
+        fd = os.dup(self._file.fileno())
+        try:
+            await asyncio.to_thread(os.fsync, fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """关闭任务日志"""
+        self._file.close()
+
+
+_default_queue: Optional[JobQueue] = None
+_default_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """返回进程内共享的任务队列（日志路径由环境变量 JOB_JOURNAL_PATH 指定）"""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue(os.getenv("JOB_JOURNAL_PATH", "data/jobs.jsonl"))
+        return _default_queue
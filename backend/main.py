@@ -39,18 +39,20 @@ def safe_print(text: str):
             cleaned = ''.join(c if ord(c) < 128 else '?' for c in text)
             print(cleaned)
 
+# 加载环境变量（需在导入路由前完成，路由模块导入时即按环境变量初始化数据管理器和AI引擎）
+load_dotenv(".env")
+
 # 导入自定义中间件
 from middleware.logging_middleware import LoggingMiddleware
 
 # 导入路由
 try:
-    from routers import mistakes, ai, imports
+    from routers import mistakes, ai, imports, attempts, jobs
 except ImportError:
     # 如果直接导入失败，尝试相对导入
-    from .routers import mistakes, ai, imports
+    from .routers import mistakes, ai, imports, attempts, jobs
 
-# 加载环境变量
-load_dotenv(".env")
+from ai_engine import get_ai_engine
 
 # 生命周期管理
 @asynccontextmanager
@@ -65,8 +67,13 @@ async def lifespan(app: FastAPI):
     os.makedirs("sample_data", exist_ok=True)
     os.makedirs("logs", exist_ok=True)
 
+    # 启动后台分析任务的执行协程（上次未完成的任务重新排队）
+    await jobs.job_queue.start()
+
     yield
-    # 关闭时
+    # 关闭时停止后台任务，释放AI引擎的连接池
+    await jobs.job_queue.stop()
+    await get_ai_engine().aclose()
     safe_print("👋 MathMistakeAI 后端服务关闭")
 
 # 创建FastAPI应用
@@ -94,6 +101,8 @@ app.add_middleware(LoggingMiddleware)
 app.include_router(mistakes.router, prefix="/api")
 app.include_router(ai.router, prefix="/api")
 app.include_router(imports.router, prefix="/api")
+app.include_router(attempts.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
 
 # 健康检查端点
 @app.get("/")
@@ -111,7 +120,9 @@ async def root():
             "health_check": "/health",
             "mistakes": "/api/mistakes",
             "ai_analysis": "/api/ai",
-            "data_import": "/api/import"
+            "data_import": "/api/import",
+            "attempts": "/api/attempts",
+            "jobs": "/api/jobs"
         }
     }
 
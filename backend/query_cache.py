@@ -0,0 +1,84 @@
+"""
+查询结果缓存模块
+按筛选条件缓存匹配的错题ID（或按排序字段建立的有序索引），同一筛选条件翻页时
+直接从缓存中切出当前页；缓存只保留当前数据版本的结果，数据一变化全部失效。
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+
+def filter_key(keyword: Optional[str], tags: Optional[Iterable[str]], difficulty: Any,
+               question_type: Any, tag_match: str, sort: Optional[str]) -> Tuple:
+    """筛选条件的缓存键：空条件统一为None，标签去除空白并去重"""
+    tags = tuple(dict.fromkeys(tag.strip() for tag in tags or () if tag.strip()))
+    return (
+        keyword or None,
+        tags or None,
+        tag_match if tags else None,
+        difficulty or None,
+        question_type or None,
+        sort,
+    )
+
+
+class QueryCache:
+    """按筛选条件与数据版本号缓存查询结果的LRU缓存（线程安全）"""
+
+    def __init__(self, max_entries: int = None):
+        """初始化空缓存
+
+        Args:
+            max_entries: 最多缓存的查询条数，默认读取环境变量 QUERY_CACHE_SIZE
+        """
+        self.max_entries = max_entries or int(os.getenv("QUERY_CACHE_SIZE", 128))
+        self._entries: OrderedDict = OrderedDict()
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, data_version: int, compute: Callable[[], Any]) -> Any:
+        """返回缓存的结果，未命中时调用 compute 计算并缓存
+
+        data_version 须在 compute 读取数据之前取得：计算期间数据发生变化时，
+        结果会以旧版本号缓存，版本号更新后即被丢弃，不会被当作新数据返回。
+        """
+        with self._lock:
+            if self._version != data_version:
+                if self._version is None or data_version > self._version:
+                    self._entries.clear()
+                    self._version = data_version
+            elif key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            if self._version == data_version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """命中次数、未命中次数、命中率与当前缓存条数"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
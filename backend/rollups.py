@@ -0,0 +1,222 @@
+"""
+时间分桶汇总模块
+按天、周、月三种粒度预先汇总错题录入数、分析数和复习结果，
+以及 知识标签×难度×题型 的错题数（热力图立方体），
+记录变化时增量更新对应的桶，趋势与热力图查询只读取窗口内的桶，与历史数据量无关。
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from search_index import split_tags
+
+GRANULARITIES = ('day', 'week', 'month')
+
+# 每个桶中的计数项：录入的错题、完成AI分析的错题、复习（练习）次数及其中做对的次数
+METRICS = ('created', 'analyzed', 'reviewed', 'correct')
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    """某一天所在桶的起始日期（周从周一开始）"""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"不支持的时间粒度: {granularity}（可选: {', '.join(GRANULARITIES)}）")
+
+
+def previous_bucket(start: date, granularity: str) -> date:
+    """上一个桶的起始日期"""
+    if granularity == 'month':
+        return (start - timedelta(days=1)).replace(day=1)
+    return start - timedelta(days=7 if granularity == 'week' else 1)
+
+
+def _to_date(timestamp: Union[str, datetime, date, None]) -> Optional[date]:
+    """从ISO时间字符串或日期时间对象中取出日期，无法解析时返回None"""
+    if isinstance(timestamp, datetime):
+        return timestamp.date()
+    if isinstance(timestamp, date):
+        return timestamp
+    if not timestamp:
+        return None
+    try:
+        return date.fromisoformat(timestamp[:10])
+    except ValueError:
+        return None
+
+
+class TrendRollups:
+    """按天/周/月分桶的计数汇总
+
+    三种粒度的桶同时增量维护，查询时无需再从天桶聚合。
+    汇总本身不加锁，由数据管理器在自己的锁内调用。
+    """
+
+    def __init__(self):
+        """初始化空汇总"""
+        self._buckets: Dict[str, Dict[date, Counter]] = {
+            granularity: defaultdict(Counter) for granularity in GRANULARITIES
+        }
+
+    def add(self, metric: str, timestamp: Union[str, datetime, date, None], count: int = 1):
+        """在时间戳所在的各粒度桶中增加计数（时间戳无法解析时忽略）"""
+        day = _to_date(timestamp)
+        if day is None or not count:
+            return
+        for granularity, buckets in self._buckets.items():
+            start = bucket_start(day, granularity)
+            bucket = buckets[start]
+            bucket[metric] += count
+            if bucket[metric] <= 0:
+                del bucket[metric]
+                if not bucket:
+                    del buckets[start]
+
+    def add_row(self, row: Dict[str, str], sign: int = 1):
+        """计入（sign=-1 时移除）一条错题记录的录入与分析时间"""
+        self.add('created', row.get('created_at'), sign)
+        if row.get('analysis_result'):
+            # 旧数据没有 analyzed_at，以最后更新时间近似
+            self.add('analyzed', row.get('analyzed_at') or row.get('updated_at'), sign)
+
+    def replace_row(self, old_row: Dict[str, str], new_row: Dict[str, str]):
+        """记录被更新：只有录入或分析时间变化时才调整计数"""
+        if any(old_row.get(col) != new_row.get(col) for col in ('created_at', 'analyzed_at', 'analysis_result')):
+            self.add_row(old_row, -1)
+            self.add_row(new_row)
+
+    def add_review(self, timestamp: Union[str, datetime, date, None], correct: Union[bool, int], reviewed: int = 1):
+        """计入 reviewed 次复习（练习）结果，其中 correct 次做对（单次复习时 correct 可直接传是否做对）"""
+        self.add('reviewed', timestamp, reviewed)
+        self.add('correct', timestamp, int(correct))
+
+    def reset(self, rows):
+        """按全部记录重建录入与分析计数（保留复习计数）"""
+        for buckets in self._buckets.values():
+            for start in list(buckets):
+                bucket = buckets[start]
+                bucket.pop('created', None)
+                bucket.pop('analyzed', None)
+                if not bucket:
+                    del buckets[start]
+        for row in rows:
+            self.add_row(row)
+
+    def series(self, granularity: str = 'day', window: int = 30, end: date = None) -> List[Dict[str, Any]]:
+        """返回截至 end（默认今天）的最近 window 个桶，按时间从早到晚排列
+
+        每个桶包含各计数项以及正确率 accuracy（该桶没有复习记录时为None）。
+        """
+        buckets = self._buckets.get(granularity)
+        if buckets is None:
+            raise ValueError(f"不支持的时间粒度: {granularity}（可选: {', '.join(GRANULARITIES)}）")
+
+        start = bucket_start(end or date.today(), granularity)
+        points = []
+        for _ in range(window):
+            bucket = buckets.get(start, {})
+            point = {'period_start': start, **{metric: bucket.get(metric, 0) for metric in METRICS}}
+            point['accuracy'] = round(point['correct'] / point['reviewed'], 4) if point['reviewed'] else None
+            points.append(point)
+            start = previous_bucket(start, granularity)
+        points.reverse()
+        return points
+
+    def accuracy_trend(self, granularity: str = 'week', points: int = 5, window: int = 52) -> List[float]:
+        """最近 window 个桶中有复习记录的最后 points 个桶的正确率（没有复习记录时为空列表）"""
+        accuracies = [p['accuracy'] for p in self.series(granularity, window) if p['accuracy'] is not None]
+        return accuracies[-points:]
+
+
+class HeatmapCube:
+    """按 (时间桶, 知识标签, 难度, 题型) 汇总的错题数
+
+    三种粒度的立方体同时增量维护，一道错题的每个标签各计一次，没有标签的错题不计入。
+    立方体本身不加锁，由数据管理器在自己的锁内调用。
+    """
+
+    def __init__(self):
+        """初始化空立方体"""
+        self._buckets: Dict[str, Dict[date, Counter]] = {
+            granularity: defaultdict(Counter) for granularity in GRANULARITIES
+        }
+        # 查询结果缓存，只保留同一数据版本下的结果
+        self._cache: Dict[Tuple[str, int, date], List[Dict[str, Any]]] = {}
+        self._cache_version: Optional[int] = None
+
+    def add_row(self, row: Dict[str, str], sign: int = 1):
+        """计入（sign=-1 时移除）一条错题记录"""
+        day = _to_date(row.get('created_at'))
+        tags = split_tags(row.get('knowledge_tags', ''))
+        if day is None or not tags:
+            return
+        cells = [(tag, row.get('difficulty', ''), row.get('question_type', '')) for tag in tags]
+        for granularity, buckets in self._buckets.items():
+            start = bucket_start(day, granularity)
+            bucket = buckets[start]
+            for cell in cells:
+                bucket[cell] += sign
+                if bucket[cell] <= 0:
+                    del bucket[cell]
+            if not bucket:
+                del buckets[start]
+
+    def replace_row(self, old_row: Dict[str, str], new_row: Dict[str, str]):
+        """记录被更新：只有标签、难度、题型或录入时间变化时才调整计数"""
+        if any(old_row.get(col) != new_row.get(col)
+               for col in ('knowledge_tags', 'difficulty', 'question_type', 'created_at')):
+            self.add_row(old_row, -1)
+            self.add_row(new_row)
+
+    def reset(self, rows):
+        """按全部记录重建立方体"""
+        for buckets in self._buckets.values():
+            buckets.clear()
+        for row in rows:
+            self.add_row(row)
+
+    def cells(self, granularity: str = 'month', window: int = 12, end: date = None) -> List[Dict[str, Any]]:
+        """返回截至 end（默认今天）的最近 window 个桶中的非零单元格
+
+        按时间从早到晚、桶内按错题数从多到少排列（同数时按标签、难度、题型）。
+        """
+        buckets = self._buckets.get(granularity)
+        if buckets is None:
+            raise ValueError(f"不支持的时间粒度: {granularity}（可选: {', '.join(GRANULARITIES)}）")
+
+        starts = [bucket_start(end or date.today(), granularity)]
+        for _ in range(window - 1):
+            starts.append(previous_bucket(starts[-1], granularity))
+
+        cells = []
+        for start in reversed(starts):
+            bucket: Counter = buckets.get(start, Counter())
+            for (tag, difficulty, question_type), count in sorted(bucket.items(), key=lambda item: (-item[1], item[0])):
+                cells.append({
+                    'period_start': start, 'knowledge_tag': tag,
+                    'difficulty': difficulty, 'question_type': question_type, 'count': count
+                })
+        return cells
+
+    def cached_cells(self, granularity: str, window: int, data_version: int) -> List[Dict[str, Any]]:
+        """与 cells 相同，但结果按数据版本号缓存：版本号不变时重复查询直接返回缓存
+
+        调用方须保证立方体的每次变化都伴随数据版本号增大。
+        """
+        if self._cache_version != data_version:
+            self._cache = {}
+            self._cache_version = data_version
+        # 窗口相对于当天，日期变化后缓存自然失效
+        key = (granularity, window, date.today())
+        cells = self._cache.get(key)
+        if cells is None:
+            cells = self._cache[key] = self.cells(granularity, window)
+        return cells
@@ -7,6 +7,7 @@ GitHub ID: error-T-T
 
 import sys
 import os
+import asyncio
 
 # 添加父目录到Python路径，确保可以导入本地模块
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -18,20 +19,21 @@ from fastapi import APIRouter, HTTPException, Query
 from typing import List
 
 # 直接导入（已设置sys.path）
-from ai_engine import AIEngine
+from ai_engine import get_ai_engine
 from data_models import AnalysisRequest, AnalysisResponse, GeneratePracticeRequest
+from sse import format_event, event_stream
 
 # 初始化路由 - 只定义一次
 router = APIRouter(prefix="/ai", tags=["AI分析"])
 
-# 初始化AI引擎
-ai_engine = AIEngine()
+# 获取共享的AI引擎（与错题路由、后台任务共用连接池和响应缓存）
+ai_engine = get_ai_engine()
 
 @router.post("/analyze", response_model=AnalysisResponse)
 async def analyze_mistake_directly(request: AnalysisRequest):
     """直接分析错题（无需先保存）"""
     try:
-        analysis = ai_engine.analyze_mistake(request)
+        analysis = await ai_engine.analyze_mistake_async(request)
         return analysis
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI分析失败: {str(e)}")
@@ -40,7 +42,9 @@ async def analyze_mistake_directly(request: AnalysisRequest):
 async def generate_practice_questions(request: GeneratePracticeRequest):
     """根据知识漏洞和参数生成练习题"""
     try:
-        questions = ai_engine.generate_practice_questions(
+        # 同步的生成调用放到线程中执行，避免阻塞事件循环
+        questions = await asyncio.to_thread(
+            ai_engine.generate_practice_questions,
             knowledge_gaps=request.knowledge_gaps,
             count=request.count,
             difficulty=request.difficulty,
@@ -62,11 +66,26 @@ async def generate_practice_questions(request: GeneratePracticeRequest):
             cleaned_error = "生成练习题时发生未知错误"
         raise HTTPException(status_code=500, detail=f"生成练习题失败: {cleaned_error}")
 
+@router.get("/explain/stream")
+async def explain_concept_stream(concept: str = Query(..., min_length=1, description="数学概念")):
+    """流式解释数学概念（SSE）
+
+    模型每生成一段文本发送一个 token 事件，结束时发送 result 事件（与 /explain/{concept} 的 explanation 相同）。
+    """
+    async def events():
+        try:
+            async for event, data in ai_engine.stream_concept_explanation(concept):
+                yield format_event(event, {"text": data} if event == "token" else data)
+        except Exception as e:
+            yield format_event("error", {"detail": f"解释概念失败: {str(e)}"})
+
+    return event_stream(events())
+
 @router.get("/explain/{concept}")
 async def explain_concept(concept: str):
     """解释数学概念"""
     try:
-        explanation = ai_engine.explain_concept(concept)
+        explanation = await asyncio.to_thread(ai_engine.explain_concept, concept)
         return {
             "concept": concept,
             "explanation": explanation
@@ -86,5 +105,6 @@ async def get_model_info():
         "model": ai_engine.model,
         "base_url": ai_engine.base_url,
         "connected": ai_engine.is_connected,
+        "cache": ai_engine.cache.stats(),
         "service": "MathMistakeAI AI Engine"
     }
\ No newline at end of file
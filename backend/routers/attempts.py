@@ -0,0 +1,133 @@
+"""
+练习作答API路由
+批量记录练习题的作答结果，并提供按知识标签、按错题的正确率与连对统计
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+import sys
+import os
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+# 添加父目录到Python路径，确保可以导入本地模块
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from data_manager import get_data_manager
+from attempt_log import get_attempt_log
+
+router = APIRouter(prefix="/attempts", tags=["练习作答"])
+
+data_manager = get_data_manager()
+attempt_log = get_attempt_log()
+
+# 作答结果同时计入错题统计的复习趋势（每批作答只使查询缓存与ETag失效一次）
+attempt_log.subscribe(data_manager.record_reviews)
+
+
+class AttemptCreate(BaseModel):
+    """单次作答"""
+    mistake_id: str = Field(..., description="练习题对应的错题ID")
+    correct: bool = Field(..., description="是否做对")
+    knowledge_tags: Optional[List[str]] = Field(None, description="考查的知识点标签（不填时使用错题的标签）")
+    attempted_at: Optional[datetime] = Field(None, description="作答时间（不填时为接收时间）")
+
+
+class AttemptBatch(BaseModel):
+    """批量作答"""
+    attempts: List[AttemptCreate] = Field(..., min_length=1, max_length=1000, description="作答记录")
+
+
+class AttemptBatchResponse(BaseModel):
+    """批量作答响应模型"""
+    accepted: int = Field(..., description="写入的作答数")
+    rejected: int = Field(..., description="被拒绝的作答数")
+    rejected_details: List[Dict[str, Any]] = Field(default_factory=list, description="拒绝详情（index 为在批次中的位置）")
+
+
+class AttemptStats(BaseModel):
+    """作答统计"""
+    attempts: int = Field(..., description="作答次数")
+    correct: int = Field(..., description="做对次数")
+    accuracy: Optional[float] = Field(None, description="正确率")
+    streak: int = Field(..., description="当前连对次数")
+    best_streak: int = Field(..., description="最长连对次数")
+    last_attempt_at: Optional[datetime] = Field(None, description="最近作答时间")
+
+
+class TagAttemptStats(AttemptStats):
+    """知识标签的作答统计"""
+    tag: str = Field(..., description="知识点标签")
+
+
+class MistakeAttemptStats(AttemptStats):
+    """错题的作答统计"""
+    mistake_id: str = Field(..., description="错题ID")
+
+
+@router.post("/batch", response_model=AttemptBatchResponse)
+async def ingest_attempts(batch: AttemptBatch):
+    """批量记录作答结果
+
+    错题不存在或数据不合法的作答会被逐条拒绝，其余作答照常写入。
+    """
+    accepted = []
+    rejected_details = []
+    received_at = datetime.now()
+    tags_cache: Dict[str, List[str]] = {}
+
+    for index, attempt in enumerate(batch.attempts):
+        if attempt.mistake_id not in tags_cache:
+            mistake_tags = data_manager.get_tags(attempt.mistake_id)
+            if mistake_tags is None:
+                rejected_details.append({"index": index, "error": f"错题不存在: {attempt.mistake_id}"})
+                continue
+            tags_cache[attempt.mistake_id] = mistake_tags
+
+        tags = attempt.knowledge_tags
+        if tags is None:
+            tags = tags_cache[attempt.mistake_id]
+        tags = [tag.strip() for tag in tags if tag.strip()]
+        try:
+            attempt_log.validate(attempt.mistake_id, tags)
+        except ValueError as e:
+            rejected_details.append({"index": index, "error": str(e)})
+            continue
+
+        attempted_at = attempt.attempted_at or received_at
+        if attempted_at.tzinfo is not None:
+            attempted_at = attempted_at.astimezone().replace(tzinfo=None)
+        accepted.append((attempt.mistake_id, tags, attempt.correct, attempted_at))
+
+    try:
+        attempt_log.append(accepted)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"写入作答记录失败: {str(e)}")
+
+    return AttemptBatchResponse(
+        accepted=len(accepted),
+        rejected=len(rejected_details),
+        rejected_details=rejected_details
+    )
+
+
+@router.get("/tags", response_model=List[TagAttemptStats])
+async def get_tag_stats():
+    """各知识标签的正确率与连对统计（按作答次数从多到少）"""
+    return attempt_log.tag_stats()
+
+
+@router.get("/mistakes/{mistake_id}", response_model=MistakeAttemptStats)
+async def get_mistake_attempt_stats(mistake_id: str):
+    """某道错题的正确率与连对统计"""
+    stats = attempt_log.mistake_stats(mistake_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="该错题还没有作答记录")
+    return stats
@@ -21,13 +21,13 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 from data_models import MistakeCreate
-from data_manager import CSVDataManager
+from data_manager import get_data_manager
 from parsers.text_parser import TextParser, ParseError
 
 router = APIRouter(prefix="/import", tags=["数据导入"])
 
-# 初始化数据管理器
-data_manager = CSVDataManager()
+# 获取共享的数据管理器（与错题路由共用同一份内存记录）
+data_manager = get_data_manager()
 
 
 class ImportResponse(BaseModel):
@@ -146,23 +146,24 @@ def _import_mistakes(mistake_objects: List[MistakeCreate]) -> Dict[str, Any]:
     failed_details = []
     warning_messages = []
 
-    for idx, mistake in enumerate(mistake_objects):
-        try:
-            # 创建错题记录
-            mistake_id = data_manager.create_mistake(mistake)
-            successful += 1
+    # 批量创建错题记录（一次写入），单条失败不影响其他记录
+    mistake_ids, errors = data_manager.create_mistakes(mistake_objects)
 
-            # 添加警告信息（如果有些字段缺失）
-            if not mistake.knowledge_tags:
-                warning_messages.append(f"第{idx + 1}条记录缺少知识点标签")
-
-        except Exception as e:
+    for idx, (mistake, mistake_id) in enumerate(zip(mistake_objects, mistake_ids)):
+        if mistake_id is None:
             failed += 1
             failed_details.append({
                 "index": idx + 1,
-                "error": str(e),
+                "error": errors.get(idx, "创建错题记录失败"),
                 "question_content": mistake.question_content[:50] + "..." if len(mistake.question_content) > 50 else mistake.question_content
             })
+            continue
+
+        successful += 1
+
+        # 添加警告信息（如果有些字段缺失）
+        if not mistake.knowledge_tags:
+            warning_messages.append(f"第{idx + 1}条记录缺少知识点标签")
 
     return {
         "total_processed": total_processed,
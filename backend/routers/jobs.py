@@ -0,0 +1,43 @@
+"""
+后台任务API路由
+查询后台分析任务的状态与结果，支持长轮询等待任务完成
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+import sys
+import os
+from fastapi import APIRouter, HTTPException, Query
+
+# 添加父目录到Python路径，确保可以导入本地模块
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from data_models import AnalysisJobResponse
+from job_queue import get_job_queue
+
+router = APIRouter(prefix="/jobs", tags=["后台任务"])
+
+job_queue = get_job_queue()
+
+
+@router.get("/stats")
+async def get_job_stats():
+    """各状态的任务数与执行协程数"""
+    return job_queue.stats()
+
+
+@router.get("/{job_id}", response_model=AnalysisJobResponse)
+async def get_job(job_id: str, wait: float = Query(0, ge=0, le=60, description="任务未完成时最多等待的秒数（长轮询）")):
+    """查询任务状态，成功时包含分析结果
+
+    wait 大于0时，任务完成或等待超时后才返回。
+    """
+    job = await job_queue.wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
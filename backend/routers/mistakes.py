@@ -14,24 +14,58 @@ parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
+from fastapi.responses import JSONResponse
+from datetime import date
 from typing import List, Optional
 
 # 直接导入（已设置sys.path）
 from data_models import (
     MistakeCreate, MistakeResponse, MistakeUpdate,
     AnalysisRequest, AnalysisResponse, DifficultyLevel, QuestionType,
-    PaginatedResponse, StatsResponse
+    PaginatedResponse, StatsResponse, TrendResponse, HeatmapResponse, ChangesResponse, AnalysisJobResponse
 )
-from data_manager import CSVDataManager
-from ai_engine import AIEngine
+from data_manager import (
+    get_data_manager, normalize_fields, LIST_FIELDS, encode_cursor, decode_cursor, analysis_input_hash
+)
+from ai_engine import get_ai_engine
+from sse import format_event, event_stream
+from job_queue import get_job_queue
 from data_manager import safe_safe_print as safe_print
 
 router = APIRouter(prefix="/mistakes", tags=["错题管理"])
 
-# 初始化数据管理器和AI引擎
-data_manager = CSVDataManager()
-ai_engine = AIEngine()
+# 获取共享的数据管理器、AI引擎和后台分析任务队列
+data_manager = get_data_manager()
+ai_engine = get_ai_engine()
+job_queue = get_job_queue()
+
+
+def _collection_etag(dated: bool = False) -> str:
+    """列表与统计接口的ETag：数据管理器实例标识加数据版本号
+
+    统计窗口相对于当天的接口（dated=True）还要加上日期，跨天后缓存失效。
+    """
+    tag = f"{data_manager.instance_id}-{data_manager.data_version}"
+    if dated:
+        tag += f"-{date.today().isoformat()}"
+    return f'"{tag}"'
+
+
+def _not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """为响应设置ETag；请求的 If-None-Match 与之匹配时返回304响应，否则返回None
+
+    ETag须在读取数据之前计算：期间发生写操作时客户端拿到的ETag偏旧，下次请求只会多取一次，不会误判未修改。
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    response.headers.update(headers)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+    return None
+
 
 @router.post("", response_model=MistakeResponse)
 async def create_mistake(mistake: MistakeCreate):
@@ -45,18 +79,38 @@ async def create_mistake(mistake: MistakeCreate):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"创建错题失败: {str(e)}")
 
-@router.get("", response_model=PaginatedResponse[MistakeResponse])
+@router.get("", response_model=PaginatedResponse[MistakeResponse], response_model_exclude_unset=True)
 async def get_mistakes(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1, description="页码，从1开始"),
     page_size: int = Query(12, ge=1, le=100, description="每页记录数"),
     search: Optional[str] = Query(None, description="搜索关键词"),
     keyword: Optional[str] = Query(None, description="搜索关键词（兼容旧参数）"),
     tags: Optional[str] = Query(None, description="知识点标签，用逗号分隔"),
     knowledge_tag: Optional[str] = Query(None, description="单个知识点标签（前端参数名）"),
+    tag_match: str = Query("any", pattern="^(any|all)$", description="标签匹配方式：any 含任一标签，all 含全部标签（标签均按完整名称精确匹配）"),
     difficulty: Optional[DifficultyLevel] = Query(None, description="难度级别"),
-    question_type: Optional[QuestionType] = Query(None, description="题目类型")
+    question_type: Optional[QuestionType] = Query(None, description="题目类型"),
+    fields: Optional[str] = Query(None, description="只返回指定字段，用逗号分隔（id总是返回）；默认返回除analysis_result外的全部字段"),
+    sort: Optional[str] = Query(None, pattern="^(created_at|updated_at|difficulty)$", description="排序字段；默认有关键词时按相关度，否则按录入顺序"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="排序方向"),
+    cursor: Optional[str] = Query(None, description="游标分页：传入上一页返回的next_cursor，首页传空字符串；未指定sort时按创建时间排序，忽略page")
 ):
-    """获取错题列表"""
+    """获取错题列表（支持 If-None-Match，数据未变化时返回304）"""
+    # 先校验参数，非法请求即使携带匹配的ETag也返回400
+    descending = order == "desc"
+    try:
+        field_list = normalize_fields([f.strip() for f in fields.split(",") if f.strip()]) if fields else LIST_FIELDS
+        cursor_sort = sort or "created_at"
+        cursor_key = decode_cursor(cursor, cursor_sort, descending) if cursor is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    not_modified = _not_modified(request, response, _collection_etag())
+    if not_modified:
+        return not_modified
+
     try:
         # 解析标签：优先使用tags参数，其次使用knowledge_tag参数
         tag_list = None
@@ -68,37 +122,75 @@ async def get_mistakes(
         # 兼容性处理：优先使用search，其次使用keyword
         search_keyword = search if search is not None else keyword
 
-        # 搜索错题
-        mistakes = data_manager.search_mistakes(
+        filters = dict(
             keyword=search_keyword,
             tags=tag_list,
             difficulty=difficulty,
-            question_type=question_type
+            question_type=question_type,
+            fields=field_list,
+            tag_match=tag_match
         )
-
-        # 计算分页数据
-        total = len(mistakes)
+        next_cursor = None
+        if cursor is not None:
+            # 游标分页：从有序索引中定位，不受页码深度和并发插入影响
+            paginated_items, total, next_key = data_manager.query_mistakes_after(
+                cursor=cursor_key, limit=page_size, sort=cursor_sort, descending=descending, **filters
+            )
+            next_cursor = encode_cursor(next_key, cursor_sort, descending) if next_key else None
+        else:
+            # 搜索错题，数据管理器只转换当前页；排序由有序索引提供
+            skip = (page - 1) * page_size
+            paginated_items, total = data_manager.query_mistakes(
+                offset=skip, limit=page_size, sort=sort, descending=descending, **filters
+            )
         total_pages = (total + page_size - 1) // page_size if page_size > 0 else 0
 
-        # 分页计算
-        skip = (page - 1) * page_size
-        end_idx = skip + page_size
-        paginated_items = mistakes[skip:end_idx]
-
         # 返回分页响应
         return PaginatedResponse[MistakeResponse](
             items=paginated_items,
             total=total,
             page=page,
             page_size=page_size,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=next_cursor
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取错题列表失败: {str(e)}")
 
+@router.get("/changes", response_model=ChangesResponse, response_model_exclude_unset=True)
+async def get_changes(
+    since: int = Query(..., ge=0, description="上次同步得到的数据版本号；首次同步传0，返回 full_resync 时须先下载完整列表"),
+    instance: Optional[str] = Query(None, description="上次同步得到的实例标识，与当前不一致时须全量同步"),
+    fields: Optional[str] = Query(None, description="items 只返回指定字段，用逗号分隔（id总是返回）；默认与列表接口相同")
+):
+    """获取自某个数据版本号之后创建、更新或删除的错题，用于客户端增量同步"""
+    try:
+        field_list = normalize_fields([f.strip() for f in fields.split(",") if f.strip()]) if fields else LIST_FIELDS
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        instance_id = data_manager.instance_id
+        if instance is not None and instance != instance_id:
+            # 服务重启或切换了后端，版本号不再可比
+            return ChangesResponse(
+                instance_id=instance_id, version=data_manager.data_version, full_resync=True, changes=[], items=[]
+            )
+        result = data_manager.get_changes(since, field_list)
+        return ChangesResponse(instance_id=instance_id, **result)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取变更失败: {str(e)}")
+
 @router.get("/{mistake_id}", response_model=MistakeResponse)
-async def get_mistake(mistake_id: str):
-    """根据ID获取错题详情"""
+async def get_mistake(mistake_id: str, request: Request, response: Response):
+    """根据ID获取错题详情（支持 If-None-Match，记录未更新时返回304）"""
+    version = data_manager.record_version(mistake_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="错题不存在")
+    not_modified = _not_modified(request, response, f'"{mistake_id}-{version}"')
+    if not_modified:
+        return not_modified
+
     mistake = data_manager.get_mistake(mistake_id)
     if not mistake:
         raise HTTPException(status_code=404, detail="错题不存在")
@@ -125,14 +217,31 @@ async def delete_mistake(mistake_id: str):
         raise HTTPException(status_code=404, detail="错题不存在或删除失败")
     return {"message": "错题删除成功", "mistake_id": mistake_id}
 
-@router.post("/{mistake_id}/analyze", response_model=AnalysisResponse)
-async def analyze_mistake(mistake_id: str):
-    """AI分析错题"""
+def _stored_analysis(mistake: MistakeResponse, input_hash: str, model: str) -> Optional[AnalysisResponse]:
+    """已保存的分析结果在输入与模型都未变化时仍然有效，返回该结果，否则返回None"""
+    stored = mistake.analysis_result
+    if not stored or stored.get("input_hash") != input_hash or stored.get("model") != model:
+        return None
+    try:
+        return AnalysisResponse(**stored)
+    except ValueError:
+        return None
+
+async def _run_analysis(mistake_id: str, force: bool = False) -> AnalysisResponse:
+    """分析错题并保存结果；题目、错误过程与答案都未修改且模型未变化时，直接返回已保存的分析结果"""
     # 先获取错题信息
     mistake = data_manager.get_mistake(mistake_id)
     if not mistake:
         raise HTTPException(status_code=404, detail="错题不存在")
 
+    input_hash = analysis_input_hash(
+        mistake.question_content, mistake.wrong_process, mistake.wrong_answer, mistake.correct_answer
+    )
+    if not force:
+        stored = _stored_analysis(mistake, input_hash, ai_engine.active_model)
+        if stored is not None:
+            return stored
+
     # 创建分析请求
     request = AnalysisRequest(
         mistake_id=mistake_id,
@@ -144,10 +253,11 @@ async def analyze_mistake(mistake_id: str):
 
     # 调用AI引擎分析
     try:
-        analysis = ai_engine.analyze_mistake(request)
+        # 强制重新分析时同时跳过模型响应缓存
+        analysis, model = await ai_engine.analyze_mistake_with_model_async(request, use_cache=not force)
 
         # 保存分析结果到数据系统
-        success = data_manager.update_mistake_analysis(mistake_id, analysis)
+        success = data_manager.update_mistake_analysis(mistake_id, analysis, input_hash, model)
         if not success:
             safe_print(f"[WARN] 分析结果保存失败，但分析已完成: {mistake_id}")
         else:
@@ -157,15 +267,133 @@ async def analyze_mistake(mistake_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI分析失败: {str(e)}")
 
+async def _analysis_job(mistake_id: str, force: bool) -> dict:
+    """后台分析任务的执行函数"""
+    return (await _run_analysis(mistake_id, force)).model_dump()
+
+job_queue.set_handler(_analysis_job)
+
+@router.post(
+    "/{mistake_id}/analyze",
+    response_model=AnalysisResponse,
+    responses={202: {"model": AnalysisJobResponse, "description": "async=true 时返回已提交的后台任务"}}
+)
+async def analyze_mistake(
+    mistake_id: str,
+    force: bool = Query(False, description="忽略已保存的分析结果，重新调用模型分析"),
+    run_async: bool = Query(False, alias="async", description="提交为后台任务，立即返回任务ID，结果通过 /api/jobs/{job_id} 查询")
+):
+    """AI分析错题
+
+    题目、错误过程与答案都未修改且模型未变化时，直接返回已保存的分析结果。
+    """
+    if not run_async:
+        return await _run_analysis(mistake_id, force)
+
+    if data_manager.record_version(mistake_id) is None:
+        raise HTTPException(status_code=404, detail="错题不存在")
+    job = await job_queue.submit(mistake_id, force)
+    return JSONResponse(
+        status_code=202,
+        content=AnalysisJobResponse(**job).model_dump(mode="json"),
+        headers={"Location": f"/api/jobs/{job['job_id']}"}
+    )
+
+@router.post("/{mistake_id}/analyze/stream")
+async def analyze_mistake_stream(mistake_id: str, force: bool = Query(False, description="忽略已保存的分析结果，重新调用模型分析")):
+    """流式AI分析错题（SSE）
+
+    模型每生成一段文本发送一个 token 事件，结束时保存分析结果并发送 result 事件（AnalysisResponse）。
+    已保存的分析结果仍然有效时只发送 result 事件。
+    """
+    mistake = data_manager.get_mistake(mistake_id)
+    if not mistake:
+        raise HTTPException(status_code=404, detail="错题不存在")
+
+    input_hash = analysis_input_hash(
+        mistake.question_content, mistake.wrong_process, mistake.wrong_answer, mistake.correct_answer
+    )
+    stored = None if force else _stored_analysis(mistake, input_hash, ai_engine.active_model)
+
+    request = AnalysisRequest(
+        mistake_id=mistake_id,
+        question_content=mistake.question_content,
+        wrong_process=mistake.wrong_process,
+        wrong_answer=mistake.wrong_answer,
+        correct_answer=mistake.correct_answer
+    )
+
+    async def events():
+        if stored is not None:
+            yield format_event("result", stored.model_dump())
+            return
+        try:
+            async for event, data in ai_engine.stream_analysis(request, use_cache=not force):
+                if event == "token":
+                    yield format_event("token", {"text": data})
+                    continue
+                analysis, model = data
+                if data_manager.update_mistake_analysis(mistake_id, analysis, input_hash, model):
+                    safe_print(f"[OK] 分析结果已保存到错题记录: {mistake_id}")
+                else:
+                    safe_print(f"[WARN] 分析结果保存失败，但分析已完成: {mistake_id}")
+                yield format_event("result", analysis.model_dump())
+        except Exception as e:
+            yield format_event("error", {"detail": f"AI分析失败: {str(e)}"})
+
+    return event_stream(events())
+
 @router.get("/stats/summary", response_model=StatsResponse)
-async def get_statistics():
+async def get_statistics(request: Request, response: Response):
     """获取错题统计摘要"""
+    not_modified = _not_modified(request, response, _collection_etag(dated=True))
+    if not_modified:
+        return not_modified
     try:
         stats = data_manager.get_statistics()
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取统计信息失败: {str(e)}")
 
+@router.get("/stats/trend", response_model=TrendResponse)
+async def get_trend(
+    request: Request,
+    response: Response,
+    granularity: str = Query("day", pattern="^(day|week|month)$", description="时间粒度"),
+    window: int = Query(30, ge=1, le=366, description="返回最近多少个时间桶")
+):
+    """获取按天/周/月分桶的录入、分析与复习正确率趋势"""
+    not_modified = _not_modified(request, response, _collection_etag(dated=True))
+    if not_modified:
+        return not_modified
+    try:
+        points = data_manager.get_trend(granularity, window)
+        return TrendResponse(granularity=granularity, window=window, points=points)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取趋势失败: {str(e)}")
+
+@router.get("/stats/heatmap", response_model=HeatmapResponse)
+async def get_heatmap(
+    request: Request,
+    response: Response,
+    granularity: str = Query("month", pattern="^(day|week|month)$", description="时间粒度"),
+    window: int = Query(12, ge=1, le=366, description="返回最近多少个时间桶")
+):
+    """获取 知识标签×难度×题型×时间桶 的错题数（按录入时间分桶，一道错题的每个标签各计一次）"""
+    not_modified = _not_modified(request, response, _collection_etag(dated=True))
+    if not_modified:
+        return not_modified
+    try:
+        version, cells = data_manager.get_heatmap(granularity, window)
+        return HeatmapResponse(granularity=granularity, window=window, data_version=version, cells=cells)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取热力图失败: {str(e)}")
+
+@router.get("/stats/query-cache")
+async def get_query_cache_stats():
+    """获取列表查询结果缓存的命中统计"""
+    return data_manager.query_cache.stats()
+
 @router.get("/types/list")
 async def get_question_types():
     """获取所有题目类型"""
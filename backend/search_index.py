@@ -0,0 +1,287 @@
+"""
+错题检索索引模块
+对题目内容、错误过程、备注建立增量维护的倒排索引，
+关键词搜索对倒排表求交集后只校验候选记录，结果按相关度排序
+（候选接近全部记录时改为顺序扫描，分页时只对前 k 条做部分排序，见 SearchIndex.top）；
+知识点标签建立 标签->错题ID 的倒排表，支持精确的任一/全部匹配。
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+import heapq
+import operator
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# 参与关键词搜索的字段；排序时题目内容中的出现次数权重为3，其余字段为1
+SEARCH_FIELDS = ('question_content', 'wrong_process', 'notes')
+_QUESTION_WEIGHT = 3
+
+# LaTeX命令（如 \frac、\sqrt）作为整体词项，比其中的字符二元组更有区分度
+_LATEX_COMMAND = re.compile(r'\\[a-z]{2,}')
+
+# 各字段小写文本拼接时使用的分隔符（关键词不会跨过分隔符匹配）
+_FIELD_SEPARATOR = '\x00'
+
+# 倒排表长度超过候选集的此倍数时停止求交集
+_INTERSECT_RATIO = 8
+
+# 最短的倒排表覆盖的记录超过存活记录的此比例时，直接顺序扫描全部记录，不再建立候选集
+_SCAN_RATIO = 0.5
+
+# 分页只需要前 k 条（k 不超过此数）时用 SearchIndex.top 做部分排序；
+# 更深的页对全部命中排序一次并缓存，比维护很大的堆更快
+TOP_K_MAX = 1000
+
+# 已删除的文档号超过此数量且多于存活文档时重建倒排表
+_REBUILD_MIN_DEAD = 1024
+
+
+def tokenize(text: str) -> Set[str]:
+    """将小写文本切分为索引词项
+
+    词项包括：每个字符（单字）、相邻两个字符（二元组，中文无需分词）以及LaTeX命令。
+    任意长度≥2的子串的所有二元组都必然出现在原文的词项中，因此索引结果不会漏掉子串匹配。
+    """
+    tokens = set(text)
+    tokens.update(map(operator.add, text, text[1:]))
+    tokens.update(_LATEX_COMMAND.findall(text))
+    return tokens
+
+
+def query_tokens(needle: str) -> Set[str]:
+    """关键词（已小写）对应的必要词项
+
+    只保留后面不再紧跟字母的完整LaTeX命令，"\\fra" 这样被截断的命令不能作为词项。
+    """
+    if len(needle) == 1:
+        return {needle}
+    tokens = {needle[i:i + 2] for i in range(len(needle) - 1)}
+    tokens.update(
+        match.group() for match in _LATEX_COMMAND.finditer(needle)
+        if match.end() < len(needle)
+    )
+    return tokens
+
+
+class SearchIndex:
+    """增量维护的倒排索引
+
+    每条记录分配一个整数文档号，倒排表为紧凑的 array('i')。
+    更新记录时分配新文档号、旧文档号作废，作废过多时整体重建倒排表。
+    """
+
+    def __init__(self):
+        """初始化空索引"""
+        self._postings: Dict[str, array] = {}
+        # 文档号 -> (错题ID, 小写的题目内容, 其余搜索字段小写后以分隔符拼接, 首次加入顺序)，None表示已作废；
+        # 计分时按文档号直接取出全部所需数据
+        self._docs: List[Optional[Tuple[str, str, str, int]]] = []
+        self._docno: Dict[str, int] = {}                  # 错题ID -> 当前文档号
+        self._order: Dict[str, int] = {}                  # 错题ID -> 首次加入顺序，用于同分排序
+        self._next_order = 0
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._docno)
+
+    def add(self, mistake_id: str, row: Dict[str, str]):
+        """加入或更新一条记录"""
+        question, *others = (row.get(field, '').lower() for field in SEARCH_FIELDS)
+        text = (question, _FIELD_SEPARATOR.join(others))
+        docno = self._docno.get(mistake_id)
+        if docno is not None and self._docs[docno][1:3] == text:
+            return
+        self._discard(mistake_id)
+        if mistake_id not in self._order:
+            self._order[mistake_id] = self._next_order
+            self._next_order += 1
+        self._index(mistake_id, text)
+
+    def remove(self, mistake_id: str):
+        """删除一条记录"""
+        self._discard(mistake_id)
+        self._order.pop(mistake_id, None)
+
+    def search(self, keyword: str) -> List[str]:
+        """返回包含关键词（不区分大小写的子串匹配）的错题ID，按相关度从高到低排序
+
+        相关度为关键词在各字段中出现次数的加权和（题目内容权重最高），同分时按加入顺序。
+        每条命中都要计分，宽泛的关键词耗时与命中数成正比；只需要前几页时用 top。
+        """
+        needle = keyword.lower()
+        scored = []
+        for mistake_id, question, others, order in self._candidates(needle):
+            # 计分同时完成子串校验：得分为0即不包含关键词
+            score = _QUESTION_WEIGHT * question.count(needle) + others.count(needle)
+            if score:
+                scored.append((-score, order, mistake_id))
+        scored.sort()
+        return [mistake_id for _, _, mistake_id in scored]
+
+    def top(self, keyword: str, k: int) -> Tuple[List[str], int]:
+        """相关度最高的 k 条错题ID（与 search 结果的前 k 条相同）及命中总数
+
+        只维护 k 个元素的最小堆，堆顶是其中相关度最低的一条，不对全部命中排序。
+        """
+        needle = keyword.lower()
+        heap: List[Tuple[int, int, str]] = []   # (得分, 负的加入顺序, 错题ID)
+        total = 0
+        for mistake_id, question, others, order in self._candidates(needle):
+            score = _QUESTION_WEIGHT * question.count(needle) + others.count(needle)
+            if not score:
+                continue
+            total += 1
+            if len(heap) < k:
+                heapq.heappush(heap, (score, -order, mistake_id))
+            elif score > heap[0][0] or (score == heap[0][0] and -order > heap[0][1]):
+                heapq.heapreplace(heap, (score, -order, mistake_id))
+        heap.sort(reverse=True)
+        return [mistake_id for _, _, mistake_id in heap], total
+
+    def _candidates(self, needle: str) -> Iterable[Tuple[str, str, str, int]]:
+        """可能包含关键词的记录（须再做子串校验）"""
+        if not needle or _FIELD_SEPARATOR in needle or not self._docno:
+            return ()
+
+        postings = []
+        for token in query_tokens(needle):
+            posting = self._postings.get(token)
+            if posting is None:
+                return ()
+            postings.append(posting)
+
+        postings.sort(key=len)
+        if len(postings[0]) > _SCAN_RATIO * len(self._docno):
+            # 候选接近全部记录：顺序扫描比建立候选集再逐个取出更快
+            return filter(None, self._docs)
+
+        # 从最短的倒排表开始求交集；剩余的倒排表比候选集大得多时不再求交，
+        # 交给子串校验过滤更划算
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if len(posting) > _INTERSECT_RATIO * len(candidates):
+                break
+            candidates.intersection_update(posting)
+        return filter(None, map(self._docs.__getitem__, candidates))
+
+    def _index(self, mistake_id: str, text: Tuple[str, str]):
+        docno = len(self._docs)
+        self._docs.append((mistake_id, *text, self._order[mistake_id]))
+        self._docno[mistake_id] = docno
+
+        # 分隔符两侧产生的多余词项只会扩大候选集，不影响结果
+        postings = self._postings
+        for token in tokenize(_FIELD_SEPARATOR.join(text)):
+            posting = postings.get(token)
+            if posting is None:
+                postings[token] = array('i', (docno,))
+            else:
+                posting.append(docno)
+
+    def _discard(self, mistake_id: str):
+        docno = self._docno.pop(mistake_id, None)
+        if docno is None:
+            return
+        self._docs[docno] = None
+        self._dead += 1
+        if self._dead >= _REBUILD_MIN_DEAD and self._dead > len(self._docno):
+            self._rebuild()
+
+    def _rebuild(self):
+        """丢弃作废的文档号，按加入顺序重新建立倒排表"""
+        docs = sorted(filter(None, self._docs), key=operator.itemgetter(3))
+        self._postings = {}
+        self._docs = []
+        self._docno = {}
+        self._dead = 0
+        for mistake_id, question, others, _ in docs:
+            self._index(mistake_id, (question, others))
+
+
+def split_tags(tags_str: str) -> Tuple[str, ...]:
+    """解析逗号分隔的知识标签（去除空白与空标签，保持原顺序并去重）"""
+    return tuple(dict.fromkeys(tag.strip() for tag in tags_str.split(',') if tag.strip()))
+
+
+class TagIndex:
+    """知识点标签倒排表
+
+    标签按完整名称精确匹配："积分" 不会匹配 "定积分"。
+    """
+
+    def __init__(self):
+        """初始化空索引"""
+        self._postings: Dict[str, Set[str]] = {}          # 标签 -> 错题ID集合
+        self._tags: Dict[str, Tuple[str, ...]] = {}       # 错题ID -> 标签
+        self._order: Dict[str, int] = {}                  # 错题ID -> 首次加入顺序，结果按此排序
+        self._next_order = 0
+        self._ranking: Optional[List[Tuple[str, int]]] = None  # most_common 的缓存，标签变化时失效
+
+    def add(self, mistake_id: str, row: Dict[str, str]):
+        """加入或更新一条记录"""
+        tags = split_tags(row.get('knowledge_tags', ''))
+        old_tags = self._tags.get(mistake_id, ())
+        if mistake_id not in self._order:
+            self._order[mistake_id] = self._next_order
+            self._next_order += 1
+        if tags == old_tags:
+            return
+        self._ranking = None
+        for tag in set(old_tags).difference(tags):
+            self._unlink(tag, mistake_id)
+        for tag in set(tags).difference(old_tags):
+            self._postings.setdefault(tag, set()).add(mistake_id)
+        self._tags[mistake_id] = tags
+
+    def remove(self, mistake_id: str):
+        """删除一条记录"""
+        tags = self._tags.pop(mistake_id, ())
+        if tags:
+            self._ranking = None
+        for tag in tags:
+            self._unlink(tag, mistake_id)
+        self._order.pop(mistake_id, None)
+
+    def match(self, tags: Iterable[str], mode: str = "any") -> List[str]:
+        """返回匹配标签的错题ID（按加入顺序）
+
+        Args:
+            tags: 要匹配的标签，空白与空标签会被忽略
+            mode: "any" 含任一标签即匹配，"all" 须包含全部标签
+        """
+        wanted = list(dict.fromkeys(tag.strip() for tag in tags if tag.strip()))
+        postings = [self._postings.get(tag, set()) for tag in wanted]
+        if not postings:
+            return []
+        if mode == "all":
+            postings.sort(key=len)
+            matched = postings[0].intersection(*postings[1:])
+        elif mode == "any":
+            matched = set().union(*postings)
+        else:
+            raise ValueError(f"不支持的标签匹配方式: {mode}（可选: any, all）")
+        return sorted(matched, key=self._order.__getitem__)
+
+    def tags(self, mistake_id: str) -> Tuple[str, ...]:
+        """某条记录的标签（记录不存在或没有标签时为空）"""
+        return self._tags.get(mistake_id, ())
+
+    def most_common(self, n: int = None) -> List[Tuple[str, int]]:
+        """按错题数从多到少返回标签及其错题数（结果缓存到标签下次变化为止）"""
+        if self._ranking is None:
+            self._ranking = sorted(
+                ((tag, len(ids)) for tag, ids in self._postings.items()),
+                key=lambda item: item[1], reverse=True
+            )
+        return list(self._ranking) if n is None else self._ranking[:n]
+
+    def _unlink(self, tag: str, mistake_id: str):
+        ids = self._postings.get(tag)
+        if ids is not None:
+            ids.discard(mistake_id)
+            if not ids:
+                del self._postings[tag]
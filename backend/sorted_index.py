@@ -0,0 +1,94 @@
+"""
+有序二级索引模块
+按 (排序值, 错题ID) 维护有序数组，写操作时用二分查找增量更新，
+按排序值分页或从游标位置继续读取只需 O(log N + 页大小)。
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+SortKey = Tuple[Any, str]
+
+
+class SortedIndex:
+    """按 (排序值, 错题ID) 升序排列的有序数组
+
+    错题ID参与排序，排序值相同的记录也有确定的先后顺序，可以作为游标使用。
+    """
+
+    def __init__(self, value: Callable[[Dict[str, str]], Any] = None):
+        """初始化空索引
+
+        Args:
+            value: 从原始行取得排序值的函数（只用 load_keys 建立索引时可以不传）
+        """
+        self._value = value
+        self._keys: List[SortKey] = []
+        self._values: Dict[str, Any] = {}    # 错题ID -> 当前排序值
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def key(self, mistake_id: str, row: Dict[str, str]) -> SortKey:
+        """原始行在索引中的排序键"""
+        return self._value(row), mistake_id
+
+    def rebuild(self, items: Iterable[Tuple[str, Dict[str, str]]]):
+        """由 (错题ID, 原始行) 批量重建索引（一次排序，用于启动加载）"""
+        self._values = {mistake_id: self._value(row) for mistake_id, row in items}
+        self._keys = sorted((value, mistake_id) for mistake_id, value in self._values.items())
+
+    def load_keys(self, keys: Iterable[SortKey]):
+        """由 (排序值, 错题ID) 直接建立索引（用于排序值已由数据库算出的情况）"""
+        self._keys = sorted(keys)
+        self._values = {mistake_id: value for value, mistake_id in self._keys}
+
+    def key_of(self, mistake_id: str) -> Optional[SortKey]:
+        """记录当前在索引中的排序键，不在索引中时返回None"""
+        if mistake_id not in self._values:
+            return None
+        return self._values[mistake_id], mistake_id
+
+    def add(self, mistake_id: str, row: Dict[str, str]):
+        """加入或更新一条记录"""
+        value = self._value(row)
+        if mistake_id in self._values:
+            if self._values[mistake_id] == value:
+                return
+            self.remove(mistake_id)
+        self._values[mistake_id] = value
+        insort(self._keys, (value, mistake_id))
+
+    def remove(self, mistake_id: str):
+        """删除一条记录"""
+        if mistake_id not in self._values:
+            return
+        key = (self._values.pop(mistake_id), mistake_id)
+        pos = bisect_left(self._keys, key)
+        if pos < len(self._keys) and self._keys[pos] == key:
+            del self._keys[pos]
+
+    def slice(self, offset: int = 0, limit: int = None, descending: bool = False) -> List[str]:
+        """按位置取出一段错题ID"""
+        keys = self._keys
+        end = None if limit is None else offset + limit
+        if descending:
+            n = len(keys)
+            lo = 0 if end is None else max(n - end, 0)
+            return [mistake_id for _, mistake_id in reversed(keys[lo:max(n - offset, 0)])]
+        return [mistake_id for _, mistake_id in keys[offset:end]]
+
+    def after(self, cursor: Optional[SortKey], limit: int = None, descending: bool = False) -> List[str]:
+        """返回排在游标之后的错题ID，cursor 为None时从头开始"""
+        keys = self._keys
+        if descending:
+            end = len(keys) if cursor is None else bisect_left(keys, tuple(cursor))
+            start = 0 if limit is None else max(end - limit, 0)
+            return [mistake_id for _, mistake_id in reversed(keys[start:end])]
+        start = 0 if cursor is None else bisect_right(keys, tuple(cursor))
+        end = None if limit is None else start + limit
+        return [mistake_id for _, mistake_id in keys[start:end]]
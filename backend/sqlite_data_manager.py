@@ -0,0 +1,709 @@
+"""
+SQLite数据管理模块
+与 CSVDataManager 接口一致的嵌入式数据库存储后端，
+通过环境变量 DATA_BACKEND=sqlite 启用。
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Iterable, List, Optional, Dict, Any, Tuple, Union
+
+from analysis_store import ANALYSIS_REF_PREFIX, content_ref, is_analysis_ref
+from search_index import SearchIndex, TagIndex, SEARCH_FIELDS, TOP_K_MAX
+from data_models import MistakeCreate, MistakeResponse, MistakeUpdate, DifficultyLevel, QuestionType, AnalysisResponse
+from sorted_index import SortedIndex, SortKey
+from stats_counters import StatsCounters
+from rollups import TrendRollups, HeatmapCube
+from change_feed import ChangeLog
+from query_cache import QueryCache, filter_key
+from data_manager import (
+    CSVDataManager, CSV_COLUMNS, safe_print, mistake_to_row, update_to_changes,
+    analysis_to_json, row_to_mistake_response, rows_to_mistake_responses, normalize_fields, sort_key
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mistakes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    question_content TEXT NOT NULL DEFAULT '',
+    wrong_process TEXT NOT NULL DEFAULT '',
+    wrong_answer TEXT NOT NULL DEFAULT '',
+    correct_answer TEXT NOT NULL DEFAULT '',
+    question_type TEXT NOT NULL DEFAULT '',
+    knowledge_tags TEXT NOT NULL DEFAULT '',
+    difficulty TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    notes TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL DEFAULT '',
+    analysis_result TEXT NOT NULL DEFAULT '',
+    analyzed_at TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_mistakes_difficulty ON mistakes (difficulty);
+CREATE INDEX IF NOT EXISTS idx_mistakes_question_type ON mistakes (question_type);
+CREATE INDEX IF NOT EXISTS idx_mistakes_created_at ON mistakes (created_at);
+CREATE TABLE IF NOT EXISTS analyses (
+    mistake_id TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (mistake_id, ref)
+);
+"""
+
+_SELECT_COLUMNS = ", ".join(CSV_COLUMNS)
+# 主表 analysis_result 列只保存引用，读取完整分析结果时从 analyses 表取出内容；
+# 旧数据中内嵌的JSON原样返回
+_ANALYSIS_COLUMN = (
+    f"CASE WHEN analysis_result LIKE '{ANALYSIS_REF_PREFIX}%' THEN COALESCE(("
+    "SELECT content FROM analyses WHERE analyses.mistake_id = mistakes.id "
+    "AND analyses.ref = mistakes.analysis_result), '') "
+    "ELSE analysis_result END AS analysis_result"
+)
+# 排序字段对应的SQL表达式，难度按 简单 < 中等 < 困难 < 专家 排序
+_SORT_EXPRESSIONS = {
+    'created_at': "created_at",
+    'updated_at': "updated_at",
+    'difficulty': "(CASE difficulty " + " ".join(
+        f"WHEN '{level.value}' THEN {rank}" for rank, level in enumerate(DifficultyLevel)
+    ) + f" ELSE {len(DifficultyLevel)} END)",
+}
+# 每个排序字段一个 (排序表达式, id) 复合索引，排序分页和游标定位都可以直接走索引
+_SORT_INDEX_SQL = "".join(
+    f"CREATE INDEX IF NOT EXISTS idx_mistakes_sort_{field} ON mistakes ({expression}, id);\n"
+    for field, expression in _SORT_EXPRESSIONS.items()
+)
+# 内存索引与统计计数用到的列
+_INDEXED_FIELDS = (
+    *SEARCH_FIELDS, 'knowledge_tags', 'question_type', 'difficulty',
+    'created_at', 'updated_at', 'analyzed_at', 'analysis_result'
+)
+# 统计计数与时间汇总需要记住的列（更新或删除时据此撤销旧值的计数）
+_COUNTED_FIELDS = (
+    'question_type', 'difficulty', 'knowledge_tags', 'created_at', 'updated_at', 'analyzed_at', 'analysis_result'
+)
+_INDEXED_COLUMNS = ", ".join(('id', *_INDEXED_FIELDS))
+_READ_COLUMNS = ", ".join(_ANALYSIS_COLUMN if col == 'analysis_result' else col for col in CSV_COLUMNS)
+_INSERT_SQL = (
+    f"INSERT INTO mistakes ({_SELECT_COLUMNS}) "
+    f"VALUES ({', '.join('?' for _ in CSV_COLUMNS)})"
+)
+
+
+class SQLiteDataManager:
+    """SQLite数据管理器
+
+    使用WAL模式，读写互不阻塞；id、difficulty、question_type、created_at 均建有索引，
+    单条更新/删除为 O(log N) 的点操作。seq 自增列保留插入顺序，列表结果与CSV后端一致。
+    关键词搜索与标签筛选使用与CSV后端相同的内存倒排索引，启动时从数据库构建、随写操作增量维护。
+    """
+
+    def __init__(self, db_path: str = "data/mistakes.db"):
+        """初始化数据管理器"""
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            # 旧版本创建的数据库缺少后来增加的列
+            existing = {row['name'] for row in conn.execute("PRAGMA table_info(mistakes)")}
+            for column in CSV_COLUMNS:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE mistakes ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+            conn.executescript(_SORT_INDEX_SQL)
+        self._externalize_inline_analyses()
+
+        self._search_index = SearchIndex()
+        self._tag_index = TagIndex()
+        # 题型、难度计数与按时间分桶的汇总，统计接口直接读取；
+        # _counted 记录每条错题当前被计入的列值
+        self._stats = StatsCounters()
+        self._rollups = TrendRollups()
+        self._heatmap = HeatmapCube()
+        self._counted: Dict[str, Dict[str, str]] = {}
+        # 数据版本号：每次内存索引随写操作更新时加一，与实例标识一起用于HTTP ETag
+        self._data_version = 0
+        self.instance_id = uuid.uuid4().hex[:12]
+        self._changes = ChangeLog()
+        self.query_cache = QueryCache()
+        self._index_lock = threading.Lock()
+        for row in self._connect().execute(f"SELECT {_INDEXED_COLUMNS} FROM mistakes ORDER BY seq"):
+            self._index_row(row['id'], dict(row))
+        # 启动时已有的数据不算变更，早于此版本号的客户端须全量同步
+        self._changes.reset(self._data_version)
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接（每个线程一个连接）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _index_row(self, mistake_id: str, row: Optional[Dict[str, str]]):
+        """更新一条记录的关键词、标签索引与统计计数，row 为None表示记录已删除"""
+        with self._index_lock:
+            self._data_version += 1
+            counted = self._counted.pop(mistake_id, None)
+            if counted is not None:
+                self._stats.remove(counted)
+                self._rollups.add_row(counted, -1)
+                self._heatmap.add_row(counted, -1)
+            if row is not None or counted is not None:
+                op = 'delete' if row is None else 'create' if counted is None else 'update'
+                self._changes.record(self._data_version, mistake_id, op)
+            if row is None:
+                self._search_index.remove(mistake_id)
+                self._tag_index.remove(mistake_id)
+            else:
+                self._search_index.add(mistake_id, row)
+                self._tag_index.add(mistake_id, row)
+                counted = self._counted[mistake_id] = {field: row.get(field, '') for field in _COUNTED_FIELDS}
+                self._stats.add(counted)
+                self._rollups.add_row(counted)
+                self._heatmap.add_row(counted)
+
+    def _externalize_inline_analyses(self):
+        """将旧数据中内嵌在主表里的分析结果迁移到 analyses 表"""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT id, analysis_result FROM mistakes "
+            f"WHERE analysis_result != '' AND analysis_result NOT LIKE '{ANALYSIS_REF_PREFIX}%'"
+        ).fetchall()
+        if not rows:
+            return
+
+        with conn:
+            for mistake_id, raw_analysis in rows:
+                self._store_analysis(conn, mistake_id, raw_analysis)
+        safe_print(f"[FILE] 已将 {len(rows)} 条内嵌分析结果迁移到 analyses 表")
+
+    @staticmethod
+    def _store_analysis(conn: sqlite3.Connection, mistake_id: str, content: str) -> str:
+        """在当前事务中保存分析结果并让主表指向它，同时清理该错题的旧分析结果"""
+        ref = content_ref(content)
+        conn.execute(
+            "INSERT OR IGNORE INTO analyses (mistake_id, ref, content) VALUES (?, ?, ?)",
+            (mistake_id, ref, content)
+        )
+        conn.execute("DELETE FROM analyses WHERE mistake_id = ? AND ref != ?", (mistake_id, ref))
+        conn.execute("UPDATE mistakes SET analysis_result = ? WHERE id = ?", (ref, mistake_id))
+        return ref
+
+    @staticmethod
+    def _select_columns(fields: List[str] = None) -> str:
+        """投影查询的列，未指定时查询全部列
+
+        has_analysis 由 analysis_result 是否为空得出；只需要它时用标记值代替整列，
+        避免读出分析结果的JSON。
+        """
+        if fields is None:
+            return _READ_COLUMNS
+        columns = [
+            _ANALYSIS_COLUMN if field == 'analysis_result' else field
+            for field in fields if field != 'has_analysis'
+        ]
+        if 'has_analysis' in fields and 'analysis_result' not in fields:
+            columns.append("CASE WHEN analysis_result != '' THEN '1' ELSE '' END AS analysis_result")
+        return ", ".join(columns)
+
+    def _rows_to_responses(self, rows, fields: List[str] = None) -> List[MistakeResponse]:
+        return rows_to_mistake_responses([dict(row) for row in rows], fields)
+
+    def create_mistake(self, mistake: MistakeCreate) -> str:
+        """创建新的错题记录"""
+        conn = self._connect()
+        while True:
+            mistake_id = str(uuid.uuid4())[:8]  # 生成8位ID
+            row = mistake_to_row(mistake_id, mistake, datetime.now().isoformat())
+            try:
+                with conn:
+                    conn.execute(_INSERT_SQL, [row[col] for col in CSV_COLUMNS])
+                break
+            except sqlite3.IntegrityError:
+                # ID冲突，重新生成
+                continue
+
+        self._index_row(mistake_id, row)
+
+        safe_print(f"[OK] 创建了错题记录: {mistake_id}")
+        return mistake_id
+
+    def create_mistakes(self, mistakes: List[MistakeCreate]) -> Tuple[List[Optional[str]], Dict[int, str]]:
+        """批量创建错题记录
+
+        所有记录在同一个事务中写入；单条记录失败只回滚该条语句，不影响其他记录。
+
+        Returns:
+            Tuple[List[Optional[str]], Dict[int, str]]: 与输入一一对应的ID列表（失败为None），
+            以及失败记录的下标到错误信息的映射
+        """
+        ids: List[Optional[str]] = []
+        errors: Dict[int, str] = {}
+        created_rows = []
+        created_at = datetime.now().isoformat()
+        conn = self._connect()
+        with conn:
+            for idx, mistake in enumerate(mistakes):
+                try:
+                    while True:
+                        mistake_id = str(uuid.uuid4())[:8]  # 生成8位ID
+                        row = mistake_to_row(mistake_id, mistake, created_at)
+                        try:
+                            conn.execute(_INSERT_SQL, [row[col] for col in CSV_COLUMNS])
+                            break
+                        except sqlite3.IntegrityError:
+                            # ID冲突，重新生成
+                            continue
+                    ids.append(mistake_id)
+                    created_rows.append(row)
+                except Exception as e:
+                    ids.append(None)
+                    errors[idx] = str(e)
+
+        for row in created_rows:
+            self._index_row(row['id'], row)
+
+        safe_print(f"[OK] 批量创建了 {len(mistakes) - len(errors)} 条错题记录（失败 {len(errors)} 条）")
+        return ids, errors
+
+    def record_version(self, mistake_id: str) -> Optional[str]:
+        """单条记录的版本（最后更新时间），记录不存在时返回None"""
+        row = self._connect().execute("SELECT updated_at FROM mistakes WHERE id = ?", (mistake_id,)).fetchone()
+        return None if row is None else row['updated_at']
+
+    def get_mistake(self, mistake_id: str) -> Optional[MistakeResponse]:
+        """根据ID获取错题记录"""
+        try:
+            row = self._connect().execute(
+                f"SELECT {_READ_COLUMNS} FROM mistakes WHERE id = ?", (mistake_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            return row_to_mistake_response(dict(row))
+        except Exception as e:
+            safe_print(f"[ERROR] 获取错题失败: {e}")
+            return None
+
+    def get_tags(self, mistake_id: str) -> Optional[List[str]]:
+        """从内存标签索引读取错题的知识标签（不查询数据库），记录不存在时返回None"""
+        with self._index_lock:
+            if mistake_id not in self._counted:
+                return None
+            return list(self._tag_index.tags(mistake_id))
+
+    def get_all_mistakes(self, fields: List[str] = None) -> List[MistakeResponse]:
+        """获取所有错题记录，fields 指定时只查询和返回这些字段"""
+        fields = normalize_fields(fields)
+        try:
+            rows = self._connect().execute(
+                f"SELECT {self._select_columns(fields)} FROM mistakes ORDER BY seq"
+            ).fetchall()
+            return self._rows_to_responses(rows, fields)
+        except Exception as e:
+            safe_print(f"[ERROR] 获取所有错题失败: {e}")
+            return []
+
+    def _update_columns(self, mistake_id: str, changes: Dict[str, str]) -> bool:
+        assignments = ", ".join(f"{col} = ?" for col in changes)
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                f"UPDATE mistakes SET {assignments} WHERE id = ?",
+                [*changes.values(), mistake_id]
+            )
+        return cursor.rowcount > 0
+
+    def _reindex(self, mistake_id: str):
+        """按数据库中的最新内容更新一条记录的索引"""
+        row = self._connect().execute(
+            f"SELECT {_INDEXED_COLUMNS} FROM mistakes WHERE id = ?", (mistake_id,)
+        ).fetchone()
+        self._index_row(mistake_id, None if row is None else dict(row))
+
+    def update_mistake(self, mistake_id: str, update: MistakeUpdate) -> bool:
+        """更新错题记录"""
+        try:
+            changes = update_to_changes(update)
+            if not self._update_columns(mistake_id, changes):
+                return False
+            self._reindex(mistake_id)
+            safe_print(f"[OK] 更新了错题记录: {mistake_id}")
+            return True
+        except Exception as e:
+            safe_print(f"[ERROR] 更新错题失败: {e}")
+            return False
+
+    def delete_mistake(self, mistake_id: str) -> bool:
+        """删除错题记录"""
+        try:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute("DELETE FROM mistakes WHERE id = ?", (mistake_id,))
+                conn.execute("DELETE FROM analyses WHERE mistake_id = ?", (mistake_id,))
+            if cursor.rowcount == 0:
+                return False
+            self._index_row(mistake_id, None)
+            safe_print(f"[OK] 删除了错题记录: {mistake_id}")
+            return True
+        except Exception as e:
+            safe_print(f"[ERROR] 删除错题失败: {e}")
+            return False
+
+    def update_mistake_analysis(self, mistake_id: str, analysis: AnalysisResponse,
+                                input_hash: str = None, model: str = None) -> bool:
+        """更新错题的分析结果，input_hash 与 model 随分析结果一起保存"""
+        try:
+            conn = self._connect()
+            with conn:
+                now = datetime.now().isoformat()
+                cursor = conn.execute(
+                    "UPDATE mistakes SET updated_at = ?, analyzed_at = ? WHERE id = ?",
+                    (now, now, mistake_id)
+                )
+                if cursor.rowcount == 0:
+                    return False
+                # 分析结果写入 analyses 表，主表只保存引用
+                self._store_analysis(conn, mistake_id, analysis_to_json(analysis, input_hash, model))
+            self._reindex(mistake_id)
+            safe_print(f"[OK] 更新了错题分析结果: {mistake_id}")
+            return True
+        except Exception as e:
+            safe_print(f"[ERROR] 更新错题分析结果失败: {e}")
+            return False
+
+    def _filter(self, keyword: str = None, tags: List[str] = None,
+                difficulty: DifficultyLevel = None, question_type: QuestionType = None,
+                tag_match: str = "any") -> Tuple[str, List[Any], Optional[List[str]]]:
+        """生成筛选条件
+
+        Returns:
+            Tuple[str, List[Any], Optional[List[str]]]: WHERE子句、参数，
+            以及按相关度排序的候选ID（没有关键词和标签条件时为None，空列表表示无匹配）
+        """
+        clauses = []
+        params: List[Any] = []
+
+        ranked_ids = None
+        if keyword or tags:
+            ranked_ids = self.query_cache.get_or_compute(
+                ('search', *filter_key(keyword, tags, None, None, tag_match, None)), self._data_version,
+                lambda: self._search_ids(keyword, tags, tag_match)
+            )
+
+        if ranked_ids is not None:
+            clauses.append("id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(ranked_ids))
+
+        if difficulty:
+            clauses.append("difficulty = ?")
+            params.append(difficulty.value)
+
+        if question_type:
+            clauses.append("question_type = ?")
+            params.append(question_type.value)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params, ranked_ids
+
+    def _search_ids(self, keyword: str, tags: List[str], tag_match: str) -> List[str]:
+        """通过倒排索引查找匹配关键词和标签的错题ID，有关键词时按相关度排序"""
+        ranked_ids = None
+        with self._index_lock:
+            if keyword:
+                ranked_ids = self._search_index.search(keyword)
+            if tags:
+                tagged = self._tag_index.match(tags, tag_match)
+                if ranked_ids is None:
+                    ranked_ids = tagged
+                else:
+                    tagged = set(tagged)
+                    ranked_ids = [mistake_id for mistake_id in ranked_ids if mistake_id in tagged]
+        return ranked_ids
+
+    def _search_top(self, keyword: str, k: int) -> Tuple[List[str], int]:
+        """关键词相关度最高的 k 条错题ID及命中总数（含义与 CSVDataManager._search_top 相同）"""
+        def compute():
+            with self._index_lock:
+                return self._search_index.top(keyword, k)
+
+        key = ('top', k, *filter_key(keyword, None, None, None, "any", None))
+        return self.query_cache.get_or_compute(key, self._data_version, compute)
+
+    def _match(self, keyword: str = None, tags: List[str] = None,
+               difficulty: DifficultyLevel = None, question_type: QuestionType = None,
+               tag_match: str = "any", sort: str = None) -> Union[List[str], SortedIndex]:
+        """筛选结果（含义与 CSVDataManager._match 相同），按筛选条件与数据版本号缓存"""
+        def compute():
+            where, params, ranked_ids = self._filter(keyword, tags, difficulty, question_type, tag_match)
+            conn = self._connect()
+            if sort is None:
+                if ranked_ids is None:
+                    return [row[0] for row in conn.execute(f"SELECT id FROM mistakes {where} ORDER BY seq", params)]
+                if difficulty or question_type:
+                    matched = {row[0] for row in conn.execute(f"SELECT id FROM mistakes {where}", params)}
+                    ranked_ids = [mistake_id for mistake_id in ranked_ids if mistake_id in matched]
+                return ranked_ids
+            index = SortedIndex()
+            if ranked_ids is None or ranked_ids:
+                index.load_keys(
+                    (row[0], row[1]) for row in
+                    conn.execute(f"SELECT {_SORT_EXPRESSIONS[sort]}, id FROM mistakes {where}", params)
+                )
+            return index
+
+        key = filter_key(keyword, tags, difficulty, question_type, tag_match, sort)
+        return self.query_cache.get_or_compute(key, self._data_version, compute)
+
+    def _fetch_ranked(self, ranked_ids: List[str], fields: List[str] = None) -> List[MistakeResponse]:
+        """按给定ID顺序读取记录"""
+        rows = self._connect().execute(
+            f"SELECT {self._select_columns(fields)} FROM mistakes "
+            "WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(ranked_ids),)
+        ).fetchall()
+        rank = {mistake_id: i for i, mistake_id in enumerate(ranked_ids)}
+        rows.sort(key=lambda row: rank[row['id']])
+        return self._rows_to_responses(rows, fields)
+
+    def search_mistakes(self, keyword: str = None, tags: List[str] = None,
+                        difficulty: DifficultyLevel = None, question_type: QuestionType = None,
+                        fields: List[str] = None, tag_match: str = "any") -> List[MistakeResponse]:
+        """搜索错题记录，参数含义与 CSVDataManager.search_mistakes 相同"""
+        fields = normalize_fields(fields)
+        try:
+            if not (keyword or tags or difficulty or question_type):
+                rows = self._connect().execute(
+                    f"SELECT {self._select_columns(fields)} FROM mistakes ORDER BY seq"
+                ).fetchall()
+                return self._rows_to_responses(rows, fields)
+            ids = self._match(keyword, tags, difficulty, question_type, tag_match)
+            return self._fetch_ranked(ids, fields) if ids else []
+        except Exception as e:
+            safe_print(f"[ERROR] 搜索错题失败: {e}")
+            return []
+
+    def query_mistakes(self, keyword: str = None, tags: List[str] = None,
+                       difficulty: DifficultyLevel = None, question_type: QuestionType = None,
+                       fields: List[str] = None, tag_match: str = "any",
+                       offset: int = 0, limit: int = None,
+                       sort: str = None, descending: bool = False) -> Tuple[List[MistakeResponse], int]:
+        """分页搜索错题记录，参数含义与 CSVDataManager.query_mistakes 相同
+
+        没有筛选条件时排序、计数和分页都在SQL中完成；有筛选条件时匹配结果按筛选条件缓存，
+        翻页只读取当前页的记录。
+        """
+        fields = normalize_fields(fields)
+        sort_key(sort)  # 校验排序字段
+        end = None if limit is None else offset + limit
+        try:
+            if keyword and not (tags or difficulty or question_type) and sort is None \
+                    and end is not None and end <= TOP_K_MAX:
+                # 只按关键词相关度翻前几页：部分排序取前 end 条
+                top_ids, total = self._search_top(keyword, end)
+                page_ids = top_ids[offset:]
+                return (self._fetch_ranked(page_ids, fields) if page_ids else []), total
+
+            if keyword or tags or difficulty or question_type:
+                matched = self._match(keyword, tags, difficulty, question_type, tag_match, sort)
+                page_ids = matched[offset:end] if sort is None else matched.slice(offset, limit, descending)
+                return (self._fetch_ranked(page_ids, fields) if page_ids else []), len(matched)
+
+            conn = self._connect()
+            total = conn.execute("SELECT COUNT(*) FROM mistakes").fetchone()[0]
+            direction = "DESC" if descending else "ASC"
+            order_by = f"{_SORT_EXPRESSIONS[sort]} {direction}, id {direction}" if sort else "seq"
+            rows = conn.execute(
+                f"SELECT {self._select_columns(fields)} FROM mistakes "
+                f"ORDER BY {order_by} LIMIT ? OFFSET ?",
+                [-1 if limit is None else limit, offset]
+            ).fetchall()
+            return self._rows_to_responses(rows, fields), total
+        except Exception as e:
+            safe_print(f"[ERROR] 搜索错题失败: {e}")
+            return [], 0
+
+    def query_mistakes_after(self, cursor: Optional[SortKey] = None, limit: int = 12,
+                             keyword: str = None, tags: List[str] = None,
+                             difficulty: DifficultyLevel = None, question_type: QuestionType = None,
+                             fields: List[str] = None, tag_match: str = "any",
+                             sort: str = 'created_at',
+                             descending: bool = False) -> Tuple[List[MistakeResponse], int, Optional[SortKey]]:
+        """游标（keyset）分页，参数含义与 CSVDataManager.query_mistakes_after 相同
+
+        没有筛选条件时通过 (排序表达式, id) 复合索引定位游标位置；
+        有筛选条件时从按筛选条件缓存的有序索引中定位。
+        """
+        fields = normalize_fields(fields)
+        sort_key(sort)  # 校验排序字段
+        if keyword or tags or difficulty or question_type:
+            index = self._match(keyword, tags, difficulty, question_type, tag_match, sort)
+            # 多取一条判断是否还有下一页
+            ids = index.after(cursor, limit + 1, descending)
+            next_cursor = index.key_of(ids[limit - 1]) if len(ids) > limit else None
+            ids = ids[:limit]
+            return (self._fetch_ranked(ids, fields) if ids else []), len(index), next_cursor
+
+        conn = self._connect()
+        total = conn.execute("SELECT COUNT(*) FROM mistakes").fetchone()[0]
+
+        expression = _SORT_EXPRESSIONS[sort]
+        direction = "DESC" if descending else "ASC"
+        where, params = "", []
+        if cursor is not None:
+            # 等价于 (排序值, id) > 游标；拆成对首列的范围条件，表达式索引也能直接定位
+            op = '<' if descending else '>'
+            where = f"WHERE {expression} {op}= ? AND ({expression} {op} ? OR id {op} ?)"
+            params = [cursor[0], cursor[0], cursor[1]]
+        # 多取一条判断是否还有下一页；cursor_value 保证投影时也能生成游标
+        rows = conn.execute(
+            f"SELECT {self._select_columns(fields)}, {expression} AS cursor_value FROM mistakes {where} "
+            f"ORDER BY {expression} {direction}, id {direction} LIMIT ?", [*params, limit + 1]
+        ).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1]['cursor_value'], rows[-1]['id'])
+        return self._rows_to_responses(rows, fields), total, next_cursor
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息
+
+        读取增量维护的计数器和标签倒排表，不查询数据库；
+        距上次全量重算超过间隔时在后台线程用 GROUP BY 重算一次。
+        """
+        try:
+            with self._index_lock:
+                stats = self._stats.snapshot()
+                top_tags = self._tag_index.most_common(5)
+
+            if self._stats.claim_recount():
+                threading.Thread(target=self._recount_statistics, name="mistake-stats-recount", daemon=True).start()
+
+            if not stats["total_mistakes"]:
+                stats.update(top_knowledge_gaps=[], accuracy_trend=[])
+                return stats
+
+            # 知识标签直接取自标签倒排表
+            stats["top_knowledge_gaps"] = [tag for tag, _ in top_tags]
+
+            # 最近有复习记录的几周的正确率，尚无复习记录时为空
+            with self._index_lock:
+                stats["accuracy_trend"] = self._rollups.accuracy_trend()
+
+            return stats
+        except Exception as e:
+            safe_print(f"[ERROR] 获取统计信息失败: {e}")
+            return {}
+
+    def get_trend(self, granularity: str = 'day', window: int = 30) -> List[Dict[str, Any]]:
+        """按时间分桶的趋势，参数含义与 CSVDataManager.get_trend 相同"""
+        with self._index_lock:
+            return self._rollups.series(granularity, window)
+
+    def get_heatmap(self, granularity: str = 'month', window: int = 12) -> Tuple[int, List[Dict[str, Any]]]:
+        """数据版本号与热力图单元格，参数与返回值含义与 CSVDataManager.get_heatmap 相同"""
+        with self._index_lock:
+            version = self._data_version
+            return version, self._heatmap.cached_cells(granularity, window, version)
+
+    def get_changes(self, since: int, fields: List[str] = None) -> Dict[str, Any]:
+        """增量同步，参数与返回值含义与 CSVDataManager.get_changes 相同"""
+        with self._index_lock:
+            version = self._data_version
+            changes = self._changes.since(since) if since <= version else None
+        ids = [i for i, op, _ in changes or [] if op != 'delete']
+        return {
+            'version': version,
+            'full_resync': changes is None,
+            'changes': [{'id': i, 'op': op, 'version': v} for i, op, v in changes or []],
+            'items': self._fetch_ranked(ids, fields) if ids else []
+        }
+
+    @property
+    def data_version(self) -> int:
+        """数据版本号，任何写操作（包括记录复习结果）后都会增大"""
+        return self._data_version
+
+    def record_review(self, timestamp: Union[str, datetime], correct: Union[bool, int], reviewed: int = 1):
+        """把复习（练习）结果计入趋势汇总：共 reviewed 次，其中 correct 次做对"""
+        self.record_reviews([(timestamp, correct, reviewed)])
+
+    def record_reviews(self, reviews: Iterable[Tuple[Union[str, datetime], Union[bool, int], int]]):
+        """批量计入复习结果 (时间, 做对次数, 复习次数)，整批只增加一次数据版本号"""
+        with self._index_lock:
+            self._data_version += 1
+            for timestamp, correct, reviewed in reviews:
+                self._rollups.add_review(timestamp, correct, reviewed)
+
+    def _recount_statistics(self):
+        """全量重算统计计数，纠正可能的漂移（例如其他进程写入了同一个数据库）"""
+        try:
+            conn = self._connect()
+            total = conn.execute("SELECT COUNT(*) FROM mistakes").fetchone()[0]
+            by_type = dict(conn.execute("SELECT question_type, COUNT(*) FROM mistakes GROUP BY question_type").fetchall())
+            by_difficulty = dict(conn.execute("SELECT difficulty, COUNT(*) FROM mistakes GROUP BY difficulty").fetchall())
+            with self._index_lock:
+                drifted = self._stats.set_counts(total, by_type, by_difficulty)
+            if drifted:
+                safe_print("[WARN] 统计计数与全量重算结果不一致，已校正")
+        except Exception as e:
+            self._stats.release_recount()
+            safe_print(f"[ERROR] 重算统计信息失败: {e}")
+
+def migrate_csv_to_sqlite(csv_path: str, db_path: str) -> int:
+    """一次性将CSV数据（快照及变更日志）迁移到SQLite数据库
+
+    已存在的ID会被跳过，因此重复执行是安全的。
+
+    Returns:
+        int: 新写入的记录数
+    """
+    manager = SQLiteDataManager(db_path)
+    if not os.path.exists(csv_path):
+        return 0
+
+    # 通过CSVDataManager加载，确保包含尚未合并进快照的变更日志
+    csv_manager = CSVDataManager(csv_path)
+    rows = csv_manager.export_rows()
+
+    conn = manager._connect()
+    with conn:
+        before = conn.total_changes
+        conn.executemany(
+            f"INSERT OR IGNORE INTO mistakes ({_SELECT_COLUMNS}) "
+            f"VALUES ({', '.join('?' for _ in CSV_COLUMNS)})",
+            ([row.get(col, '') for col in CSV_COLUMNS] for row in rows)
+        )
+        migrated = conn.total_changes - before
+        # 分析结果从CSV后端的分析结果文件复制到 analyses 表
+        conn.executemany(
+            "INSERT OR IGNORE INTO analyses (mistake_id, ref, content) VALUES (?, ?, ?)",
+            (
+                (row['id'], row['analysis_result'], content)
+                for row in rows if is_analysis_ref(row['analysis_result'])
+                for content in [csv_manager.analysis_store.get(row['id'], row['analysis_result'])]
+                if content is not None
+            )
+        )
+
+    safe_print(f"[OK] 已从 {csv_path} 迁移 {migrated} 条记录到 {db_path}")
+    return migrated
+
+
+if __name__ == "__main__":
+    # 用法: python sqlite_data_manager.py [csv路径] [数据库路径]
+    import sys
+    csv_file = sys.argv[1] if len(sys.argv) > 1 else os.getenv("DATA_FILE_PATH", "data/mistakes.csv")
+    db_file = sys.argv[2] if len(sys.argv) > 2 else os.getenv("SQLITE_DB_PATH", "data/mistakes.db")
+    migrate_csv_to_sqlite(csv_file, db_file)
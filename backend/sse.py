@@ -0,0 +1,29 @@
+"""
+Server-Sent Events 工具模块
+把AI引擎的流式输出按 text/event-stream 格式逐条发送给客户端，不在服务端缓冲整段生成结果。
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+import json
+from typing import Any, AsyncIterator
+
+from fastapi.responses import StreamingResponse
+
+# 关闭代理（如 nginx）的响应缓冲，保证每个事件立即送达
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_event(event: str, data: Any) -> str:
+    """格式化一条SSE事件，data 编码为单行JSON"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def event_stream(events: AsyncIterator[str]) -> StreamingResponse:
+    """以 text/event-stream 响应逐条发送已格式化的事件"""
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
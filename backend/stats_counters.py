@@ -0,0 +1,107 @@
+"""
+错题统计计数器模块
+按题型、难度维护的计数随每次写操作增量更新，统计接口直接读取计数，
+耗时与错题总数无关；定期全量重算一次，防止计数漂移。
+
+作者: Rookie (error-T-T) & 艾可希雅
+GitHub ID: error-T-T
+学校邮箱: RookieT@e.gzhu.edu.cn
+"""
+
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable
+
+
+class StatsCounters:
+    """题型、难度计数器
+
+    计数器本身不加锁，由数据管理器在自己的锁内调用。
+    """
+
+    def __init__(self, recount_interval: float = None):
+        """初始化计数器
+
+        Args:
+            recount_interval: 全量重算的最小间隔（秒），默认读取环境变量 STATS_RECOUNT_INTERVAL
+        """
+        self.recount_interval = recount_interval or float(os.getenv("STATS_RECOUNT_INTERVAL", 3600))
+        self.total = 0
+        self.by_type: Counter = Counter()
+        self.by_difficulty: Counter = Counter()
+        self._last_recount = time.monotonic()
+        self._recounting = False
+        self._claim_lock = threading.Lock()
+
+    def add(self, row: Dict[str, str]):
+        """计入一条记录"""
+        self.total += 1
+        self.by_type[row.get('question_type', '')] += 1
+        self.by_difficulty[row.get('difficulty', '')] += 1
+
+    def remove(self, row: Dict[str, str]):
+        """移除一条记录"""
+        self.total -= 1
+        _decrement(self.by_type, row.get('question_type', ''))
+        _decrement(self.by_difficulty, row.get('difficulty', ''))
+
+    def replace(self, old_row: Dict[str, str], new_row: Dict[str, str]):
+        """记录被更新：只有题型或难度变化时才调整计数"""
+        if (old_row.get('question_type'), old_row.get('difficulty')) != \
+                (new_row.get('question_type'), new_row.get('difficulty')):
+            self.remove(old_row)
+            self.add(new_row)
+
+    def reset(self, rows: Iterable[Dict[str, str]]) -> bool:
+        """按全部记录重算计数
+
+        Returns:
+            bool: 重算前的增量计数是否与重算结果不一致（发生了漂移）
+        """
+        by_type: Counter = Counter()
+        by_difficulty: Counter = Counter()
+        total = 0
+        for row in rows:
+            total += 1
+            by_type[row.get('question_type', '')] += 1
+            by_difficulty[row.get('difficulty', '')] += 1
+        return self.set_counts(total, by_type, by_difficulty)
+
+    def set_counts(self, total: int, by_type: Dict[str, int], by_difficulty: Dict[str, int]) -> bool:
+        """用全量重算的结果覆盖计数，返回是否发生了漂移"""
+        drifted = (total, Counter(by_type), Counter(by_difficulty)) != \
+            (self.total, +self.by_type, +self.by_difficulty)
+        self.total = total
+        self.by_type = Counter(by_type)
+        self.by_difficulty = Counter(by_difficulty)
+        self._last_recount = time.monotonic()
+        self._recounting = False
+        return drifted
+
+    def claim_recount(self) -> bool:
+        """距上次重算已超过间隔且没有正在进行的重算时返回True，调用方负责执行重算"""
+        with self._claim_lock:
+            if self._recounting or time.monotonic() - self._last_recount < self.recount_interval:
+                return False
+            self._recounting = True
+            return True
+
+    def release_recount(self):
+        """重算失败时释放占用，下次统计请求会重新尝试"""
+        self._recounting = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前的总数与按题型、难度的计数（按数量从多到少）"""
+        return {
+            "total_mistakes": self.total,
+            "mistakes_by_type": dict(self.by_type.most_common()),
+            "mistakes_by_difficulty": dict(self.by_difficulty.most_common())
+        }
+
+
+def _decrement(counter: Counter, key: str):
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 import pytest
-from unittest.mock import MagicMock, patch
-from backend.ai_engine import AIEngine
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+from backend.ai_engine import AIEngine, get_ai_engine
+from backend.ai_engine.cache import LLMCache
 from backend.data_models import AnalysisRequest
 
 def test_ai_engine_initialization():
@@ -9,6 +12,9 @@ def test_ai_engine_initialization():
     assert engine is not None
     assert engine.prompt_manager is not None
 
+def test_ai_engine_is_shared():
+    assert get_ai_engine() is get_ai_engine()
+
 def test_generate_explanation_fallback():
     engine = AIEngine()
     engine.fallback_mode = True
@@ -57,3 +63,212 @@ def test_generate_solution_summary_call(mock_call):
     _, user_prompt = args[0], args[1]
     assert "Integration" in user_prompt
     assert "By Parts" in user_prompt
+
+@patch("backend.ai_engine.AIEngine._call_ollama_async", new_callable=AsyncMock)
+def test_analyze_mistake_async_call(mock_call):
+    engine = AIEngine()
+    engine.fallback_mode = False
+    engine.is_connected = True
+
+    mock_call.return_value = '{"error_type": "Sign Error", "root_cause": "Dropped minus", "confidence_score": 0.9}'
+    request = AnalysisRequest(
+        mistake_id="m1", question_content="Solve x^2=4", wrong_process="x=2",
+        wrong_answer="2", correct_answer="x=2 or x=-2"
+    )
+
+    analysis = asyncio.run(engine.analyze_mistake_async(request))
+
+    assert analysis.error_type == "Sign Error"
+    assert analysis.confidence_score == 0.9
+    args, kwargs = mock_call.call_args
+    assert "Solve x^2=4" in args[1]
+    assert kwargs["json_mode"] is True
+
+@patch("backend.ai_engine.AIEngine._call_ollama_async", new_callable=AsyncMock)
+def test_analyze_mistake_reports_model_used(mock_call):
+    engine = AIEngine()
+    engine.fallback_mode = False
+    engine.is_connected = True
+    request = AnalysisRequest(
+        mistake_id="m1", question_content="Solve x^2=4", wrong_process="x=2",
+        wrong_answer="2", correct_answer="x=2 or x=-2"
+    )
+
+    mock_call.return_value = '{"error_type": "Sign Error", "confidence_score": 0.9}'
+    _, model = asyncio.run(engine.analyze_mistake_with_model_async(request))
+    assert model == engine.model == engine.active_model
+
+    # Unparseable output falls back to mock analysis, which must not be attributed to the model
+    mock_call.return_value = "not json"
+    analysis, model = asyncio.run(engine.analyze_mistake_with_model_async(request))
+    assert model == "mock"
+    assert analysis.mistake_id == "m1"
+
+def test_stream_analysis_relays_tokens_then_result():
+    engine = AIEngine()
+    engine.fallback_mode = False
+    engine.is_connected = True
+    request = AnalysisRequest(
+        mistake_id="m1", question_content="Solve x^2=4", wrong_process="x=2",
+        wrong_answer="2", correct_answer="x=2 or x=-2"
+    )
+
+    async def collect(chunks):
+        async def fake_stream(*args, **kwargs):
+            for chunk in chunks:
+                yield chunk
+        with patch.object(engine, "_stream_ollama", fake_stream):
+            return [event async for event in engine.stream_analysis(request)]
+
+    events = asyncio.run(collect(['{"error_type": "Sign', ' Error", "confidence_score": 0.9}']))
+    assert [data for event, data in events if event == "token"] == ['{"error_type": "Sign', ' Error", "confidence_score": 0.9}']
+    event, (analysis, model) = events[-1]
+    assert (event, analysis.error_type, model) == ("result", "Sign Error", engine.model)
+
+    # Truncated output falls back to mock analysis
+    event, (analysis, model) = asyncio.run(collect(['{"error_type"']))[-1]
+    assert (event, model, analysis.mistake_id) == ("result", "mock", "m1")
+
+def test_async_client_of_previous_loop_is_closed():
+    engine = AIEngine()
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever)
+    thread.start()
+    try:
+        async def get_client():
+            return engine._get_async_client()
+
+        old_client = asyncio.run_coroutine_threadsafe(get_client(), other_loop).result(5)
+        new_client = asyncio.run(get_client())
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), other_loop).result(5)
+        assert new_client is not old_client
+        assert old_client.is_closed
+        assert not new_client.is_closed
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join()
+        other_loop.close()
+
+def test_call_ollama_reuses_cached_response(tmp_path):
+    engine = AIEngine()
+    engine.fallback_mode = False
+    engine.is_connected = True
+    engine.cache = LLMCache(disk_dir=str(tmp_path))
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"message": {"content": "Step 1: ..."}}
+    engine.client.post = MagicMock(return_value=response)
+
+    first = engine._call_ollama("sys", "Solve x^2=4", template="explanation_generation")
+    second = engine._call_ollama("sys", "Solve x^2=4", template="explanation_generation")
+    assert first == second == "Step 1: ..."
+    engine.client.post.assert_called_once()
+
+    # Different options are a different request
+    engine._call_ollama("sys", "Solve x^2=4", json_mode=True, template="explanation_generation")
+    assert engine.client.post.call_count == 2
+
+    # The on-disk tier survives a restart
+    engine.cache = LLMCache(disk_dir=str(tmp_path))
+    assert engine._call_ollama("sys", "Solve x^2=4", template="explanation_generation") == "Step 1: ..."
+    assert engine.client.post.call_count == 2
+
+def _fake_async_client(engine, contents):
+    responses = []
+    for content in contents:
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"message": {"content": content}}
+        responses.append(response)
+    client = MagicMock()
+    client.post = AsyncMock(side_effect=responses)
+    engine._get_async_client = lambda: client
+    return client
+
+def test_malformed_analysis_is_not_cached(tmp_path):
+    engine = AIEngine()
+    engine.fallback_mode = False
+    engine.is_connected = True
+    engine.cache = LLMCache(disk_dir=str(tmp_path))
+    request = AnalysisRequest(
+        mistake_id="m1", question_content="Solve x^2=4", wrong_process="x=2",
+        wrong_answer="2", correct_answer="x=2 or x=-2"
+    )
+    valid = '{"error_type": "Sign Error", "confidence_score": 0.9}'
+    client = _fake_async_client(engine, ["not json", valid])
+
+    _, model = asyncio.run(engine.analyze_mistake_with_model_async(request))
+    assert model == "mock"
+    # The malformed output was not cached, so the next analysis asks the model again
+    analysis, model = asyncio.run(engine.analyze_mistake_with_model_async(request))
+    assert (analysis.error_type, model) == ("Sign Error", engine.model)
+    analysis, _ = asyncio.run(engine.analyze_mistake_with_model_async(request))
+    assert analysis.error_type == "Sign Error"
+    assert client.post.call_count == 2
+
+def test_forced_analysis_bypasses_response_cache(tmp_path):
+    engine = AIEngine()
+    engine.fallback_mode = False
+    engine.is_connected = True
+    engine.cache = LLMCache(disk_dir=str(tmp_path))
+    request = AnalysisRequest(
+        mistake_id="m1", question_content="Solve x^2=4", wrong_process="x=2",
+        wrong_answer="2", correct_answer="x=2 or x=-2"
+    )
+    client = _fake_async_client(engine, [
+        '{"error_type": "Sign Error"}', '{"error_type": "Missing Root"}', '{"error_type": "Sign Error"}'
+    ])
+
+    asyncio.run(engine.analyze_mistake_with_model_async(request))
+    forced, _ = asyncio.run(engine.analyze_mistake_with_model_async(request, use_cache=False))
+    assert forced.error_type == "Missing Root"
+    assert client.post.call_count == 2
+
+    # The fresh output replaced the cached one
+    analysis, _ = asyncio.run(engine.analyze_mistake_with_model_async(request))
+    assert analysis.error_type == "Missing Root"
+    assert client.post.call_count == 2
+
+    # The streamed variant passes the flag through as well
+    calls = []
+
+    async def fake_stream(*args, **kwargs):
+        calls.append(kwargs)
+        yield '{"error_type": "Sign Error"}'
+
+    async def stream():
+        with patch.object(engine, "_stream_ollama", fake_stream):
+            return [event async for event in engine.stream_analysis(request, use_cache=False)]
+
+    asyncio.run(stream())
+    assert calls[0]["use_cache"] is False
+
+def test_llm_cache_ttl_and_size_limit(tmp_path):
+    cache = LLMCache(max_entries=1, disk_dir=str(tmp_path), ttl=60, disk_max_bytes=400)
+    for i in range(5):
+        cache.put(f"{i:064x}", "x" * 100)
+    assert cache.stats()["disk_bytes"] <= 400
+    assert cache.get(f"{4:064x}") == "x" * 100
+    assert cache.get(f"{0:064x}") is None
+
+    cache.ttl = 1e-9
+    assert cache.get(f"{4:064x}") is None
+
+def test_llm_cache_async_paths_and_zero_settings(tmp_path):
+    cache = LLMCache(max_entries=0, disk_dir=str(tmp_path), ttl=0, disk_max_bytes=0)
+    assert (cache.max_entries, cache.ttl, cache.disk_max_bytes) == (0, 0, 0)
+
+    async def roundtrip():
+        await cache.aput("a" * 64, "x" * 100)
+        return await cache.aget("a" * 64), await cache.aget("b" * 64)
+
+    # Memory tier disabled: the hit is served from disk; ttl=0 never expires, disk_max_bytes=0 never evicts
+    assert asyncio.run(roundtrip()) == ("x" * 100, None)
+    assert cache.stats()["memory_entries"] == 0
+
+    # The disk index is built once; eviction and lookups do not scan the directory again
+    reloaded = LLMCache(max_entries=1, disk_dir=str(tmp_path), ttl=60, disk_max_bytes=200)
+    with patch("os.walk", side_effect=AssertionError("directory scanned")):
+        for i in range(3):
+            reloaded.put(f"{i:064x}", "y" * 100)
+        assert reloaded.get("a" * 64) is None
+        assert reloaded.get(f"{2:064x}") == "y" * 100
+    assert reloaded.stats()["disk_bytes"] <= 200
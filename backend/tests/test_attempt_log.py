@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attempt_log import AttemptLog
+from rollups import TrendRollups
+
+
+def test_aggregates_are_incremental_and_replayed(tmp_path):
+    path = str(tmp_path / "attempts.bin")
+    log = AttemptLog(path)
+    now = datetime.now().replace(microsecond=0)
+    assert log.append([
+        ("m1", ["积分", "换元"], True, now),
+        ("m1", ["积分"], True, now + timedelta(seconds=1)),
+        ("m2", ["积分"], False, now + timedelta(seconds=2)),
+        ("m2", ["极限"], True, now + timedelta(seconds=3)),
+    ]) == 4
+
+    tags = {item["tag"]: item for item in log.tag_stats()}
+    assert log.tag_stats()[0]["tag"] == "积分"
+    assert (tags["积分"]["attempts"], tags["积分"]["correct"], tags["积分"]["streak"], tags["积分"]["best_streak"]) == (3, 2, 0, 2)
+    assert tags["换元"]["accuracy"] == 1.0
+    assert log.mistake_stats("m2")["last_attempt_at"] == now + timedelta(seconds=3)
+    assert log.mistake_stats("missing") is None
+    log.close()
+
+    # 模拟写入中途崩溃留下的半条记录
+    size = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    reloaded = AttemptLog(path)
+    assert reloaded.tag_stats() == log.tag_stats()
+    assert reloaded.summary()["attempts"] == 4
+    assert os.path.getsize(path) == size
+    assert reloaded.append([("m3", [], False, now)]) == 1
+    reloaded.close()
+    assert AttemptLog(path).summary()["attempts"] == 5
+
+
+def test_torn_tag_line_is_truncated(tmp_path):
+    path = str(tmp_path / "attempts.bin")
+    now = datetime.now()
+    log = AttemptLog(path)
+    log.append([("m1", ["积分"], True, now)])
+    log.close()
+
+    # 模拟写入新标签中途崩溃：标签字典末尾留下没有换行的半行
+    with open(log.tags_path, "ab") as f:
+        f.write("极".encode("utf-8")[:2])
+    reloaded = AttemptLog(path)
+    reloaded.append([("m2", ["换元"], False, now), ("m3", ["积分"], True, now)])
+    reloaded.close()
+
+    tags = {item["tag"]: item["attempts"] for item in AttemptLog(path).tag_stats()}
+    assert tags == {"积分": 2, "换元": 1}
+
+
+def test_listener_receives_history_and_new_attempts(tmp_path):
+    log = AttemptLog(str(tmp_path / "attempts.bin"))
+    now = datetime.now()
+    log.append([("m1", ["积分"], True, now), ("m1", ["积分"], False, now)])
+
+    rollups = TrendRollups()
+    batches = []
+
+    def listener(reviews):
+        batches.append(len(reviews))
+        for ts, correct, reviewed in reviews:
+            rollups.add_review(ts, correct, reviewed)
+
+    log.subscribe(listener)
+    log.append([("m1", ["积分"], True, now), ("m2", [], False, now)])
+    today = rollups.series("day", 1)[0]
+    assert (today["reviewed"], today["correct"]) == (4, 2)
+    # 历史按天回放为一批，之后每次 append 整批通知一次
+    assert batches == [1, 2]
+
+
+def test_validate_rejects_oversized_ids():
+    AttemptLog.validate("abcd1234", ["积分"])
+    with pytest.raises(ValueError):
+        AttemptLog.validate("x" * 17, [])
+    with pytest.raises(ValueError):
+        AttemptLog.validate("m1", ["a\nb"])
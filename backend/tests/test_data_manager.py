@@ -0,0 +1,571 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+
+# data_manager 使用 backend 目录内的直接导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis_store import is_analysis_ref
+from change_feed import ChangeLog
+from data_manager import (
+    CSVDataManager, CSV_COLUMNS, encode_cursor, decode_cursor, LIST_FIELDS, row_to_mistake_response,
+    rows_to_mistake_responses, analysis_input_hash
+)
+from sqlite_data_manager import SQLiteDataManager, migrate_csv_to_sqlite
+from data_models import MistakeCreate, MistakeUpdate, AnalysisResponse, DifficultyLevel, QuestionType
+
+
+def make_mistake(content="1+1=?", tags=None, **kwargs):
+    return MistakeCreate(
+        question_content=content,
+        wrong_process="Guessing",
+        wrong_answer="3",
+        correct_answer="2",
+        knowledge_tags=tags if tags is not None else ["Algebra"],
+        **kwargs
+    )
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def manager(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteDataManager(str(tmp_path / "mistakes.db"))
+    return CSVDataManager(str(tmp_path / "mistakes.csv"))
+
+
+def reopen(manager):
+    """按同一存储路径重新创建数据管理器，验证数据已持久化"""
+    if isinstance(manager, SQLiteDataManager):
+        return SQLiteDataManager(manager.db_path)
+    return CSVDataManager(manager.file_path)
+
+
+def test_create_and_get(manager):
+    mistake_id = manager.create_mistake(make_mistake(source="Textbook"))
+    mistake = manager.get_mistake(mistake_id)
+    assert mistake.id == mistake_id
+    assert mistake.knowledge_tags == ["Algebra"]
+    assert mistake.source == "Textbook"
+    assert mistake.notes is None
+    assert manager.get_mistake("missing") is None
+
+
+def test_writes_are_persisted(manager):
+    keep_id = manager.create_mistake(make_mistake("keep"))
+    drop_id = manager.create_mistake(make_mistake("drop"))
+    manager.update_mistake(keep_id, MistakeUpdate(wrong_answer="01", difficulty=DifficultyLevel.HARD))
+    manager.delete_mistake(drop_id)
+
+    reloaded = reopen(manager)
+    mistake = reloaded.get_mistake(keep_id)
+    assert mistake.wrong_answer == "01"
+    assert mistake.difficulty == DifficultyLevel.HARD
+    assert reloaded.get_mistake(drop_id) is None
+
+
+def test_update_and_delete_missing(manager):
+    assert manager.update_mistake("missing", MistakeUpdate(notes="x")) is False
+    assert manager.delete_mistake("missing") is False
+
+
+def test_update_mistake_analysis(manager):
+    mistake_id = manager.create_mistake(make_mistake())
+    analysis = AnalysisResponse(
+        mistake_id=mistake_id,
+        error_type="Calculation Error",
+        root_cause="Careless",
+        knowledge_gap=["Addition"],
+        learning_suggestions=["Practice"],
+        similar_examples=["2+2=?"],
+        confidence_score=0.9
+    )
+    assert manager.update_mistake_analysis(mistake_id, analysis) is True
+
+    reloaded = reopen(manager)
+    assert reloaded.get_mistake(mistake_id).analysis_result["error_type"] == "Calculation Error"
+
+
+def make_analysis(mistake_id, error_type="calc"):
+    return AnalysisResponse(
+        mistake_id=mistake_id, error_type=error_type, root_cause="careless", knowledge_gap=[],
+        learning_suggestions=[], similar_examples=[], confidence_score=0.8
+    )
+
+
+def test_analysis_keeps_input_hash_and_model(manager):
+    mistake_id = manager.create_mistake(make_mistake())
+    mistake = manager.get_mistake(mistake_id)
+    input_hash = analysis_input_hash(
+        mistake.question_content, mistake.wrong_process, mistake.wrong_answer, mistake.correct_answer
+    )
+    manager.update_mistake_analysis(mistake_id, make_analysis(mistake_id), input_hash, "qwen2.5:7b")
+
+    stored = reopen(manager).get_mistake(mistake_id).analysis_result
+    assert (stored["input_hash"], stored["model"]) == (input_hash, "qwen2.5:7b")
+    assert AnalysisResponse(**stored).error_type == "calc"
+
+    manager.update_mistake(mistake_id, MistakeUpdate(wrong_answer="4"))
+    mistake = manager.get_mistake(mistake_id)
+    assert analysis_input_hash(
+        mistake.question_content, mistake.wrong_process, mistake.wrong_answer, mistake.correct_answer
+    ) != input_hash
+    # 哈希只取决于四项分析输入
+    assert analysis_input_hash("1+1=?", "Guessing", "3", "2") == input_hash
+
+
+def test_analysis_stored_outside_main_table(tmp_path):
+    manager = CSVDataManager(str(tmp_path / "mistakes.csv"))
+    mistake_id = manager.create_mistake(make_mistake())
+    manager.update_mistake_analysis(mistake_id, make_analysis(mistake_id, "first"))
+    first_ref = manager.export_rows()[0]["analysis_result"]
+    manager.update_mistake_analysis(mistake_id, make_analysis(mistake_id, "second"))
+    # 旧文件留到合并时才删除，持有旧记录的读请求仍能读到
+    assert manager.analysis_store.get(mistake_id, first_ref) is not None
+    manager.compact()
+
+    # 主表只保存引用，旧的分析结果文件已被清理
+    ref = manager.export_rows()[0]["analysis_result"]
+    assert is_analysis_ref(ref)
+    assert os.listdir(manager.analysis_store.root_dir) == [f"{mistake_id}-{ref.split(':')[1]}.json"]
+    assert reopen(manager).get_mistake(mistake_id).analysis_result["error_type"] == "second"
+
+    # 被替换后又写回的分析结果不会被删除
+    manager.update_mistake_analysis(mistake_id, make_analysis(mistake_id, "first"))
+    manager.update_mistake_analysis(mistake_id, make_analysis(mistake_id, "second"))
+    manager.compact()
+    assert len(os.listdir(manager.analysis_store.root_dir)) == 1
+    assert manager.get_mistake(mistake_id).analysis_result["error_type"] == "second"
+
+    manager.delete_mistake(mistake_id)
+    assert len(os.listdir(manager.analysis_store.root_dir)) == 1
+    manager.compact()
+    assert os.listdir(manager.analysis_store.root_dir) == []
+
+
+def test_inline_analysis_is_externalized(tmp_path):
+    manager = CSVDataManager(str(tmp_path / "mistakes.csv"))
+    mistake_id = manager.create_mistake(make_mistake())
+    # 模拟旧版本直接写入主表的分析结果
+    manager._apply_changes(mistake_id, {"analysis_result": '{"error_type": "legacy"}'})
+
+    reloaded = reopen(manager)
+    assert is_analysis_ref(reloaded.export_rows()[0]["analysis_result"])
+    assert reloaded.get_mistake(mistake_id).analysis_result == {"error_type": "legacy"}
+    assert reloaded.search_mistakes(fields=["analysis_result"])[0].analysis_result == {"error_type": "legacy"}
+
+
+def test_list_fields_summarize_analysis(manager):
+    analyzed_id = manager.create_mistake(make_mistake("analyzed"))
+    manager.create_mistake(make_mistake("plain"))
+    manager.update_mistake_analysis(analyzed_id, AnalysisResponse(
+        mistake_id=analyzed_id, error_type="calc", root_cause="careless", knowledge_gap=[],
+        learning_suggestions=[], similar_examples=[], confidence_score=0.8
+    ))
+
+    listed = {m.question_content: m.model_dump(exclude_unset=True) for m in manager.get_all_mistakes(fields=LIST_FIELDS)}
+    assert listed["analyzed"]["has_analysis"] is True
+    assert listed["plain"]["has_analysis"] is False
+    assert "analysis_result" not in listed["analyzed"]
+
+    detail = manager.get_mistake(analyzed_id)
+    assert detail.has_analysis is True
+    assert detail.analysis_result["error_type"] == "calc"
+
+
+def test_search_and_statistics(manager):
+    manager.create_mistake(make_mistake("integral of x", tags=["Calculus"], question_type=QuestionType.PROOF))
+    manager.create_mistake(make_mistake("sum of series", tags=["Series", "Calculus"]))
+
+    assert len(manager.search_mistakes(keyword="INTEGRAL")) == 1
+    assert len(manager.search_mistakes(tags=["Series"])) == 1
+    assert len(manager.search_mistakes(question_type=QuestionType.PROOF)) == 1
+
+    stats = manager.get_statistics()
+    assert stats["total_mistakes"] == 2
+    assert stats["mistakes_by_type"] == {"计算题": 1, "证明题": 1}
+    assert stats["top_knowledge_gaps"][0] == "Calculus"
+
+
+def test_keyword_search_uses_index(manager):
+    first = manager.create_mistake(make_mistake("求 \\frac{1}{2} 的倒数"))
+    second = manager.create_mistake(make_mistake("分数运算", notes="\\frac{a}{b} 与 \\frac{c}{d} 相加"))
+    third = manager.create_mistake(make_mistake("因式分解"))
+
+    # 出现次数多者排前，中文子串与LaTeX命令均可匹配
+    assert [m.id for m in manager.search_mistakes(keyword="\\FRAC")] == [first, second]
+    assert [m.id for m in manager.search_mistakes(keyword="分")] == [second, third]
+    assert [m.id for m in manager.search_mistakes(keyword="倒数")] == [first]
+    assert manager.search_mistakes(keyword="rac{a") and not manager.search_mistakes(keyword="不存在")
+
+    # 翻前几页时只做部分排序，顺序与完整排序一致
+    page, total = manager.query_mistakes(keyword="\\frac", limit=1)
+    assert (total, [m.id for m in page]) == (2, [first])
+    page, total = manager.query_mistakes(keyword="分", offset=1, limit=5)
+    assert (total, [m.id for m in page]) == (2, [third])
+
+    manager.update_mistake(first, MistakeUpdate(question_content="求导数"))
+    manager.delete_mistake(second)
+    assert manager.search_mistakes(keyword="frac") == []
+    assert [m.id for m in manager.search_mistakes(keyword="导数")] == [first]
+    assert [m.id for m in reopen(manager).search_mistakes(keyword="导数")] == [first]
+
+
+def test_tag_filter_is_exact(manager):
+    definite = manager.create_mistake(make_mistake("a", tags=["定积分", "极限"]))
+    indefinite = manager.create_mistake(make_mistake("b", tags=["不定积分"]))
+    limit = manager.create_mistake(make_mistake("c", tags=["极限"]))
+
+    assert manager.search_mistakes(tags=["积分"]) == []
+    assert [m.id for m in manager.search_mistakes(tags=["不定积分", "极限"])] == [definite, indefinite, limit]
+    assert [m.id for m in manager.search_mistakes(tags=["定积分", " 极限"], tag_match="all")] == [definite]
+    assert [m.id for m in manager.search_mistakes(keyword="c", tags=["极限"])] == [limit]
+
+    manager.update_mistake(limit, MistakeUpdate(knowledge_tags=["不定积分"]))
+    manager.delete_mistake(definite)
+    assert manager.search_mistakes(tags=["极限"]) == []
+    assert manager.get_statistics()["top_knowledge_gaps"] == ["不定积分"]
+    assert [m.id for m in reopen(manager).search_mistakes(tags=["不定积分"])] == [indefinite, limit]
+
+
+def test_query_mistakes_pages(manager):
+    ids = [manager.create_mistake(make_mistake(f"q{i}", difficulty=d))
+           for i, d in enumerate([DifficultyLevel.HARD, DifficultyLevel.EASY, DifficultyLevel.EXPERT,
+                                  DifficultyLevel.EASY, DifficultyLevel.MEDIUM])]
+
+    page, total = manager.query_mistakes(offset=1, limit=2, fields=["question_content"])
+    assert total == 5 and [m.id for m in page] == ids[1:3]
+
+    page, total = manager.query_mistakes(difficulty=DifficultyLevel.EASY, offset=1, limit=10)
+    assert total == 2 and [m.id for m in page] == [ids[3]]
+
+    # 排序值相同时按 id 排序
+    page, _ = manager.query_mistakes(sort="difficulty", limit=3)
+    assert [m.id for m in page] == sorted([ids[1], ids[3]]) + [ids[4]]
+    page, _ = manager.query_mistakes(sort="difficulty", descending=True, limit=2)
+    assert [m.id for m in page] == [ids[2], ids[0]]
+
+    page, total = manager.query_mistakes(keyword="q", offset=4, limit=2)
+    assert total == 5 and [m.id for m in page] == [ids[4]]
+    assert manager.query_mistakes(keyword="missing") == ([], 0)
+    with pytest.raises(ValueError):
+        manager.query_mistakes(sort="question_content")
+
+
+def test_cursor_pagination(manager):
+    ids, _ = manager.create_mistakes([make_mistake(f"q{i}", tags=["a" if i % 2 else "b"]) for i in range(5)])
+    expected = sorted(ids)  # 同一批次 created_at 相同，按 id 排序
+
+    seen, cursor = [], None
+    while True:
+        page, total, cursor = manager.query_mistakes_after(cursor, limit=2, fields=["question_content"])
+        seen += [m.id for m in page]
+        # 翻页过程中新插入的记录排在末尾，不会打乱已经读取的顺序
+        if not seen[2:]:
+            late_id = manager.create_mistake(make_mistake("late"))
+        if cursor is None:
+            break
+        cursor = decode_cursor(encode_cursor(cursor))
+    assert seen == expected + [late_id] and total == 6
+
+    page, total, cursor = manager.query_mistakes_after(None, limit=1, tags=["a"])
+    assert total == 2 and cursor is not None
+    page2, _, cursor2 = manager.query_mistakes_after(cursor, limit=1, tags=["a"])
+    assert sorted([page[0].id, page2[0].id]) == sorted(ids[1::2]) and cursor2 is None
+
+    assert decode_cursor("") is None
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(("中等", "x"), "difficulty"), "created_at")
+    # 排序值类型与排序字段不符的游标同样无效（否则定位时无法与索引中的键比较）
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor((123, "x")))
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(("中等", "x"), "difficulty"), "difficulty")
+    assert decode_cursor(encode_cursor((1, "x"), "difficulty"), "difficulty") == (1, "x")
+
+
+def test_sorted_listing(manager):
+    levels = [DifficultyLevel.MEDIUM, DifficultyLevel.EXPERT, DifficultyLevel.EASY, DifficultyLevel.MEDIUM]
+    ids = [manager.create_mistake(make_mistake(f"q{i}", difficulty=d)) for i, d in enumerate(levels)]
+    by_difficulty_desc = [ids[1]] + sorted([ids[0], ids[3]], reverse=True) + [ids[2]]
+
+    page, total = manager.query_mistakes(sort="difficulty", descending=True, offset=1, limit=2)
+    assert total == 4 and [m.id for m in page] == by_difficulty_desc[1:3]
+
+    seen, cursor = [], None
+    while True:
+        page, _, cursor = manager.query_mistakes_after(cursor, limit=3, sort="difficulty", descending=True)
+        seen += [m.id for m in page]
+        if cursor is None:
+            break
+    assert seen == by_difficulty_desc
+
+    # 更新后 updated_at 索引随之调整
+    manager.update_mistake(ids[0], MistakeUpdate(notes="touched"))
+    page, _ = manager.query_mistakes(sort="updated_at", descending=True, limit=1)
+    assert page[0].id == ids[0]
+    page, _, _ = manager.query_mistakes_after(None, limit=1, sort="updated_at", descending=True,
+                                              difficulty=DifficultyLevel.MEDIUM)
+    assert page[0].id == ids[0]
+
+
+def test_statistics_are_incremental(manager):
+    first = manager.create_mistake(make_mistake(difficulty=DifficultyLevel.HARD))
+    second = manager.create_mistake(make_mistake(question_type=QuestionType.PROOF))
+    manager.update_mistake(first, MistakeUpdate(difficulty=DifficultyLevel.EASY))
+    manager.delete_mistake(second)
+    manager.create_mistakes([make_mistake(), make_mistake()])
+
+    stats = manager.get_statistics()
+    assert stats["total_mistakes"] == 3
+    assert stats["mistakes_by_type"] == {"计算题": 3}
+    assert stats["mistakes_by_difficulty"] == {"中等": 2, "简单": 1}
+    assert reopen(manager).get_statistics() == stats
+
+    # 计数发生漂移时，到期的全量重算会校正
+    manager._stats.by_type["计算题"] += 5
+    manager._stats.recount_interval = 0
+    manager.get_statistics()
+    for thread in threading.enumerate():
+        if thread.name == "mistake-stats-recount":
+            thread.join(timeout=10)
+    assert manager.get_statistics()["mistakes_by_type"] == {"计算题": 3}
+
+
+def test_trend_rollups(manager):
+    today = date.today()
+    first = manager.create_mistake(make_mistake())
+    second = manager.create_mistake(make_mistake())
+    manager.update_mistake_analysis(first, make_analysis(first))
+    manager.delete_mistake(second)
+    manager.record_review(datetime.now(), True)
+    manager.record_review(datetime.now().isoformat(), False)
+
+    day = manager.get_trend("day", 3)
+    assert [p["period_start"] for p in day] == [today - timedelta(days=2), today - timedelta(days=1), today]
+    assert {k: day[-1][k] for k in ("created", "analyzed", "reviewed", "correct", "accuracy")} == \
+        {"created": 1, "analyzed": 1, "reviewed": 2, "correct": 1, "accuracy": 0.5}
+    assert manager.get_trend("month", 1)[0]["period_start"] == today.replace(day=1)
+    assert manager.get_statistics()["accuracy_trend"] == [0.5]
+
+    reloaded = reopen(manager).get_trend("week", 1)[0]
+    assert (reloaded["created"], reloaded["analyzed"]) == (1, 1)
+    with pytest.raises(ValueError):
+        manager.get_trend("year", 1)
+
+
+def test_heatmap_cube(manager):
+    month = date.today().replace(day=1)
+    first = manager.create_mistake(make_mistake(tags=["积分", "换元"], difficulty=DifficultyLevel.HARD))
+    manager.create_mistake(make_mistake(tags=["积分"], difficulty=DifficultyLevel.HARD))
+    manager.create_mistake(make_mistake(tags=[]))
+
+    version, cells = manager.get_heatmap("month", 1)
+    assert [(c["period_start"], c["knowledge_tag"], c["difficulty"], c["count"]) for c in cells] == \
+        [(month, "积分", "困难", 2), (month, "换元", "困难", 1)]
+    assert version == manager.data_version
+    assert manager.get_heatmap("month", 1)[1] is cells
+
+    manager.update_mistake(first, MistakeUpdate(difficulty=DifficultyLevel.EASY))
+    assert manager.data_version > version
+    version, cells = manager.get_heatmap("month", 1)
+    assert version == manager.data_version
+    assert {(c["knowledge_tag"], c["difficulty"]): c["count"] for c in cells} == \
+        {("积分", "困难"): 1, ("积分", "简单"): 1, ("换元", "简单"): 1}
+    assert reopen(manager).get_heatmap("month", 1)[1] == cells
+
+
+def test_data_and_record_versions(manager):
+    mistake_id = manager.create_mistake(make_mistake())
+    version, record_version = manager.data_version, manager.record_version(mistake_id)
+    assert record_version == manager.get_mistake(mistake_id).updated_at.isoformat()
+    assert manager.record_version("missing") is None
+
+    manager.record_review(datetime.now(), True)
+    assert manager.data_version > version
+    assert manager.record_version(mistake_id) == record_version
+
+    # 一批复习结果只增加一次版本号
+    version = manager.data_version
+    manager.record_reviews([(datetime.now(), 1, 1), (datetime.now(), 0, 1)])
+    assert manager.data_version == version + 1
+
+    version = manager.data_version
+    manager.update_mistake(mistake_id, MistakeUpdate(notes="changed"))
+    assert manager.data_version > version
+    assert manager.record_version(mistake_id) != record_version
+
+
+def test_get_tags_reads_index(manager):
+    tagged = manager.create_mistake(make_mistake(tags=["积分", " 换元 "]))
+    untagged = manager.create_mistake(make_mistake(tags=[]))
+    manager.update_mistake_analysis(tagged, make_analysis(tagged))
+    assert manager.get_tags(tagged) == ["积分", "换元"]
+    assert manager.get_tags(untagged) == []
+    assert manager.get_tags("missing") is None
+
+
+def test_change_feed(manager):
+    existing = manager.create_mistake(make_mistake())
+    start = manager.data_version
+    created = manager.create_mistake(make_mistake("new"))
+    transient = manager.create_mistake(make_mistake("gone"))
+    manager.update_mistake(existing, MistakeUpdate(notes="changed"))
+    manager.delete_mistake(transient)
+
+    feed = manager.get_changes(start, fields=["id", "question_content"])
+    assert not feed["full_resync"] and feed["version"] == manager.data_version
+    assert [(c["id"], c["op"]) for c in feed["changes"]] == [(created, "create"), (existing, "update")]
+    assert [m.question_content for m in feed["items"]] == ["new", "1+1=?"]
+    assert manager.get_changes(manager.data_version)["changes"] == []
+
+    manager.delete_mistake(existing)
+    assert [(c["id"], c["op"]) for c in manager.get_changes(start)["changes"]] == [(created, "create"), (existing, "delete")]
+
+    # 重新加载后只能从加载完成时的版本号开始增量同步
+    reloaded = reopen(manager)
+    assert reloaded.get_changes(0)["full_resync"]
+    assert not reloaded.get_changes(reloaded.data_version)["full_resync"]
+
+
+def test_change_feed_is_bounded():
+    log = ChangeLog(max_entries=2)
+    for version, mistake_id in enumerate(["a", "b", "c"], start=1):
+        log.record(version, mistake_id, "create")
+    assert log.since(0) is None
+    assert log.since(1) == [("b", "create", 2), ("c", "create", 3)]
+
+
+def test_query_cache_serves_successive_pages(manager):
+    ids = [manager.create_mistake(make_mistake(f"极限 {i}", difficulty=DifficultyLevel.EASY)) for i in range(5)]
+    filters = dict(keyword="极限", difficulty=DifficultyLevel.EASY)
+
+    first, total = manager.query_mistakes(offset=0, limit=2, **filters)
+    second, _ = manager.query_mistakes(offset=2, limit=2, **filters)
+    assert total == 5 and [m.id for m in first + second] == ids[:4]
+    by_created, _ = manager.query_mistakes(sort="created_at", **filters)
+    page, _, cursor = manager.query_mistakes_after(None, limit=2, sort="created_at", **filters)
+    rest, _, _ = manager.query_mistakes_after(cursor, limit=5, sort="created_at", **filters)
+    assert [m.id for m in page + rest] == [m.id for m in by_created]
+    stats = manager.query_cache.stats()
+    assert stats["hits"] >= 3 and stats["size"] >= 2
+
+    # 数据变化后缓存失效，删除立即生效
+    manager.delete_mistake(ids[0])
+    page, total = manager.query_mistakes(offset=0, limit=2, **filters)
+    assert total == 4 and page[0].id == ids[1]
+
+
+def test_loads_snapshot_without_newer_columns(tmp_path):
+    csv_path = tmp_path / "mistakes.csv"
+    legacy_columns = [col for col in CSV_COLUMNS if col != "analyzed_at"]
+    csv_path.write_text(",".join(legacy_columns) + "\n" + ",".join(
+        {"id": "old1", "question_type": "计算题", "difficulty": "中等", "knowledge_tags": "Algebra",
+         "created_at": "2025-01-02T03:04:05"}.get(col, "") for col in legacy_columns
+    ) + "\n", encoding="utf-8")
+
+    manager = CSVDataManager(str(csv_path))
+    assert manager.get_mistake("old1").knowledge_tags == ["Algebra"]
+    assert manager.get_trend("day", 1)[0]["created"] == 0
+    assert manager._rollups.series("day", 1, end=date(2025, 1, 2))[0]["created"] == 1
+
+
+def test_create_mistakes_batch(manager):
+    # 缺少必填字段的记录转换失败，不影响同批其他记录
+    broken = MistakeCreate.model_construct(question_content="broken")
+    ids, errors = manager.create_mistakes([make_mistake("a"), broken, make_mistake("b")])
+
+    assert ids[1] is None and list(errors) == [1]
+    assert len(set(ids[0::2])) == 2
+    reloaded = reopen(manager)
+    assert [reloaded.get_mistake(i).question_content for i in ids[0::2]] == ["a", "b"]
+
+
+def test_search_with_field_projection(manager):
+    manager.create_mistake(make_mistake("integral of x"))
+    mistake = manager.search_mistakes(keyword="integral", fields=["difficulty", "knowledge_tags"])[0]
+
+    assert mistake.model_dump(exclude_unset=True) == {
+        "id": mistake.id,
+        "difficulty": DifficultyLevel.MEDIUM,
+        "knowledge_tags": ["Algebra"],
+    }
+    with pytest.raises(ValueError):
+        manager.get_all_mistakes(fields=["id; DROP TABLE mistakes"])
+
+
+def test_batch_conversion_matches_per_row():
+    base = dict.fromkeys(CSV_COLUMNS, "")
+    rows = [
+        dict(base, id="a", question_type="计算题", difficulty="中等", knowledge_tags="x, y,,",
+             created_at="2025-12-16T09:00:00.123456", updated_at="2025-12-16 09:00",
+             source="book", analysis_result='{"error_type": "calc"}'),
+        dict(base, id="b", question_type="invalid", difficulty="中等", created_at="2025-12-16"),
+        dict(base, id="c", question_type="证明题", difficulty="专家", notes="n",
+             created_at="2025-12-16T09:00:00+08:00", updated_at="2025-12-16", analysis_result="{broken"),
+    ]
+
+    per_row = [m for m in (row_to_mistake_response(row) for row in rows) if m]
+    batch = rows_to_mistake_responses(rows)
+    assert batch == per_row
+    assert [m.model_dump_json() for m in batch] == [m.model_dump_json() for m in per_row]
+
+
+def test_migrate_csv_to_sqlite(tmp_path):
+    csv_manager = CSVDataManager(str(tmp_path / "mistakes.csv"))
+    first_id = csv_manager.create_mistake(make_mistake("first"))
+    second_id = csv_manager.create_mistake(make_mistake("second", tags=["Geometry"]))
+
+    db_path = str(tmp_path / "mistakes.db")
+    assert migrate_csv_to_sqlite(csv_manager.file_path, db_path) == 2
+    # 重复迁移不会产生重复记录
+    assert migrate_csv_to_sqlite(csv_manager.file_path, db_path) == 0
+
+    csv_manager.update_mistake_analysis(first_id, make_analysis(first_id))
+    migrate_csv_to_sqlite(csv_manager.file_path, str(tmp_path / "analyzed.db"))
+    assert SQLiteDataManager(str(tmp_path / "analyzed.db")).get_mistake(first_id).analysis_result["error_type"] == "calc"
+
+    sqlite_manager = SQLiteDataManager(db_path)
+    assert [m.id for m in sqlite_manager.get_all_mistakes()] == [first_id, second_id]
+    assert sqlite_manager.get_mistake(second_id) == csv_manager.get_mistake(second_id)
+
+
+def test_writes_append_to_log_until_compaction(tmp_path):
+    manager = CSVDataManager(str(tmp_path / "mistakes.csv"))
+    mistake_id = manager.create_mistake(make_mistake())
+    manager.update_mistake(mistake_id, MistakeUpdate(notes="updated"))
+    snapshot_size = os.path.getsize(manager.file_path)
+
+    # 写操作只追加日志，不改写CSV快照
+    with open(manager.log_path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+    assert reopen(manager).get_mistake(mistake_id).notes == "updated"
+
+    manager.compact()
+    assert os.path.getsize(manager.file_path) > snapshot_size
+    assert not os.path.exists(manager.log_path)
+    assert reopen(manager).get_mistake(mistake_id).notes == "updated"
+
+
+def test_replay_skips_torn_log_line(tmp_path):
+    manager = CSVDataManager(str(tmp_path / "mistakes.csv"))
+    mistake_id = manager.create_mistake(make_mistake())
+    with open(manager.log_path, "a", encoding="utf-8") as f:
+        f.write('{"op": "delete", "id": ')
+
+    assert reopen(manager).get_mistake(mistake_id) is not None
+
+
+def test_background_compaction_after_threshold(tmp_path):
+    manager = CSVDataManager(str(tmp_path / "mistakes.csv"), compact_threshold=1)
+    mistake_id = manager.create_mistake(make_mistake())
+
+    # 等待后台合并线程完成
+    manager._compaction_thread.join(timeout=10)
+    assert not os.path.exists(manager.log_path)
+    assert reopen(manager).get_mistake(mistake_id) is not None
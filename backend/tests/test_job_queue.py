@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_queue import JobQueue
+
+
+def test_jobs_run_with_bounded_concurrency(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.jsonl"), workers=2)
+    running = []
+    peak = []
+
+    async def handler(mistake_id, force):
+        running.append(mistake_id)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(mistake_id)
+        if mistake_id == "bad":
+            raise ValueError("错题不存在")
+        return {"mistake_id": mistake_id, "force": force}
+
+    async def scenario():
+        queue.set_handler(handler)
+        await queue.start()
+        first = await queue.submit("m1")
+        # 同一错题已有未完成的任务时复用该任务，强制重新分析时另建任务
+        assert (await queue.submit("m1"))["job_id"] == first["job_id"]
+        forced = await queue.submit("m1", force=True)
+        others = [await queue.submit(f"m{i}") for i in range(2, 6)] + [await queue.submit("bad")]
+        jobs = [await queue.wait(job["job_id"], 5) for job in [first, forced] + others]
+        await queue.stop()
+        return jobs
+
+    jobs = asyncio.run(scenario())
+    assert max(peak) == 2
+    assert [job["status"] for job in jobs] == ["succeeded"] * 6 + ["failed"]
+    assert jobs[1]["result"] == {"mistake_id": "m1", "force": True}
+    assert jobs[-1]["error"] == "错题不存在"
+    assert queue.stats()["succeeded"] == 6
+
+
+def test_unfinished_jobs_survive_restart(tmp_path):
+    path = str(tmp_path / "jobs.jsonl")
+    queue = JobQueue(path, workers=1)
+    started = []
+
+    async def stuck(mistake_id, force):
+        started.append(mistake_id)
+        await asyncio.sleep(60)
+
+    async def interrupted():
+        queue.set_handler(stuck)
+        await queue.start()
+        jobs = [await queue.submit("m1"), await queue.submit("m2")]
+        await asyncio.sleep(0.05)
+        await queue.stop()
+        return jobs
+
+    first, second = asyncio.run(interrupted())
+    assert started == ["m1"]
+    assert queue.get(first["job_id"])["status"] == "running"
+    queue.close()
+
+    # 模拟写入中途崩溃留下的半行
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"job_id": "torn"')
+
+    reloaded = JobQueue(path, workers=1)
+
+    async def handler(mistake_id, force):
+        return {"mistake_id": mistake_id}
+
+    async def resumed():
+        reloaded.set_handler(handler)
+        await reloaded.start()
+        jobs = [await reloaded.wait(job["job_id"], 5) for job in (first, second)]
+        await reloaded.stop()
+        return jobs
+
+    jobs = asyncio.run(resumed())
+    assert [job["status"] for job in jobs] == ["succeeded", "succeeded"]
+    assert [job["result"]["mistake_id"] for job in jobs] == ["m1", "m2"]
+    assert reloaded.get("torn") is None
+    reloaded.close()
+    assert JobQueue(path).get(second["job_id"])["status"] == "succeeded"
+
+
+def test_submit_and_completion_are_fsynced(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path / "jobs.jsonl"), workers=1)
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+
+    async def handler(mistake_id, force):
+        return {"mistake_id": mistake_id}
+
+    async def scenario():
+        queue.set_handler(handler)
+        await queue.start()
+        job = await queue.submit("m1")
+        assert len(synced) == 1
+        await queue.wait(job["job_id"], 5)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    # 提交与完成各落盘一次，"执行中"记录不落盘
+    assert len(synced) == 2
+    queue.close()
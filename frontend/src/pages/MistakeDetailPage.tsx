@@ -164,7 +164,8 @@ const MistakeDetailPage = () => {
 
     try {
       setAnalyzing(true)
-      await mistakesApi.analyzeMistake(id)
+      // 已有分析结果时按钮为“重新分析”，强制重新调用模型，否则后端会直接返回已保存的结果
+      await mistakesApi.analyzeMistake(id, !!mistake.analysis_result)
       // 重新获取更新后的错题数据
       await fetchMistake()
     } catch (err: any) {
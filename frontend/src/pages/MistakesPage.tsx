@@ -12,6 +12,9 @@ import { Skeleton } from '../components/ui/Skeleton'
 import MistakeCard from '../components/MistakeCard'
 import NoMistakeFallback from '../components/NoMistakeFallback'
 
+// 列表卡片用到的字段，列表接口只返回这些字段
+const LIST_FIELDS = 'id,question_content,question_type,difficulty,knowledge_tags,wrong_answer,correct_answer,created_at,updated_at'
+
 const MistakesPage = () => {
   // 状态管理
   const [mistakes, setMistakes] = useState<MistakeResponse[]>([])
@@ -58,6 +61,7 @@ const MistakesPage = () => {
         question_type: selectedType !== 'all' ? selectedType : undefined,
         difficulty: selectedDifficulty !== 'all' ? selectedDifficulty : undefined,
         knowledge_tag: selectedTag || undefined,
+        fields: LIST_FIELDS,
       }
 
       const response = await mistakesApi.getMistakes(params)
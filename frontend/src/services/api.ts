@@ -21,6 +21,13 @@ import {
   MistakeUpdate,
   AnalysisResponse,
   StatsResponse,
+  TrendResponse,
+  HeatmapResponse,
+  ChangesResponse,
+  AnalysisJob,
+  AttemptCreate,
+  AttemptBatchResponse,
+  AttemptStats,
   PaginationParams,
   PaginatedResponse,
   ApiResponse,
@@ -54,6 +61,39 @@ const unwrap = async <T>(promise: Promise<AxiosResponse<T>>): Promise<T> => {
   return response.data
 }
 
+// 读取SSE流：每收到一个事件调用一次 onEvent，token 事件为 { text }，result 事件为最终结果
+const streamEvents = async (
+  path: string,
+  init: RequestInit,
+  onEvent: (event: string, data: any) => void
+): Promise<void> => {
+  const response = await fetch(`${API_BASE_URL}${path}`, init)
+  if (!response.ok || !response.body) {
+    const detail = await response.json().then((body) => body.detail).catch(() => undefined)
+    throw new Error(detail || `请求失败: ${response.status}`)
+  }
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    let boundary = buffer.indexOf('\n\n')
+    while (boundary !== -1) {
+      const block = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+      const event = block.match(/^event: (.*)$/m)?.[1] ?? 'message'
+      const data = block.match(/^data: (.*)$/m)?.[1]
+      if (data !== undefined) {
+        if (event === 'error') throw new Error(JSON.parse(data).detail)
+        onEvent(event, JSON.parse(data))
+      }
+      boundary = buffer.indexOf('\n\n')
+    }
+  }
+}
+
 // 错题管理API
 export const mistakesApi = {
   // 获取错题列表（分页+筛选）
@@ -73,10 +113,40 @@ export const mistakesApi = {
   deleteMistake: (id: string) => unwrap(api.delete<ApiResponse<void>>(`/mistakes/${id}`)),
 
   // AI分析错题
-  analyzeMistake: (id: string) => unwrap(api.post<AnalysisResponse>(`/mistakes/${id}/analyze`)),
+  // 内容未修改时返回已保存的分析结果，force 为 true 时强制重新分析
+  analyzeMistake: (id: string, force = false) =>
+    unwrap(api.post<AnalysisResponse>(`/mistakes/${id}/analyze`, null, { params: { force } })),
+
+  // 提交后台分析任务，立即返回任务，结果通过 jobsApi.getJob 查询
+  analyzeMistakeAsync: (id: string, force = false) =>
+    unwrap(api.post<AnalysisJob>(`/mistakes/${id}/analyze`, null, { params: { async: true, force } })),
+
+  // 流式AI分析错题：onToken 接收模型逐段生成的文本，结束时返回保存后的分析结果
+  analyzeMistakeStream: async (id: string, onToken: (text: string) => void, force = false) => {
+    let result: AnalysisResponse | undefined
+    await streamEvents(`/mistakes/${id}/analyze/stream?force=${force}`, { method: 'POST' }, (event, data) => {
+      if (event === 'token') onToken(data.text)
+      else if (event === 'result') result = data
+    })
+    if (!result) throw new Error('AI分析未返回结果')
+    return result
+  },
 
   // 获取统计摘要
   getStatsSummary: () => unwrap(api.get<StatsResponse>('/mistakes/stats/summary')),
+
+  // 获取按天/周/月分桶的趋势
+  getTrend: (granularity: 'day' | 'week' | 'month' = 'day', window = 30) =>
+    unwrap(api.get<TrendResponse>('/mistakes/stats/trend', { params: { granularity, window } })),
+
+  // 获取按知识标签、难度、题型与时间桶统计的错题热力图
+  getHeatmap: (granularity: 'day' | 'week' | 'month' = 'month', window = 12) =>
+    unwrap(api.get<HeatmapResponse>('/mistakes/stats/heatmap', { params: { granularity, window } })),
+
+  // 获取自某个数据版本号之后的变更（增量同步）
+  getChanges: (since: number, instance?: string, fields?: string) =>
+    unwrap(api.get<ChangesResponse>('/mistakes/changes', { params: { since, instance, fields } })),
+
   // 获取题目类型枚举（后端返回 { value, name } 数组，这里用 any[] 承接）
   getQuestionTypes: () => unwrap(api.get<any[]>('/mistakes/types/list')),
   // 获取难度级别枚举
@@ -109,12 +179,40 @@ export const aiApi = {
 
   // 解释数学概念
   explainConcept: (concept: string) => unwrap(api.get<string>(`/ai/explain/${encodeURIComponent(concept)}`)),
+  // 流式解释数学概念：onToken 接收模型逐段生成的文本，结束时返回解析后的解释
+  explainConceptStream: async (concept: string, onToken: (text: string) => void) => {
+    let result: Record<string, any> | undefined
+    await streamEvents(`/ai/explain/stream?concept=${encodeURIComponent(concept)}`, {}, (event, data) => {
+      if (event === 'token') onToken(data.text)
+      else if (event === 'result') result = data
+    })
+    if (!result) throw new Error('概念解释未返回结果')
+    return result
+  },
   // 健康检查
   checkHealth: () => unwrap(api.get<{ status: string; model: string }>('/ai/health')),
   // 获取模型信息
   getModelInfo: () => unwrap(api.get<{ model: string; version: string }>('/ai/model-info')),
 }
 
+// 练习作答API
+export const attemptsApi = {
+  // 批量记录作答结果
+  recordAttempts: (attempts: AttemptCreate[]) =>
+    unwrap(api.post<AttemptBatchResponse>('/attempts/batch', { attempts })),
+  // 获取各知识标签的正确率与连对统计
+  getTagStats: () => unwrap(api.get<(AttemptStats & { tag: string })[]>('/attempts/tags')),
+  // 获取某道错题的作答统计
+  getMistakeStats: (mistakeId: string) =>
+    unwrap(api.get<AttemptStats & { mistake_id: string }>(`/attempts/mistakes/${mistakeId}`)),
+}
+
+// 后台任务API
+export const jobsApi = {
+  // 查询任务状态，wait 为任务未完成时最多等待的秒数（长轮询）
+  getJob: (jobId: string, wait = 0) => unwrap(api.get<AnalysisJob>(`/jobs/${jobId}`, { params: { wait } })),
+}
+
 // 系统API
 export const systemApi = {
   // 健康检查
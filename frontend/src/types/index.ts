@@ -43,7 +43,8 @@ export interface MistakeResponse {
   notes?: string
   created_at: string  // ISO 8601 string from backend
   updated_at: string  // ISO 8601 string from backend
-  analysis_result?: AnalysisResult
+  analysis_result?: AnalysisResult  // 仅详情接口返回
+  has_analysis?: boolean
 }
 
 // 更新错题的请求模型
@@ -88,6 +89,8 @@ export interface AnalysisResult {
   similar_examples: string[]
   confidence_score: number
   analyzed_at: string
+  input_hash?: string  // 生成分析时的输入哈希
+  model?: string       // 生成分析的模型（降级时为 mock）
 }
 
 // 统计信息响应模型
@@ -99,6 +102,91 @@ export interface StatsResponse {
   accuracy_trend: number[]
 }
 
+// 趋势中的一个时间桶
+export interface TrendPoint {
+  period_start: string
+  created: number
+  analyzed: number
+  reviewed: number
+  correct: number
+  accuracy: number | null
+}
+
+// 趋势响应模型
+export interface TrendResponse {
+  granularity: 'day' | 'week' | 'month'
+  window: number
+  points: TrendPoint[]
+}
+
+// 错题热力图（知识标签×难度×题型×时间桶）
+export interface HeatmapCell {
+  period_start: string
+  knowledge_tag: string
+  difficulty: string
+  question_type: string
+  count: number
+}
+
+export interface HeatmapResponse {
+  granularity: 'day' | 'week' | 'month'
+  window: number
+  data_version: number
+  cells: HeatmapCell[]
+}
+
+// 增量同步
+export interface ChangeEntry {
+  id: string
+  op: 'create' | 'update' | 'delete'
+  version: number
+}
+
+export interface ChangesResponse {
+  instance_id: string
+  version: number
+  full_resync: boolean
+  changes: ChangeEntry[]
+  items: Partial<MistakeResponse>[]
+}
+
+// 后台分析任务
+export interface AnalysisJob {
+  job_id: string
+  mistake_id: string
+  force: boolean
+  status: 'queued' | 'running' | 'succeeded' | 'failed'
+  created_at: string
+  started_at?: string
+  finished_at?: string
+  result?: AnalysisResponse
+  error?: string
+}
+
+// 练习作答
+export interface AttemptCreate {
+  mistake_id: string
+  correct: boolean
+  knowledge_tags?: string[]
+  attempted_at?: string
+}
+
+export interface AttemptBatchResponse {
+  accepted: number
+  rejected: number
+  rejected_details: { index: number; error: string }[]
+}
+
+// 作答统计（正确率、连对次数）
+export interface AttemptStats {
+  attempts: number
+  correct: number
+  accuracy: number | null
+  streak: number
+  best_streak: number
+  last_attempt_at: string | null
+}
+
 // AI生成练习题响应模型
 export interface GeneratePracticeResponse {
   knowledge_gaps: string[]
@@ -124,6 +212,12 @@ export interface PaginationParams {
   question_type?: QuestionType
   difficulty?: DifficultyLevel
   knowledge_tag?: string
+  tags?: string  // 多个知识点标签，逗号分隔（精确匹配）
+  tag_match?: 'any' | 'all'
+  fields?: string  // 只返回指定字段，逗号分隔
+  sort?: 'created_at' | 'updated_at' | 'difficulty'
+  order?: 'asc' | 'desc'
+  cursor?: string  // 游标分页：上一页返回的 next_cursor，首页传空字符串
 }
 
 // 分页响应
@@ -133,6 +227,7 @@ export interface PaginatedResponse<T> {
   page: number
   page_size: number
   total_pages: number
+  next_cursor?: string | null  // 游标分页时下一页的游标
 }
 
 // 主题类型